@@ -1,24 +1,38 @@
-import fitz
+import argparse
+import numpy as np
 from collections import Counter
 
-def analyze_widths(pdf_path):
-    doc = fitz.open(pdf_path)
-    page = doc[0]
-    shapes = page.get_drawings()
-    
-    widths = []
-    types = []
+from extraction_cache import load_cached_page_model
+from page_model import classified_columns
+from width_calibration import WidthHistogram, calibrate_widths
+from geometry import WALL_MIN_WIDTH, WINDOW_MAX_WIDTH
+
+def analyze_widths(pdf_path, page_number=0):
+    model = load_cached_page_model(pdf_path, page_number, shapes=False)
+    cols = classified_columns(model)
     
-    for shape in shapes:
-        # Check stroke width
-        w = shape.get('width')
-        if w is not None:
-            widths.append(round(w, 2))
-        types.append(shape.get('type'))
+    # Check stroke width (nan marks shapes without one)
+    raw_width = cols["raw_width"]
+    widths = [round(w, 2) for w in raw_width[~np.isnan(raw_width)].tolist()]
+    types = cols["type"].tolist()
             
-    print(f"Total Shapes: {len(shapes)}")
+    print(f"Total Shapes: {len(types)}")
     print("Shape Types:", Counter(types))
     print("Top 20 Line Widths:", Counter(widths).most_common(20))
 
+    # What PDF_EXTRACTOR_CALIBRATE=1 would pick for this page
+    thresholds = calibrate_widths(WidthHistogram().add(raw_width))
+    for name, low, high, count in thresholds["classes"]:
+        print(f"  {name:<15} {low:.2f} - {high:.2f} ({count} shapes)")
+    print(f"Calibrated: Window/Detail < {thresholds['window_max_width']}, Wall >= {thresholds['wall_min_width']}"
+          f" ({thresholds['source']}; defaults {WINDOW_MAX_WIDTH} / {WALL_MIN_WIDTH})")
+
+def main():
+    parser = argparse.ArgumentParser(description="Stroke width distribution of a page and the cut-offs calibration would pick.")
+    parser.add_argument("pdf", nargs="?", default="sample.pdf", help="Source PDF")
+    parser.add_argument("--page", type=int, default=1, help="1-based page number")
+    args = parser.parse_args()
+    analyze_widths(args.pdf, args.page - 1)
+
 if __name__ == "__main__":
-    analyze_widths("sample.pdf")
+    main()
@@ -0,0 +1,198 @@
+import fitz # PyMuPDF
+import argparse
+import contextlib
+import glob
+import os
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from extract_pdf_data import page_feature_table, extract_all_text
+from page_model import build_page_model, OCG_FILTER_ENV
+from extraction_cache import cached_page_model
+from feature_store import write_page, export_report, document_keys, STORE_ROOT
+from generate_layer_pdf import generate_layer_pdfs
+from width_calibration import CALIBRATE_ENV
+import instrumentation
+
+# --- Configuration ---
+BATCH_EXCEL_FILE = "batch_quantities.xlsx"
+
+# Each worker keeps its most recently opened document so consecutive
+# pages of the same file don't pay for fitz.open() again.
+_open_doc = {"path": None, "doc": None}
+
+# --- Input Discovery ---
+def collect_pdf_files(target):
+    """
+    Resolves a directory, a single file or a glob pattern into a sorted list of PDF paths.
+    """
+    if os.path.isdir(target):
+        candidates = glob.glob(os.path.join(target, "*"))
+    else:
+        candidates = glob.glob(target)
+
+    return sorted(p for p in candidates if os.path.isfile(p) and p.lower().endswith(".pdf"))
+
+def build_work_units(pdf_files):
+    """
+    Expands every document into (path, page_number, document key) work units.
+    """
+    keys = document_keys(pdf_files)
+    units = []
+    for path in pdf_files:
+        try:
+            with fitz.open(path) as doc:
+                page_count = doc.page_count
+        except Exception as e:
+            print(f"  Skipping {path}: {e}")
+            continue
+        units.extend((path, pno, keys[path]) for pno in range(page_count))
+    return units
+
+# --- Worker ---
+def _get_document(path):
+    if _open_doc["path"] != path:
+        if _open_doc["doc"] is not None:
+            _open_doc["doc"].close()
+        _open_doc["doc"] = fitz.open(path)
+        _open_doc["path"] = path
+    return _open_doc["doc"]
+
+def page_layer_dir(layers_root, document, pno):
+    stem = os.path.splitext(document)[0]
+    return os.path.join(layers_root, *stem.split("/")[:-1], f"{stem.split('/')[-1]}_p{pno + 1}")
+
+def extract_work_unit(unit, store_root, use_cache=True, layers_root=None):
+    """
+    Worker entry point: extracts one (document, page) unit straight into the feature store,
+    so only the small per-page totals travel back to the parent process.
+    With layers_root the page's layer PDFs are rendered here too (pages are already
+    spread over the pool, so each page renders its layers in-process).
+    Returns: (document key, page_number, stats, feature_count, text_count)
+    """
+    path, pno, document = unit
+    page = _get_document(path)[pno]
+    if use_cache:
+        model = cached_page_model(page, path, shapes=layers_root is not None)
+    else:
+        model = build_page_model(page, path)
+    features = page_feature_table(model)
+    text_rows = list(extract_all_text(model))
+    stats = write_page(store_root, document, pno + 1, features, text_rows)
+    if layers_root:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            generate_layer_pdfs(model, page_layer_dir(layers_root, document, pno), workers=1)
+    return document, pno, stats, len(features), len(text_rows)
+
+def safe_work_unit(unit, **kwargs):
+    """
+    extract_work_unit that never raises: a failing page (malformed content, a bug in one
+    extractor) comes back as an error record so the rest of the batch carries on.
+    Returns: extract_work_unit's tuple plus an error string (None on success)
+    """
+    try:
+        return extract_work_unit(unit, **kwargs) + (None,)
+    except Exception as e:
+        error = "".join(traceback.format_exception_only(type(e), e)).strip()
+        return unit[2], unit[1], None, 0, 0, error
+
+# --- Batch Driver ---
+def iter_batch_results(units, workers, store_root, use_cache=True, layers_root=None):
+    """
+    Yields per-unit results (see safe_work_unit) in (file, page) order as they complete.
+    """
+    work = partial(safe_work_unit, store_root=store_root, use_cache=use_cache, layers_root=layers_root)
+    if workers == 1:
+        # Avoid pool start-up when running serially
+        for unit in units:
+            yield work(unit)
+    else:
+        # chunksize=1: pages vary wildly in cost, so hand them out one at a time
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            yield from pool.map(work, units, chunksize=1)
+
+def run_batch(target, store_root=STORE_ROOT, workers=None, use_cache=True, layers_root=None, output=None):
+    """
+    Extracts every page of every PDF matched by target over a process pool into the
+    feature store, optionally rendering each page's layer PDFs under layers_root.
+    With output, a merged report of the pages extracted in this run is exported from the
+    store (pages of earlier runs, and pages that failed, are left out).
+    Returns (merged per-category totals, failed pages as (document, page, error)).
+    """
+    pdf_files = collect_pdf_files(target)
+    if not pdf_files:
+        print(f"Error: no PDF files found for {target}.")
+        return None, []
+
+    units = build_work_units(pdf_files)
+    workers = workers or os.cpu_count() or 1
+    print(f"Processing {len(units)} pages from {len(pdf_files)} files on {workers} workers...")
+
+    # Pages run in worker processes, so the run report only sees the batch as a whole
+    totals = {}
+    done = []
+    failed = []
+    with instrumentation.stage("batch") as st:
+        for document, pno, stats, feature_count, text_count, error in iter_batch_results(units, workers, store_root, use_cache, layers_root):
+            if error is not None:
+                failed.append((document, pno + 1, error))
+                print(f"  ! {document} p{pno + 1} failed: {error}")
+                continue
+            done.append((document, pno + 1))
+            for cat, data in stats.items():
+                if cat not in totals:
+                    totals[cat] = {"count": 0, "length": 0.0}
+                totals[cat]["count"] += data["count"]
+                totals[cat]["length"] += data["length"]
+            st.add_items(feature_count + text_count)
+            print(f"  - {document} p{pno + 1} ({feature_count} features, {text_count} text)")
+        st.set_categories({cat: totals[cat]["count"] for cat in totals})
+
+    print(f"\nFeature store: {os.path.abspath(store_root)}")
+    if layers_root:
+        print(f"Layer PDFs: {os.path.abspath(layers_root)}/<file>_p<page>/")
+    if output and done:
+        export_report(store_root, output, pages=done)
+    if failed:
+        print(f"\n{len(failed)} of {len(units)} pages failed:")
+        for document, page, error in failed:
+            print(f"  - {document} p{page}: {error}")
+    return totals, failed
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract features from every page of a set of PDF drawings.")
+    parser.add_argument("target", help="Directory, PDF file or glob pattern (quote it, e.g. 'sheets/*.pdf')")
+    parser.add_argument("--store", default=STORE_ROOT, help="Parquet feature store directory")
+    parser.add_argument("-o", "--output", default=None,
+                        help=f"Also export a merged report from the store (.xlsx, .csv or .jsonl), e.g. {BATCH_EXCEL_FILE}")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--no-cache", action="store_true", help="Always re-parse pages instead of using the extraction cache")
+    parser.add_argument("--layers", metavar="DIR", help="Also write each page's layer PDFs to DIR/<file>_p<page>/")
+    parser.add_argument("--calibrate-widths", action="store_true",
+                        help="Pick the wall/window width cut-offs per page from its width histogram (same as PDF_EXTRACTOR_CALIBRATE=1)")
+    parser.add_argument("--ocg", action="append", metavar="PATTERN",
+                        help="Only extract drawings on PDF layers (OCGs) matching this name glob; repeatable (same as PDF_EXTRACTOR_OCGS)")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    instrumentation.enable_from_args(args)
+    if args.calibrate_widths:
+        os.environ[CALIBRATE_ENV] = "1" # read by every page load, including worker processes
+    if args.ocg:
+        os.environ[OCG_FILTER_ENV] = ";".join(args.ocg)
+
+    totals, failed = run_batch(args.target, args.store, workers=args.workers, use_cache=not args.no_cache,
+                               layers_root=args.layers, output=args.output)
+    if totals is None:
+        sys.exit(1)
+
+    print(f"\n{'Category':<30} | {'Count':<10} | {'Length':<20}")
+    print("-" * 65)
+    for cat in sorted(totals):
+        print(f"{cat:<30} | {totals[cat]['count']:<10} | {totals[cat]['length']:<20.2f}")
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import fitz # PyMuPDF
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from page_model import TEXT_FLAGS, classified_columns, scanned_text
+from generate_layer_pdf import classify_geometry_two_pass, generate_layer_pdfs
+from extract_pdf_data import write_report
+from synthetic_plan import ensure_plan, PLAN_DIR
+from instrumentation import peak_rss_mb
+
+# --- Configuration ---
+DEFAULT_SIZES = [1000, 10000, 100000]
+RESULTS_FILE = "benchmark_results.json"
+
+# Stages in pipeline order; each is timed separately in one worker process per input.
+# The parse stages always run, the ones after them can be skipped.
+PARSE_STAGES = ["open", "get_drawings", "get_text"]
+STAGES = PARSE_STAGES + ["text_scan", "classification", "door_binding", "excel_output", "pdf_output"]
+
+# --- Stage Runner ---
+def run_stages(pdf_path, skip=()):
+    """
+    Runs every pipeline stage over page 1 of pdf_path and returns the per-stage record.
+    Throughput is drawing items/s for geometry stages, text spans/s for text stages
+    and file bytes/s for opening the document.
+    """
+    stages = {}
+    counts = {"bytes": os.path.getsize(pdf_path)}
+    state = {}
+
+    def timed(name, unit, func):
+        if name in skip:
+            return
+        start = time.perf_counter()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            func()
+        stages[name] = {
+            "seconds": time.perf_counter() - start,
+            "unit": unit,
+            "peak_rss_mb": peak_rss_mb()
+        }
+
+    def open_page():
+        state["doc"] = fitz.open(pdf_path)
+        state["page"] = state["doc"][0]
+
+    def get_drawings():
+        state["shapes"] = state["page"].get_drawings()
+        counts["shapes"] = len(state["shapes"])
+        counts["items"] = sum(len(s.get("items", ())) for s in state["shapes"])
+
+    def get_text():
+        state["text"] = state["page"].get_text("dict", flags=TEXT_FLAGS)
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        timed("open", "bytes", open_page)
+        timed("get_drawings", "items", get_drawings)
+        timed("get_text", "spans", get_text)
+
+        rect = state["page"].rect
+        model = {
+            "file": pdf_path,
+            "page": 0,
+            "rect": (rect.x0, rect.y0, rect.x1, rect.y1),
+            "shapes": state["shapes"],
+            "text": state["text"]
+        }
+        # Counted here so the text stages can report spans/s
+        counts["spans"] = sum(len(l["spans"]) for b in state["text"]["blocks"] if b["type"] == 0 for l in b["lines"])
+
+        timed("text_scan", "spans", lambda: scanned_text(model))
+        timed("classification", "items", lambda: classified_columns(model))
+        timed("door_binding", "items", lambda: classify_geometry_two_pass(model["shapes"], classified_columns(model)))
+        timed("excel_output", "items", lambda: write_report(model, os.path.join(out_dir, "report.xlsx")))
+        timed("pdf_output", "items", lambda: generate_layer_pdfs(model, os.path.join(out_dir, "layers")))
+        state["doc"].close()
+
+    # Throughput is filled in last: item and span counts are only known after parsing
+    for stage in stages.values():
+        seconds = stage["seconds"]
+        stage["throughput"] = round(counts[stage["unit"]] / seconds, 1) if seconds > 0 else None
+        stage["seconds"] = round(seconds, 4)
+        stage["unit"] += "/s"
+
+    return {
+        "pdf": pdf_path,
+        "pdf_bytes": os.path.getsize(pdf_path),
+        "shapes": counts.get("shapes", 0),
+        "items": counts.get("items", 0),
+        "spans": counts.get("spans", 0),
+        "stages": stages,
+        "total_seconds": round(sum(stage["seconds"] for stage in stages.values()), 4),
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+def run_isolated(pdf_path, skip=()):
+    """
+    Benchmarks one input in a fresh interpreter so its peak RSS is not inflated by earlier runs.
+    """
+    cmd = [sys.executable, os.path.abspath(__file__), "--worker", pdf_path]
+    if skip:
+        cmd += ["--skip", ",".join(skip)]
+    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+# --- Main ---
+def main():
+    parser = argparse.ArgumentParser(description="Time every pipeline stage on synthetic floor plans of growing size.")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="Comma-separated drawing-item counts (e.g. 1000,10000,100000,1000000)")
+    parser.add_argument("--pdf", nargs="*", help="Benchmark these PDFs instead of synthetic plans")
+    parser.add_argument("--plan-dir", default=PLAN_DIR, help=f"Where synthetic plans are kept (default: {PLAN_DIR})")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip", default="", help=f"Comma-separated stages to skip ({', '.join(STAGES[len(PARSE_STAGES):])})")
+    parser.add_argument("-o", "--output", default=RESULTS_FILE, help=f"JSON results file (default: {RESULTS_FILE})")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    skip = [s for s in args.skip.split(",") if s]
+    unknown = set(skip) - set(STAGES[len(PARSE_STAGES):])
+    if unknown:
+        parser.error(f"Cannot skip: {', '.join(sorted(unknown))}")
+
+    if args.worker:
+        print(json.dumps(run_stages(args.worker, skip)))
+        return
+
+    if args.pdf:
+        inputs = [(None, path) for path in args.pdf]
+    else:
+        inputs = []
+        for size in (int(s) for s in args.sizes.split(",") if s):
+            print(f"Preparing synthetic plan with {size} items...")
+            inputs.append((size, ensure_plan(size, args.plan_dir, args.seed)))
+
+    runs = []
+    for size, path in inputs:
+        print(f"\nBenchmarking {path}...")
+        run = run_isolated(path, skip)
+        run["requested_items"] = size
+        runs.append(run)
+        print(f"{'Stage':<16} | {'Seconds':>9} | {'Throughput':>22} | {'Peak RSS (MB)':>13}")
+        print("-" * 70)
+        for name in STAGES:
+            if name in run["stages"]:
+                s = run["stages"][name]
+                print(f"{name:<16} | {s['seconds']:>9.3f} | {s['throughput'] or 0:>14.0f} {s['unit']:<7} | {s['peak_rss_mb'] or 0:>13.1f}")
+        print(f"Total {run['total_seconds']:.2f}s for {run['items']} items, {run['spans']} spans")
+
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "pymupdf": fitz.VersionBind,
+        "platform": platform.platform(),
+        "runs": runs
+    }
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nSaved results to {os.path.abspath(args.output)}")
+
+if __name__ == "__main__":
+    main()
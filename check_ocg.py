@@ -1,22 +1,47 @@
-import fitz
+import argparse
+import json
+from collections import Counter
 
-def check_ocg_presence(pdf_path):
-    doc = fitz.open(pdf_path)
-    page = doc[0]
-    shapes = page.get_drawings()
-    
-    count_with_ocg = 0
-    unique_ocgs = set()
+from extraction_cache import load_cached_page_model
+from page_model import classified_columns
+from shape_rules import OCG_MAP, ocg_entry
+
+def describe_mapping(ocg):
+    """
+    What the OCG layer map (shape_rules) does with drawings on one OCG.
+    """
+    i = ocg_entry(ocg)
+    if i < 0:
+        return "(shape rules)"
+    entry = OCG_MAP[i]
+    text = entry.get("category") or "(shape rules)"
+    if entry.get("when"):
+        text += f" when {json.dumps(entry['when'])}, else (shape rules)"
+    if entry.get("flag"):
+        text += f" [flag: {entry['flag']}]"
+    return text
+
+def check_ocg_presence(pdf_path, page_number=0):
+    model = load_cached_page_model(pdf_path, page_number, shapes=False)
     
-    for shape in shapes:
-        ocg = shape.get('ocg')
-        if ocg:
-            count_with_ocg += 1
-            unique_ocgs.add(ocg)
+    # PyMuPDF reports a drawing's Optional Content Group under the 'layer' key
+    layers = classified_columns(model)["layer"]
+    counts = Counter(ocg for ocg in layers if ocg)
+    count_with_ocg = sum(counts.values())
             
-    print(f"Total Shapes: {len(shapes)}")
+    print(f"Total Shapes: {len(layers)}")
     print(f"Shapes with OCG: {count_with_ocg}")
-    print(f"Unique OCGs found: {unique_ocgs}")
+    print(f"Unique OCGs found: {len(counts)}")
+
+    for ocg, count in counts.most_common():
+        print(f"  {count:>7}  {ocg:<60} -> {describe_mapping(ocg)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Shape counts per PDF layer (OCG) and the category each maps to.")
+    parser.add_argument("pdf", nargs="?", default="sample.pdf", help="Source PDF")
+    parser.add_argument("--page", type=int, default=1, help="1-based page number")
+    args = parser.parse_args()
+    check_ocg_presence(args.pdf, args.page - 1)
 
 if __name__ == "__main__":
-    check_ocg_presence("sample.pdf")
+    main()
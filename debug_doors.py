@@ -1,5 +1,7 @@
 import fitz
-from math import sqrt, isclose
+import numpy as np
+
+from spatial_index import EndpointIndex
 
 def analyze_doors():
     doc = fitz.open("sample.pdf")
@@ -44,26 +46,15 @@ def analyze_doors():
     print(f"Found {len(lines)} total Lines.")
     
     # Check Connectivity
-    connected_count = 0
-    tolerance = 1.0 # 1 unit tolerance
+    # A door leaf usually connects to one end of the arc; only lines that look
+    # like a door leaf (similar width to arc, < 0.70) are indexed.
+    leaf_ends = [(l_start.x, l_start.y) for (l_start, l_end, l_width) in lines if l_width < 0.70] + \
+                [(l_end.x, l_end.y) for (l_start, l_end, l_width) in lines if l_width < 0.70]
+    leaf_index = EndpointIndex(leaf_ends, tolerance=1.0) # 1 unit tolerance
     
-    for (a_start, a_end) in arcs:
-        # A door leaf usually connects to one end of the arc
-        found_connection = False
-        for (l_start, l_end, l_width) in lines:
-            # Check p1
-            if (abs(l_start.x - a_start.x) < tolerance and abs(l_start.y - a_start.y) < tolerance) or \
-               (abs(l_end.x - a_start.x) < tolerance and abs(l_end.y - a_start.y) < tolerance) or \
-               (abs(l_start.x - a_end.x) < tolerance and abs(l_start.y - a_end.y) < tolerance) or \
-               (abs(l_end.x - a_end.x) < tolerance and abs(l_end.y - a_end.y) < tolerance):
-                
-                # Check if this line looks like a door leaf (similar width to arc?)
-                if l_width < 0.70:
-                    found_connection = True
-                    break
-        
-        if found_connection:
-            connected_count += 1
+    arc_starts = np.array([(a_start.x, a_start.y) for (a_start, a_end) in arcs]).reshape(-1, 2)
+    arc_ends = np.array([(a_end.x, a_end.y) for (a_start, a_end) in arcs]).reshape(-1, 2)
+    connected_count = int(np.count_nonzero(leaf_index.touches(arc_starts) | leaf_index.touches(arc_ends)))
             
     print(f"Arcs connected to at least one thin line: {connected_count}")
 
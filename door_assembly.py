@@ -0,0 +1,155 @@
+import numpy as np
+
+from geometry import DOOR_TOLERANCE, FRAME_STUB_MAX_RATIO
+from geometry_kernel import CATEGORY_CODES
+from shape_rules import ocg_flags
+from spatial_index import EndpointIndex
+
+# --- Door Assembly ---
+# A door is rarely a single path: the swing arc is often split into several Bezier
+# pieces, the leaf may be a polyline, and short frame stubs hang off the leaf.
+# Doors are rebuilt as connected components of an endpoint graph over path ends
+# (start of items[0] and end of the last item, so multi-segment paths count once):
+#   arc  - every "Door (Swing)" path; arcs whose ends touch are joined
+#   leaf - a leaf candidate with an end touching an arc end
+#   stub - a leaf candidate touching a leaf end, at most FRAME_STUB_MAX_RATIO of that leaf long
+# Leaf candidates are LEAF_CATEGORIES lines, plus every straight path on an OCG whose
+# layer map entry carries DOOR_LAYER_FLAG: a door layer holds the leaves and stubs next
+# to the swings, drawn with whatever pen the drafter chose.
+# Stubs are one hop only, so hatching that happens to meet a leaf can't chain a whole
+# drawing into one door. Touching pairs come from EndpointIndex (KD-tree, same strict
+# tolerance test as everywhere else) and the components from scipy's connected_components
+# over the edge list, so the whole step is O(n log n) in the number of paths.
+
+ROLE_NONE = 0
+ROLE_ARC = 1
+ROLE_LEAF = 2
+ROLE_STUB = 3
+
+ASSEMBLY_CATEGORY = "Door (Assembly)"
+ARC_CATEGORY = "Door (Swing)"
+# Leaves and stubs are drawn with the door pen: the 0.25-0.70 "Standard Line" band the
+# original two-pass binding used. Thinner detail and hatching strokes never join a door.
+LEAF_CATEGORIES = ("Standard Line",)
+DOOR_LAYER_FLAG = "door"
+
+def _end_index(cols, ids):
+    """
+    EndpointIndex over both ends of the given shapes, owned by shape index.
+    """
+    return EndpointIndex(np.concatenate([cols["start"][ids], cols["end"][ids]]),
+                         np.concatenate([ids, ids]), tolerance=DOOR_TOLERANCE)
+
+def _touching(index, other):
+    """
+    (owner in index, owner in other) for every touching endpoint pair, self-pairs dropped.
+    """
+    pairs = index.pairs(other)
+    edges = np.stack([index.owners[pairs[:, 0]], other.owners[pairs[:, 1]]], axis=1) if len(pairs) \
+        else np.empty((0, 2), dtype=np.int64)
+    return edges[edges[:, 0] != edges[:, 1]]
+
+def find_door_assemblies(cols, exclude=None):
+    """
+    Groups door arcs, leaves and frame stubs into whole doors.
+    cols are geometry_kernel columns with a "code" entry (page_model.classified_columns);
+    shapes flagged in the optional exclude mask never join a door.
+    Returns a dict:
+      assembly   - (n,) assembly index per shape, -1 outside any door
+      role       - (n,) ROLE_* per shape
+      bbox       - (k, 4) combined bbox per assembly
+      leaf_width - (k,) estimated leaf width: the longest leaf, else the arc's radius (bbox side)
+      arcs, leaves, stubs - (k,) member counts
+    """
+    code = cols["code"]
+    n = len(code)
+    ends = cols["has_start"] & cols["has_end"]
+    # A rule table without these categories simply yields no doors
+    arc = ends & (code == CATEGORY_CODES.get(ARC_CATEGORY, -1))
+    thin = np.isin(code, [CATEGORY_CODES.get(name, -1) for name in LEAF_CATEGORIES])
+    if "layer" in cols:
+        thin |= ocg_flags(cols["layer"], DOOR_LAYER_FLAG) & ~cols["is_curve"]
+    thin &= ends
+    if exclude is not None:
+        arc &= ~exclude
+        thin &= ~exclude
+
+    role = np.zeros(n, dtype=np.int8)
+    arc_ids = np.flatnonzero(arc)
+    if not len(arc_ids):
+        return _assemblies(cols, np.full(n, -1, dtype=np.int64), role, 0)
+
+    arc_index = _end_index(cols, arc_ids)
+    thin_index = _end_index(cols, np.flatnonzero(thin))
+    arc_edges = arc_index.owners[arc_index.self_pairs()].reshape(-1, 2)
+    arc_edges = arc_edges[arc_edges[:, 0] != arc_edges[:, 1]]
+    leaf_edges = _touching(arc_index, thin_index)
+
+    leaf_ids = np.unique(leaf_edges[:, 1])
+    stub_edges = np.empty((0, 2), dtype=np.int64)
+    if len(leaf_ids):
+        stub_edges = _touching(_end_index(cols, leaf_ids), thin_index)
+        length = cols["length"]
+        short = length[stub_edges[:, 1]] <= FRAME_STUB_MAX_RATIO * length[stub_edges[:, 0]]
+        stub_edges = stub_edges[short & ~np.isin(stub_edges[:, 1], leaf_ids)]
+
+    role[arc_ids] = ROLE_ARC
+    role[stub_edges[:, 1]] = ROLE_STUB
+    role[leaf_ids] = ROLE_LEAF
+
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+    # Components over the member shapes; every arc is a member even when it touches nothing
+    edges = np.concatenate([arc_edges, leaf_edges, stub_edges])
+    members = np.flatnonzero(role)
+    local = np.full(n, -1, dtype=np.int64)
+    local[members] = np.arange(len(members))
+    graph = coo_matrix((np.ones(len(edges), dtype=np.int8), (local[edges[:, 0]], local[edges[:, 1]])),
+                       shape=(len(members), len(members)))
+    count, labels = connected_components(graph, directed=False)
+
+    assembly = np.full(n, -1, dtype=np.int64)
+    assembly[members] = labels
+    return _assemblies(cols, assembly, role, count)
+
+def _assemblies(cols, assembly, role, count):
+    members = np.flatnonzero(assembly >= 0)
+    labels = assembly[members]
+    bbox = np.zeros((count, 4), dtype=np.float64)
+    leaf_width = np.zeros(count, dtype=np.float64)
+    if count:
+        bbox[:, 0:2] = np.inf
+        bbox[:, 2:4] = -np.inf
+        np.minimum.at(bbox[:, 0:2], labels, cols["bbox"][members, 0:2])
+        np.maximum.at(bbox[:, 2:4], labels, cols["bbox"][members, 2:4])
+
+        # An arc's bbox is about one radius square, and the radius is the leaf width
+        is_arc = role[members] == ROLE_ARC
+        arc_box = np.zeros((count, 4), dtype=np.float64)
+        arc_box[:, 0:2] = np.inf
+        arc_box[:, 2:4] = -np.inf
+        np.minimum.at(arc_box[:, 0:2], labels[is_arc], cols["bbox"][members[is_arc], 0:2])
+        np.maximum.at(arc_box[:, 2:4], labels[is_arc], cols["bbox"][members[is_arc], 2:4])
+        radius = np.maximum(arc_box[:, 2] - arc_box[:, 0], arc_box[:, 3] - arc_box[:, 1])
+
+        is_leaf = role[members] == ROLE_LEAF
+        np.maximum.at(leaf_width, labels[is_leaf], cols["length"][members[is_leaf]])
+        leaf_width = np.where(leaf_width > 0, leaf_width, radius)
+
+    member_roles = role[members]
+    return {
+        "assembly": assembly,
+        "role": role,
+        "bbox": bbox,
+        "leaf_width": leaf_width,
+        "arcs": np.bincount(labels[member_roles == ROLE_ARC], minlength=count),
+        "leaves": np.bincount(labels[member_roles == ROLE_LEAF], minlength=count),
+        "stubs": np.bincount(labels[member_roles == ROLE_STUB], minlength=count)
+    }
+
+def assembly_rows(assemblies):
+    """
+    One detailed row (DETAILED_COLUMNS order) per door assembly, with the leaf width as its length.
+    """
+    for width, box in zip(assemblies["leaf_width"].tolist(), assemblies["bbox"].tolist()):
+        yield (ASSEMBLY_CATEGORY, "Assembly", width, box[0], box[1], box[2], box[3])
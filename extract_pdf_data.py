@@ -1,274 +1,117 @@
-#!/Users/alimran/Documents/pdf_extractor/venv/bin/python3
-import fitz # PyMuPDF
-import pandas as pd
-from math import sqrt, inf
+import argparse
 import os
 
+from geometry_kernel import CATEGORIES
+from page_model import reported_geometry, scanned_text, fixture_loops, width_thresholds, symbols, rooms, label_links
+from fixture_loops import loop_table_rows
+from width_calibration import threshold_rows
+from symbol_fingerprints import symbol_table_rows
+from rooms import room_table_rows
+from label_links import link_table_rows
+from text_labels import label_features
+from extraction_cache import load_cached_page_model, output_up_to_date, record_output
+from report_writer import StreamingReportWriter, LOOP_COLUMNS, WIDTH_COLUMNS, SYMBOL_COLUMNS, ROOM_COLUMNS, \
+    LINK_COLUMNS
+from feature_table import FeatureTable
+from instrumentation import stage
+
 # --- Configuration ---
 PDF_FILE = "sample.pdf"
 EXCEL_FILE = "blueprint_quantities.xlsx"
 
-# --- Utility: Quantify Shape ---
-def quantify_shape(shape):
+# --- Utility: Extract ALL Text ---
+def extract_all_text(model):
     """
-    Analyzes a shape to determine its length, classification, and bounding box.
-    Returns: (length, category, bbox) where bbox is (min_x, min_y, max_x, max_y)
+    Every non-empty span of the page as a (Text, Font, Size, X, Y) row.
     """
-    shape_type = shape.get('type')
-    width = shape.get('width', 0)
-    if width is None: width = 0
-    
-    category = "Other"
-    length = 0.0
-    
-    # Initialize BBox
-    min_x, min_y = inf, inf
-    max_x, max_y = -inf, -inf
-    
-    # Check for Curves (Doors/Basins)
-    is_curve = False
-    is_closed = False 
-    
-    # Start/End points for loop detection
-    start_p = None
-    end_p = None
-    
-    if shape_type == 's' and 'items' in shape: # Stroke path
-        items = shape['items']
-        
-        for i, item in enumerate(items):
-            operator = item[0]
-            
-            # Helper to update bbox with a point
-            def update_bbox(p):
-                nonlocal min_x, min_y, max_x, max_y
-                if p.x < min_x: min_x = p.x
-                if p.y < min_y: min_y = p.y
-                if p.x > max_x: max_x = p.x
-                if p.y > max_y: max_y = p.y
-
-            if operator == 'l':
-                p1, p2 = item[1], item[2]
-                seg_len = sqrt((p2.x - p1.x)**2 + (p2.y - p1.y)**2)
-                length += seg_len
-                if i == 0: start_p = p1
-                end_p = p2
-                update_bbox(p1)
-                update_bbox(p2)
-                
-            elif operator == 'c':
-                # Curve: ("c", p1, p2, p3, p4)
-                is_curve = True
-                p1, p4 = item[1], item[4] 
-                # Control points p2, p3 also define the curve's extent, but p1/p4 are anchors
-                # For simplicity in bbox, we include p2/p3 too
-                p2, p3 = item[2], item[3]
-                
-                seg_len = sqrt((p4.x - p1.x)**2 + (p4.y - p1.y)**2)
-                length += seg_len
-                if i == 0: start_p = p1
-                end_p = p4
-                for p in [p1, p2, p3, p4]:
-                    update_bbox(p)
-        
-        # Check for simple closure
-        if start_p and end_p and abs(start_p.x - end_p.x) < 1 and abs(start_p.y - end_p.y) < 1:
-             is_closed = True
+    return scanned_text(model)[0]
 
-    elif shape_type == 'r': # Rectangle
-        rect = shape.get('rect')
-        # rect is [x0, y0, x1, y1]
-        min_x, min_y, max_x, max_y = rect[0], rect[1], rect[2], rect[3]
-        
-        width_r = max_x - min_x
-        height_r = max_y - min_y
-        length = 2 * (abs(width_r) + abs(height_r)) 
-        
-    # Handle case where no points found (shouldn't happen for valid shapes)
-    if min_x == inf:
-        min_x, min_y, max_x, max_y = 0, 0, 0, 0
-        
-    bbox = (min_x, min_y, max_x, max_y)
-        
-    # --- CLASSIFICATION LOGIC ---
-    
-    # BASIN HEURISTIC
-    is_basin = False
-    if is_curve and is_closed and length < 200 and length > 10: 
-        is_basin = True
-        category = "Sanitary: Wash Basin (Est.)"
-
-    elif width >= 0.70:
-        category = "Wall"
-    
-    elif is_curve and width < 0.70 and not is_basin:
-        category = "Door (Swing)"
-        
-    elif width > 0 and width < 0.25:
-        category = "Window/Detail"
-        
-    elif width >= 0.25 and width < 0.70:
-        category = "Standard Line"
-
-    return length, category, bbox
-
-# --- Utility: Extract Specific Text Features ---
-def extract_text_features(page):
+# --- Page Extraction ---
+def page_feature_table(model):
     """
-    Scans text blocks for specific keywords.
+    Classifies every shape (vectorized) and text label of a parsed page model into a
+    FeatureTable in report order (Category, then Y_Min).
     """
-    text = page.get_text("dict")
-    features = []
-    
-    keywords = {
-        "WC": "Sanitary: Toilet/WC",
-        "TM": "Appliance: Washing Machine",
-        "TT": "Appliance: Tumble Dryer",
-        "DM": "Appliance: Dishwasher",
-        "KM": "Appliance: Combo Washer/Dryer",
-        "Kök": "Room: Kitchen",
-        "Bad": "Room: Bathroom", 
-        "Dusch": "Sanitary: Shower"
-    }
-    
-    for block in text["blocks"]:
-        if block["type"] == 0:
-            for line in block["lines"]:
-                for span in line["spans"]:
-                    txt = span["text"].strip()
-                    for key, cat in keywords.items():
-                        if key == txt or f" {key} " in f" {txt} ":
-                            features.append({
-                                "Category": cat,
-                                "Text": txt,
-                                "X": round(block['bbox'][0], 2),
-                                "Y": round(block['bbox'][1], 2),
-                                "Length": 0
-                            })
-                            # Break inner loop to avoid double counting same text for different keys
-                            break 
-                            
-    return features
-
-# --- Utility: Extract ALL Text ---
-def extract_all_text(page):
-    text_data = []
-    text_dict = page.get_text("dict")
-    
-    for block in text_dict["blocks"]:
-        if block["type"] == 0:
-            for line in block["lines"]:
-                for span in line["spans"]:
-                    txt = span["text"].strip()
-                    if txt:
-                        text_data.append({
-                            "Text": txt,
-                            "Font": span.get("font", ""),
-                            "Size": span.get("size", 0),
-                            "X": round(span["bbox"][0], 2),
-                            "Y": round(span["bbox"][1], 2)
-                        })
-    return text_data
-
-# --- Main Extraction ---
-def main():
-    if not os.path.exists(PDF_FILE):
-        print(f"Error: {PDF_FILE} not found.")
-        return
+    lengths, codes, bboxes, extra_rows = reported_geometry(model)
+    text_feats = label_features(scanned_text(model)[1], include_doors=False)
+    return FeatureTable.from_parts(lengths, codes, bboxes, CATEGORIES, text_feats, extra_rows)
 
-    print(f"Analyzing {PDF_FILE}...")
-    doc = fitz.open(PDF_FILE)
-    page = doc[0]
-    
-    # Data Containers
-    stats = {} 
-    detailed_features = []
-    
-    # 1. Shape Extraction
-    shapes = page.get_drawings()
-    
-    for shape in shapes:
-        length, category, bbox = quantify_shape(shape)
-        
-        # Update Summary Stats
-        if category not in stats:
-            stats[category] = {"count": 0, "length": 0.0}
-        stats[category]["count"] += 1
-        stats[category]["length"] += length
-        
-        # Store Detailed Data
-        detailed_features.append({
-            "Category": category,
-            "Type": "Geometry",
-            "Length": round(length, 2),
-            "X_Min": round(bbox[0], 2),
-            "Y_Min": round(bbox[1], 2),
-            "X_Max": round(bbox[2], 2),
-            "Y_Max": round(bbox[3], 2)
-        })
-        
-    # 2. Specific Feature Extraction (Text Based)
-    text_feats = extract_text_features(page)
-    for feat in text_feats:
-        cat = feat["Category"]
-        # Update Stats
-        if cat not in stats:
-             stats[cat] = {"count": 0, "length": 0.0}
-        stats[cat]["count"] += 1
-        
-        # Store Detailed Data
-        detailed_features.append({
-            "Category": cat,
-            "Type": "Text Label",
-            "Length": 0,
-            "X_Min": feat["X"],
-            "Y_Min": feat["Y"],
-            "X_Max": feat["X"], # Text location is a point for simplicity in this view
-            "Y_Max": feat["Y"]
-        })
-            
-    # 3. Extract ALL Text
-    all_text = extract_all_text(page)
-    print(f"Extracted {len(all_text)} text elements.")
-    print(f"Extracted {len(detailed_features)} geometric/feature elements.")
+def page_feature_rows(model):
+    """
+    Yields the page's detailed rows in report order (Category, then Y_Min).
+    """
+    return page_feature_table(model).rows()
 
-    doc.close()
-    
-    # --- Output Results ---
-    
-    # Sheet 1: Summary Counts
-    summary_results = []
+# --- Output Results ---
+def write_report(model, excel_file):
+    """
+    Streams the report for one page model; the format follows the file extension (.xlsx, .csv, .jsonl).
+    """
+    print(f"Writing {excel_file}...")
+    with stage("excel_report") as st, \
+            StreamingReportWriter(excel_file, extra_sheets=[("Fixture Loops", LOOP_COLUMNS),
+                                                            ("Rooms", ROOM_COLUMNS),
+                                                            ("Label Links", LINK_COLUMNS),
+                                                            ("Symbols", SYMBOL_COLUMNS),
+                                                            ("Width Thresholds", WIDTH_COLUMNS)]) as writer:
+        for row in page_feature_rows(model):
+            writer.write_feature(row)
+        for row in extract_all_text(model):
+            writer.write_text(row)
+        for row in loop_table_rows(fixture_loops(model)):
+            writer.write_extra("Fixture Loops", row)
+        for row in room_table_rows(rooms(model), scanned_text(model)[1]):
+            writer.write_extra("Rooms", row)
+        links, features = label_links(model)
+        for row in link_table_rows(links, features, scanned_text(model)[1], rooms(model)["point_room"]):
+            writer.write_extra("Label Links", row)
+        for row in symbol_table_rows(symbols(model)):
+            writer.write_extra("Symbols", row)
+        for row in threshold_rows(width_thresholds(model)):
+            writer.write_extra("Width Thresholds", row)
+        st.add_items(writer.feature_count + writer.text_count)
+        st.set_categories({cat: count for cat, count, _ in writer.summary_rows()})
+    
+    print(f"Extracted {writer.text_count} text elements.")
+    print(f"Extracted {writer.feature_count} geometric/feature elements.")
+    
+    # Sheet 1: Summary Counts (from the writer's running aggregates)
     print("\nExtraction Summary:")
     print(f"{'Category':<30} | {'Count':<10} | {'Length':<20}")
     print("-" * 65)
-    
-    for cat in sorted(stats.keys()):
-        data = stats[cat]
-        print(f"{cat:<30} | {data['count']:<10} | {data['length']:<20.2f}")
-        summary_results.append({
-            "Category": cat,
-            "Count": data['count'],
-            "Total Length": data['length']
-        })
+    for cat, count, length in writer.summary_rows():
+        print(f"{cat:<30} | {count:<10} | {length:<20.2f}")
         
-    df_summary = pd.DataFrame(summary_results)
-    df_detailed = pd.DataFrame(detailed_features)
-    df_text = pd.DataFrame(all_text)
-    
-    # Sort detailed by Category for better readability
-    df_detailed = df_detailed.sort_values(by=['Category', 'Y_Min'])
-    
-    # Save to Excel
-    print("Saving to Excel (this might take a moment)...")
-    with pd.ExcelWriter(EXCEL_FILE, engine='openpyxl') as writer:
-        df_summary.to_excel(writer, sheet_name='Summary', index=False)
-        df_detailed.to_excel(writer, sheet_name='Detailed Features', index=False)
-        df_text.to_excel(writer, sheet_name='All Text', index=False)
-        
-    print(f"\nSaved results to {os.path.abspath(EXCEL_FILE)}")
+    print(f"\nSaved results to {os.path.abspath(excel_file)}")
     print(" - 'Summary': Feature counts")
     print(" - 'Detailed Features': Coordinates for every wall, door, etc.")
     print(" - 'All Text': Complete text extraction")
+    print(" - 'Fixture Loops': Perimeter and area of basins drawn as several paths")
+    print(" - 'Rooms': Area and perimeter of each room rebuilt from the walls, with the labels inside it")
+    print(" - 'Label Links': Each door/fixture label, with the nearest door assembly for door labels")
+    print(" - 'Symbols': Distinct door/fixture symbols and how often each is repeated")
+    print(" - 'Width Thresholds': Wall/window width cut-offs used (default or calibrated)")
+
+# --- Main Extraction ---
+def main():
+    parser = argparse.ArgumentParser(description="Write the feature report for one page of a PDF drawing.")
+    parser.add_argument("pdf", nargs="?", default=PDF_FILE, help="Source PDF")
+    parser.add_argument("--page", type=int, default=1, help="1-based page number")
+    parser.add_argument("-o", "--output", default=EXCEL_FILE, help=f"Report workbook (default: {EXCEL_FILE})")
+    parser.add_argument("--force", action="store_true", help="Rewrite the output even when it is up to date")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.pdf):
+        print(f"Error: {args.pdf} not found.")
+        return
+
+    print(f"Analyzing {args.pdf}...")
+    model = load_cached_page_model(args.pdf, args.page - 1, shapes=False)
+    if not args.force and output_up_to_date(model, args.output):
+        print(f"{args.output} is up to date (unchanged drawing, rules and code); pass --force to rewrite it.")
+        return
+    write_report(model, args.output)
+    record_output(model, args.output)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
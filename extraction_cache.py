@@ -0,0 +1,319 @@
+import fitz # PyMuPDF
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import re
+import sys
+import time
+
+import geometry
+from text_labels import LABEL_RULES
+from shape_rules import RULES, OCG_MAP
+from width_calibration import calibration_enabled
+from page_model import build_page_model, build_streamed_page_model, without_shapes, ocg_patterns
+from instrumentation import stage
+
+# --- Configuration ---
+CACHE_DIR = os.environ.get("PDF_EXTRACTOR_CACHE", ".extraction_cache")
+MAX_CACHE_MB = int(os.environ.get("PDF_EXTRACTOR_CACHE_MAX_MB", "2048"))
+
+# Bump whenever the parse or classification output changes shape or meaning
+CACHE_FORMAT_VERSION = 5
+
+# --- Content-Addressed Extraction Cache ---
+# Entries are pickled page models stored under a key derived from:
+#   * the page content: content streams, the page object, and every object its /Resources
+#     reach by indirect reference (fonts, XObjects, ExtGStates, colour spaces, OCGs...)
+#   * the OCG filter (PDF_EXTRACTOR_OCGS), for both kinds of entry
+#   * the heuristic thresholds in geometry.py, the shape rules and layer map, the label table and
+#     whether widths are calibrated per page (light entries only; the calibrated
+#     cut-offs themselves are stored in the entry)
+#   * the PyMuPDF version and CACHE_FORMAT_VERSION
+# Two kinds of entry exist per page:
+#   "model" - the full page model with drawing dicts (needed to re-draw layer PDFs)
+#   "light" - classified columns + scanned text, no drawings (enough for every tabular output)
+# Least-recently-used entries are evicted once the cache grows past MAX_CACHE_MB.
+
+def heuristic_config():
+    """
+    The thresholds, shape rules and label rules that change classification results; part of every light-entry key.
+    """
+    return {
+        "wall_min_width": geometry.WALL_MIN_WIDTH,
+        "window_max_width": geometry.WINDOW_MAX_WIDTH,
+        "basin_min_perimeter": geometry.BASIN_MIN_PERIMETER,
+        "basin_max_perimeter": geometry.BASIN_MAX_PERIMETER,
+        "closure_tolerance": geometry.CLOSURE_TOLERANCE,
+        "door_tolerance": geometry.DOOR_TOLERANCE,
+        "shape_rules": RULES,
+        "layer_map": OCG_MAP,
+        "ocgs": ocg_patterns(),
+        "calibrate_widths": calibration_enabled(),
+        "label_rules": LABEL_RULES
+    }
+
+_REFERENCE = re.compile(r"(\d+) 0 R\b")
+_PARENT = re.compile(r"/Parent\s+\d+ 0 R\b")
+
+def _references(source):
+    # /Parent leads back up to the page tree, not into the resources
+    return [int(xref) for xref in _REFERENCE.findall(_PARENT.sub("", source))]
+
+def _page_resources(doc, page):
+    """
+    xrefs the page's /Resources refer to directly (inherited from the page tree when the
+    page has none of its own).
+    """
+    xref = page.xref
+    while xref:
+        kind, value = doc.xref_get_key(xref, "Resources")
+        if kind in ("xref", "dict"):
+            return _references(value)
+        kind, value = doc.xref_get_key(xref, "Parent")
+        xref = _references(value)[0] if kind == "xref" else 0
+    return []
+
+def page_content_hash(page):
+    """
+    Hashes everything that determines a page's drawings and text, without parsing it:
+    the content streams, the page object and every object reachable from its resources.
+    Reusing a resource object edited in place (an ExtGState's /LW, say) is a miss.
+    """
+    doc = page.parent
+    h = hashlib.sha256()
+    h.update(page.read_contents())
+    h.update(doc.xref_object(page.xref, compressed=True).encode())
+    seen = set()
+    todo = _page_resources(doc, page)
+    while todo:
+        xref = todo.pop()
+        if xref in seen or not 0 < xref < doc.xref_length():
+            continue
+        seen.add(xref)
+        source = doc.xref_object(xref, compressed=True)
+        h.update(f"{xref}:".encode())
+        h.update(source.encode())
+        if doc.xref_is_stream(xref):
+            h.update(doc.xref_stream_raw(xref) or b"")
+        todo.extend(_references(source))
+    return h.hexdigest()
+
+def cache_key(content_hash, kind, config=None):
+    payload = {
+        "page": content_hash,
+        "kind": kind,
+        "config": config,
+        "pymupdf": fitz.VersionBind,
+        "format": CACHE_FORMAT_VERSION
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+class ExtractionCache:
+    """
+    A directory of pickled entries named by key, with size-bounded LRU eviction.
+    Recency is tracked through file mtimes, which are refreshed on every hit.
+    """
+
+    def __init__(self, root=CACHE_DIR, max_mb=MAX_CACHE_MB):
+        self.root = root
+        self.max_bytes = max_mb * 1024 * 1024
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.root, f"{key}.pkl")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+        os.utime(path)
+        return value
+
+    def put(self, key, value):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path) # atomic, so concurrent workers never see half an entry
+        self.evict()
+
+    def entries(self):
+        """
+        Returns [(path, size_bytes, last_used)] sorted from least to most recently used.
+        """
+        entries = []
+        for name in os.listdir(self.root):
+            if not name.endswith(".pkl"):
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((path, st.st_size, st.st_mtime))
+        return sorted(entries, key=lambda e: e[2])
+
+    def evict(self, max_bytes=None):
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = self.entries()
+        total = sum(e[1] for e in entries)
+        removed = 0
+        for path, size, _ in entries:
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self):
+        return self.evict(max_bytes=0)
+
+# --- Cached Page Loading ---
+def cached_page_model(page, file_path=None, shapes=True, cache=None):
+    """
+    Returns the page model for a fitz.Page, parsing only on a cache miss.
+    shapes=False returns the light model (columns + text), which is all the
+    Excel/CSV/Parquet outputs need and loads much faster.
+    """
+    if cache is None:
+        cache = ExtractionCache()
+    file_path = file_path if file_path is not None else page.parent.name
+    content_hash = page_content_hash(page)
+
+    if not shapes:
+        light_key = cache_key(content_hash, "light", heuristic_config())
+        light = cache.get(light_key)
+        if light is not None:
+            light["file"] = file_path
+            light["cache_key"] = light_key
+            return light
+
+        # Light requests don't populate the (much larger) full-model entry, and never
+        # hold the page's drawing dicts: the drawings are streamed and classified in chunks
+        light = without_shapes(build_streamed_page_model(page, file_path))
+        light["cache_key"] = light_key
+        cache.put(light_key, light)
+        return light
+
+    # Full entries hold raw drawings, which only the OCG filter changes
+    patterns = ocg_patterns()
+    model_key = cache_key(content_hash, "model", {"ocgs": patterns} if patterns else None)
+    model = cache.get(model_key)
+    if model is None:
+        model = build_page_model(page, file_path)
+        cache.put(model_key, model)
+    model["file"] = file_path
+    return model
+
+def load_cached_page_model(pdf_path, page_number=0, shapes=True, cache=None):
+    """
+    Cached counterpart of page_model.load_page_model.
+    """
+    with stage("load_page"), fitz.open(pdf_path) as doc:
+        return cached_page_model(doc[page_number], pdf_path, shapes=shapes, cache=cache)
+
+# --- Up-to-Date Outputs ---
+# With the page parse cached, a rerun's time goes into writing the report (openpyxl takes
+# seconds on a large page). A tabular output is fully determined by the light entry it
+# was written from and by the code that wrote it, so after writing one its stamp is kept
+# under <cache>/outputs/: the entry key, file and page, a hash of the tool's loaded
+# modules, and the output's size and mtime. A rerun whose stamp still matches the file on
+# disk skips the writer; editing or deleting the output, the drawing, the rules or the
+# code all invalidate it.
+_code_hash = None
+
+def code_fingerprint():
+    """
+    Hash of the source of this tool's modules loaded in this process (computed once).
+    """
+    global _code_hash
+    if _code_hash is None:
+        here = os.path.dirname(os.path.abspath(__file__))
+        h = hashlib.sha256()
+        for name, module in sorted(sys.modules.items()):
+            path = getattr(module, "__file__", None)
+            if path and path.endswith(".py") and os.path.dirname(os.path.abspath(path)) == here:
+                h.update(name.encode())
+                with open(path, "rb") as f:
+                    h.update(f.read())
+        _code_hash = h.hexdigest()
+    return _code_hash
+
+def _output_stamp(model, output_path):
+    return hashlib.sha256(json.dumps({
+        "entry": model["cache_key"],
+        "file": os.path.abspath(model["file"]),
+        "page": model["page"],
+        "output": os.path.abspath(output_path),
+        "code": code_fingerprint()
+    }, sort_keys=True).encode()).hexdigest()
+
+def _stamp_path(cache, output_path):
+    name = hashlib.sha256(os.path.abspath(output_path).encode()).hexdigest()
+    return os.path.join(cache.root, "outputs", f"{name}.json")
+
+def output_up_to_date(model, output_path, cache=None):
+    """
+    True when output_path was written from this cached model by the current code and
+    hasn't changed since. Models that didn't come from the cache are never up to date.
+    """
+    if "cache_key" not in model or not os.path.exists(output_path):
+        return False
+    cache = cache or ExtractionCache()
+    try:
+        with open(_stamp_path(cache, output_path)) as f:
+            stamp = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return False
+    st = os.stat(output_path)
+    return stamp == {"stamp": _output_stamp(model, output_path), "size": st.st_size, "mtime": st.st_mtime_ns}
+
+def record_output(model, output_path, cache=None):
+    """
+    Stamps a freshly written output (see output_up_to_date).
+    """
+    if "cache_key" not in model:
+        return
+    cache = cache or ExtractionCache()
+    path = _stamp_path(cache, output_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    st = os.stat(output_path)
+    with open(path, "w") as f:
+        json.dump({"stamp": _output_stamp(model, output_path), "size": st.st_size, "mtime": st.st_mtime_ns}, f)
+
+# --- CLI ---
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or clear the extraction cache.")
+    parser.add_argument("command", choices=["info", "list", "clear", "prune"])
+    parser.add_argument("--dir", default=CACHE_DIR, help=f"Cache directory (default: {CACHE_DIR})")
+    parser.add_argument("--max-mb", type=int, default=MAX_CACHE_MB, help="Size limit used by 'prune'")
+    args = parser.parse_args()
+
+    cache = ExtractionCache(args.dir, args.max_mb)
+    entries = cache.entries()
+
+    if args.command == "info":
+        total = sum(e[1] for e in entries)
+        print(f"Cache: {os.path.abspath(args.dir)}")
+        print(f"Entries: {len(entries)}")
+        print(f"Size: {total / 1024 / 1024:.1f} MB of {args.max_mb} MB")
+    elif args.command == "list":
+        for path, size, last_used in reversed(entries):
+            stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(last_used))
+            print(f"{stamp}  {size / 1024 / 1024:8.1f} MB  {os.path.basename(path)}")
+    elif args.command == "clear":
+        print(f"Removed {cache.clear()} entries.")
+    elif args.command == "prune":
+        print(f"Removed {cache.evict()} entries.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,578 @@
+import argparse
+import hmac
+import http.client
+import io
+import json
+import os
+import queue
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import redirect_stdout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- Configuration ---
+def _default_socket():
+    """
+    daemon.sock in the user's runtime dir ($XDG_RUNTIME_DIR), else in a per-user temp dir.
+    """
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime and os.path.isdir(runtime):
+        return os.path.join(runtime, "pdf-extractor", "daemon.sock")
+    return os.path.join(tempfile.gettempdir(), f"pdf-extractor-{os.getuid()}", "daemon.sock")
+
+# A path (optionally "unix:/path") for a Unix socket, or "host:port" for localhost HTTP
+DAEMON_ADDRESS = os.environ.get("PDF_EXTRACTOR_DAEMON") or _default_socket()
+# Shared secret sent as "Authorization: Bearer <token>"; required when listening on TCP
+DAEMON_TOKEN = os.environ.get("PDF_EXTRACTOR_DAEMON_TOKEN")
+DAEMON_OUTPUT_ROOT = "daemon_output"
+MAX_QUEUED_JOBS = 100 # submissions beyond this many waiting jobs are refused (HTTP 503)
+MAX_FINISHED_JOBS = 1000 # finished jobs kept for status/result retrieval
+MAX_REQUEST_BYTES = 65536 # larger POST bodies are refused unread (HTTP 413)
+
+OUTPUTS = ("report", "sheets", "layers", "layered", "store")
+DEFAULT_OUTPUTS = ("report",)
+
+# --- Warm Extraction Daemon ---
+# Every script run pays for importing PyMuPDF, NumPy, SciPy and openpyxl before it does
+# any work, which dominates small sheets. `serve` starts a long-running process with a
+# pool of worker processes that import the extractors once and then take jobs:
+#   POST   /jobs        {"pdf": path, "pages": [1, 2] (default: all), "outputs": [...],
+#                        "output_dir": dir (default: daemon_output/<job id>)}
+#   GET    /jobs        every known job's status
+#   GET    /jobs/<id>   status, and the result (files written, per-page totals) once done
+#   DELETE /jobs/<id>   cancels a job that has not started yet
+#   GET    /status      workers, queue length and job counts
+# Outputs are the run_pipeline.py outputs: report, sheets, layers (one PDF per layer),
+# layered (one PDF with OCGs) and store (Parquet feature store).
+# At most --workers jobs run at once (one process each, pages in order). Up to
+# MAX_QUEUED_JOBS more wait in FIFO order. Pages go through the extraction cache like any
+# other run. A job reads any PDF and writes anywhere the daemon user can, so only the
+# daemon user may submit: the default is a 0600 Unix socket in a 0700 directory, and TCP
+# (localhost only) needs a shared token. Requests whose Host isn't the configured address
+# or POSTs that aren't application/json are refused, which stops browsers from reaching
+# the daemon through cross-site form posts or DNS rebinding. The module imports nothing
+# heavy, so the client subcommands (submit, status, wait) start instantly.
+
+# --- Worker Side ---
+def _warm_worker():
+    """
+    Pool initializer: pays the import cost once per worker process.
+    """
+    import run_pipeline # noqa: F401 (imports fitz, numpy, scipy, openpyxl and every extractor)
+
+def _ping():
+    return os.getpid()
+
+def page_outputs(output_dir, stem, page, outputs):
+    """
+    Output paths for one page: {output name: path}.
+    """
+    prefix = os.path.join(output_dir, f"{stem}_p{page}")
+    paths = {
+        "report": f"{prefix}_quantities.xlsx",
+        "sheets": f"{prefix}_separated.xlsx",
+        "layers": f"{prefix}_layers",
+        "layered": f"{prefix}_layers.pdf",
+        "store": os.path.join(output_dir, "feature_store")
+    }
+    return {name: paths[name] for name in outputs}
+
+def run_job(request):
+    """
+    Worker entry point: extracts the requested pages of one document.
+    Returns {"pages": {page: {"outputs": {...}, "totals": {category: {count, length}}}}, "log": text}.
+    """
+    import fitz
+    from extraction_cache import load_cached_page_model
+    from extract_pdf_data import page_feature_table
+    from generate_layer_pdf import generate_layer_pdfs
+    from run_pipeline import run_pipeline
+
+    pdf = request["pdf"]
+    outputs = request["outputs"]
+    output_dir = request["output_dir"]
+    os.makedirs(output_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(pdf))[0]
+
+    with fitz.open(pdf) as doc:
+        page_count = doc.page_count
+    pages = request.get("pages") or list(range(1, page_count + 1))
+    bad = [p for p in pages if not 1 <= p <= page_count]
+    if bad:
+        raise ValueError(f"{pdf} has {page_count} pages; no page {bad[0]}")
+
+    log = io.StringIO()
+    results = {}
+    with redirect_stdout(log):
+        for page in pages:
+            paths = page_outputs(output_dir, stem, page, outputs)
+            model = load_cached_page_model(pdf, page - 1, shapes="layers" in paths or "layered" in paths)
+            run_pipeline(
+                model,
+                excel_file=paths.get("report"),
+                separated_file=paths.get("sheets"),
+                output_dir=None,
+                store_root=paths.get("store"),
+                layered_file=paths.get("layered")
+            )
+            if "layers" in paths:
+                # Jobs already have a process each; render the layers in-process
+                generate_layer_pdfs(model, paths["layers"], workers=1)
+            results[page] = {"outputs": paths, "totals": page_feature_table(model).category_totals()}
+    return {"pages": results, "log": log.getvalue()}
+
+# --- Job Table ---
+class Job:
+    """
+    One submitted extraction; status goes queued -> running -> done | failed (or cancelled).
+    """
+
+    def __init__(self, request):
+        self.id = uuid.uuid4().hex[:12]
+        self.request = request
+        self.status = "queued"
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.error = None
+
+    def to_dict(self, with_result=False):
+        info = {
+            "id": self.id,
+            "status": self.status,
+            "pdf": self.request["pdf"],
+            "pages": self.request.get("pages"),
+            "outputs": self.request["outputs"],
+            "output_dir": self.request["output_dir"],
+            "submitted": self.submitted,
+            "started": self.started,
+            "finished": self.finished
+        }
+        if self.error:
+            info["error"] = self.error
+        if with_result and self.result is not None:
+            info["result"] = self.result
+        return info
+
+class ExtractionService:
+    """
+    The warm worker pool plus the job table. One dispatcher thread per worker takes
+    jobs from the FIFO queue, so a job is "running" exactly while a worker has it.
+    """
+
+    def __init__(self, workers=None, max_queued=MAX_QUEUED_JOBS, output_root=DAEMON_OUTPUT_ROOT):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queued = max_queued
+        self.output_root = output_root
+        self.jobs = {}
+        self.finished = []
+        self.pending = queue.Queue()
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.pool = self._start_pool()
+        self.dispatchers = [threading.Thread(target=self._dispatch, name=f"dispatch-{i}", daemon=True)
+                            for i in range(self.workers)]
+        for thread in self.dispatchers:
+            thread.start()
+
+    def _start_pool(self):
+        pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+        # Start every worker now rather than on the first job
+        for future in [pool.submit(_ping) for _ in range(self.workers)]:
+            future.result()
+        return pool
+
+    def _restart_pool(self, broken):
+        """
+        Replaces a pool whose worker died (segfault, OOM kill); the first dispatcher to
+        notice does it, the others pick up the new pool.
+        """
+        with self.lock:
+            if self.pool is not broken:
+                return
+            broken.shutdown(wait=False, cancel_futures=True)
+            self.pool = self._start_pool()
+
+    def validate(self, request):
+        """
+        Normalizes a job request and raises ValueError when it can't be run.
+        """
+        if not isinstance(request, dict) or not isinstance(request.get("pdf"), str):
+            raise ValueError("A job needs a \"pdf\" path")
+        pdf = os.path.abspath(request["pdf"])
+        if not os.path.isfile(pdf):
+            raise ValueError(f"{pdf} not found")
+        outputs = request.get("outputs") or list(DEFAULT_OUTPUTS)
+        if not isinstance(outputs, list) or not all(isinstance(name, str) for name in outputs):
+            raise ValueError("\"outputs\" must be a list of output names")
+        unknown = [name for name in outputs if name not in OUTPUTS]
+        if unknown:
+            raise ValueError(f"Unknown output {unknown[0]} (one of {', '.join(OUTPUTS)})")
+        pages = request.get("pages")
+        if pages is not None and (not isinstance(pages, list) or not all(isinstance(p, int) for p in pages)):
+            raise ValueError("\"pages\" must be a list of 1-based page numbers")
+        return {"pdf": pdf, "pages": pages, "outputs": list(outputs), "output_dir": request.get("output_dir")}
+
+    def submit(self, request):
+        request = self.validate(request)
+        with self.lock:
+            if self.pending.qsize() >= self.max_queued:
+                return None
+            job = Job(request)
+            if not job.request["output_dir"]:
+                job.request["output_dir"] = os.path.join(self.output_root, job.id)
+            job.request["output_dir"] = os.path.abspath(job.request["output_dir"])
+            self.jobs[job.id] = job
+        self.pending.put(job)
+        return job
+
+    def cancel(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.status != "queued":
+                return False
+            job.status = "cancelled"
+            self._finish(job)
+            return True
+
+    def _finish(self, job):
+        job.finished = time.time()
+        self.finished.append(job.id)
+        while len(self.finished) > MAX_FINISHED_JOBS:
+            self.jobs.pop(self.finished.pop(0), None)
+
+    def _dispatch(self):
+        while True:
+            job = self.pending.get()
+            if job is None:
+                return
+            with self.lock:
+                if job.status != "queued":
+                    continue
+                job.status = "running"
+                job.started = time.time()
+            pool = self.pool
+            try:
+                result = pool.submit(run_job, job.request).result()
+                status, error = "done", None
+            except BrokenProcessPool:
+                # Only this job is lost; later jobs run on a fresh pool
+                result, status = None, "failed"
+                error = "Worker process died while running the job"
+                self._restart_pool(pool)
+            except Exception as e:
+                result, status = None, "failed"
+                error = "".join(traceback.format_exception_only(type(e), e)).strip()
+            with self.lock:
+                job.result = result
+                job.status = status
+                job.error = error
+                self._finish(job)
+
+    def status(self):
+        with self.lock:
+            counts = {}
+            for job in self.jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "pid": os.getpid(),
+            "workers": self.workers,
+            "queued": self.pending.qsize(),
+            "max_queued": self.max_queued,
+            "uptime": time.time() - self.started,
+            "jobs": counts
+        }
+
+    def close(self):
+        for _ in self.dispatchers:
+            self.pending.put(None)
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+# --- HTTP Front End ---
+class DaemonHandler(BaseHTTPRequestHandler):
+    service = None # set by make_server
+    hosts = () # Host header values the daemon answers to, set by make_server
+    token = None # required bearer token, set by make_server
+
+    def _send(self, code, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _job_id(self):
+        parts = self.path.strip("/").split("/")
+        return parts[1] if len(parts) == 2 and parts[0] == "jobs" else None
+
+    def _refused(self):
+        """
+        Sends an error and returns True unless the request may talk to the daemon.
+        """
+        if self.headers.get("Host", "") not in self.hosts:
+            self._send(403, {"error": "Unexpected Host header"})
+            return True
+        if self.token is not None:
+            scheme, _, given = self.headers.get("Authorization", "").partition(" ")
+            if scheme != "Bearer" or not hmac.compare_digest(given.encode(), self.token.encode()):
+                self._send(401, {"error": "Missing or wrong token"})
+                return True
+        return False
+
+    def do_GET(self):
+        if self._refused():
+            return
+        if self.path == "/status":
+            return self._send(200, self.service.status())
+        with self.service.lock:
+            if self.path.rstrip("/") == "/jobs":
+                info = {"jobs": [job.to_dict() for job in self.service.jobs.values()]}
+            else:
+                job = self.service.jobs.get(self._job_id())
+                info = job.to_dict(with_result=True) if job is not None else None
+        if info is None:
+            return self._send(404, {"error": "No such job"})
+        return self._send(200, info)
+
+    def do_POST(self):
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+        if not 0 <= length <= MAX_REQUEST_BYTES:
+            self.close_connection = True
+            return self._send(413, {"error": f"Request bodies are at most {MAX_REQUEST_BYTES} bytes"})
+        # Read the body before answering so a refused client still gets the response
+        body = self.rfile.read(length)
+        if self._refused():
+            return
+        if self.path.rstrip("/") != "/jobs":
+            return self._send(404, {"error": "Unknown endpoint"})
+        if self.headers.get_content_type() != "application/json":
+            return self._send(415, {"error": "Jobs must be posted as application/json"})
+        try:
+            job = self.service.submit(json.loads(body or b"{}"))
+        except ValueError as e: # json.JSONDecodeError is a ValueError too
+            return self._send(400, {"error": str(e)})
+        if job is None:
+            return self._send(503, {"error": f"Queue full ({self.service.max_queued} jobs waiting)"})
+        return self._send(202, job.to_dict())
+
+    def do_DELETE(self):
+        if self._refused():
+            return
+        if self.service.cancel(self._job_id()):
+            return self._send(200, {"id": self._job_id(), "status": "cancelled"})
+        return self._send(409, {"error": "Only queued jobs can be cancelled"})
+
+    def address_string(self):
+        # Unix socket peers have no address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        print(f"[{time.strftime('%H:%M:%S')}] {self.address_string()} {format % args}", file=sys.stderr)
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        # The socket's directory is user-only too, so there is no window before the chmod
+        directory = os.path.dirname(os.path.abspath(self.server_address))
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        info = os.stat(directory)
+        if info.st_uid != os.getuid() or info.st_mode & 0o077:
+            raise PermissionError(f"{directory} must be owned by and only open to the daemon user")
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+        super().server_bind()
+        os.chmod(self.server_address, 0o600)
+
+def parse_address(address):
+    """
+    ("unix", path) or ("tcp", (host, port)). Anything holding a path separator, naming an
+    existing file or not ending in ":<port>" is a socket path (daemon.sock, run/d.sock).
+    """
+    if address.startswith("unix:"):
+        return "unix", address[5:]
+    host, _, port = address.rpartition(":")
+    if "/" in address or os.sep in address or os.path.exists(address) or not port.isdigit():
+        return "unix", address
+    return "tcp", (host.strip("[]") or "127.0.0.1", int(port))
+
+def host_header(address):
+    """
+    The Host header a client sends to the daemon at address (http.client's default).
+    """
+    kind, where = parse_address(address)
+    if kind == "unix":
+        return "localhost"
+    host, port = where
+    return f"[{host}]:{port}" if ":" in host else f"{host}:{port}"
+
+def make_server(service, address=DAEMON_ADDRESS, token=DAEMON_TOKEN):
+    DaemonHandler.service = service
+    DaemonHandler.token = token or None
+    DaemonHandler.hosts = (host_header(address),)
+    kind, where = parse_address(address)
+    if kind == "unix":
+        return UnixHTTPServer(where, DaemonHandler)
+    if where[0] not in ("127.0.0.1", "localhost", "::1"):
+        raise ValueError("The daemon only listens on localhost")
+    if not token:
+        raise ValueError("Listening on TCP needs a token (--token or PDF_EXTRACTOR_DAEMON_TOKEN)")
+    return ThreadingHTTPServer(where, DaemonHandler)
+
+# --- Client ---
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.unix_path)
+
+def request(method, path, payload=None, address=DAEMON_ADDRESS, timeout=30, token=DAEMON_TOKEN):
+    """
+    Sends one request to the daemon. Returns (HTTP status, decoded JSON body).
+    """
+    kind, where = parse_address(address)
+    conn = _UnixConnection(where, timeout) if kind == "unix" else http.client.HTTPConnection(*where, timeout=timeout)
+    try:
+        body = json.dumps(payload).encode() if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body else {}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        return response.status, json.loads(response.read() or b"{}")
+    finally:
+        conn.close()
+
+def wait_for(job_id, address=DAEMON_ADDRESS, poll=0.2, token=DAEMON_TOKEN):
+    """
+    Polls a job until it is done, failed or cancelled; returns its final status dict.
+    """
+    while True:
+        code, info = request("GET", f"/jobs/{job_id}", address=address, token=token)
+        if code != 200 or info["status"] in ("done", "failed", "cancelled"):
+            return info
+        time.sleep(poll)
+
+def print_job(info):
+    if "error" in info and "id" not in info:
+        print(f"Error: {info['error']}")
+        return
+    print(f"{info['id']}  {info['status']:<9}  {info['pdf']}")
+    if info.get("error"):
+        print(f"  {info['error']}")
+    for page, page_result in (info.get("result") or {}).get("pages", {}).items():
+        print(f"  Page {page}:")
+        for name, path in page_result["outputs"].items():
+            print(f"    {name:<8} {path}")
+        for cat, data in sorted(page_result["totals"].items()):
+            print(f"    {cat:<30} {data['count']:>7}  {data['length']:>12.2f}")
+
+def parse_pages(value):
+    """
+    "1,3-5" -> [1, 3, 4, 5].
+    """
+    pages = []
+    for part in value.split(","):
+        first, _, last = part.partition("-")
+        pages.extend(range(int(first), int(last or first) + 1))
+    return pages
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm extraction daemon and its client.")
+    parser.add_argument("--address", default=DAEMON_ADDRESS,
+                        help=f"Unix socket path or host:port (default: {DAEMON_ADDRESS}, or PDF_EXTRACTOR_DAEMON)")
+    parser.add_argument("--token", default=DAEMON_TOKEN,
+                        help="Shared token, required for TCP addresses (default: PDF_EXTRACTOR_DAEMON_TOKEN)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="Run the daemon in the foreground")
+    serve.add_argument("-j", "--workers", type=int, default=None, help="Concurrent jobs / worker processes (default: CPU count)")
+    serve.add_argument("--max-queued", type=int, default=MAX_QUEUED_JOBS, help="Waiting jobs before submissions are refused")
+    serve.add_argument("--output-root", default=DAEMON_OUTPUT_ROOT, help="Where jobs without an output_dir write")
+
+    submit = commands.add_parser("submit", help="Queue a document")
+    submit.add_argument("pdf")
+    submit.add_argument("--pages", type=parse_pages, help="1-based pages, e.g. 1,3-5 (default: all)")
+    submit.add_argument("--outputs", default=",".join(DEFAULT_OUTPUTS), help=f"Comma-separated, from {', '.join(OUTPUTS)}")
+    submit.add_argument("-o", "--output-dir", help="Directory for this job's files")
+    submit.add_argument("--wait", action="store_true", help="Block until the job finishes and print its result")
+
+    status = commands.add_parser("status", help="Daemon status, or one job's status and result")
+    status.add_argument("job", nargs="?")
+    wait = commands.add_parser("wait", help="Block until a job finishes and print its result")
+    wait.add_argument("job")
+    cancel = commands.add_parser("cancel", help="Cancel a queued job")
+    cancel.add_argument("job")
+    commands.add_parser("jobs", help="List known jobs")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        service = ExtractionService(args.workers, args.max_queued, args.output_root)
+        try:
+            server = make_server(service, args.address, args.token)
+        except ValueError as e:
+            service.close()
+            print(f"Error: {e}")
+            sys.exit(1)
+        print(f"Extraction daemon listening on {args.address} with {service.workers} warm workers (pid {os.getpid()})")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            service.close()
+        return
+
+    try:
+        if args.command == "submit":
+            payload = {
+                "pdf": os.path.abspath(args.pdf),
+                "pages": args.pages,
+                "outputs": [name.strip() for name in args.outputs.split(",") if name.strip()],
+                "output_dir": os.path.abspath(args.output_dir) if args.output_dir else None
+            }
+            code, info = request("POST", "/jobs", payload, address=args.address, token=args.token)
+            if code != 202:
+                print(f"Error: {info.get('error')}")
+                sys.exit(1)
+            print_job(wait_for(info["id"], args.address, token=args.token) if args.wait else info)
+        elif args.command == "status" and args.job is None:
+            _, info = request("GET", "/status", address=args.address, token=args.token)
+            print(json.dumps(info, indent=2))
+        elif args.command in ("status", "wait"):
+            print_job(wait_for(args.job, args.address, token=args.token) if args.command == "wait"
+                      else request("GET", f"/jobs/{args.job}", address=args.address, token=args.token)[1])
+        elif args.command == "cancel":
+            _, info = request("DELETE", f"/jobs/{args.job}", address=args.address, token=args.token)
+            print(info.get("error") or f"{args.job} cancelled")
+        elif args.command == "jobs":
+            _, info = request("GET", "/jobs", address=args.address, token=args.token)
+            for job in info["jobs"]:
+                print(f"{job['id']}  {job['status']:<9}  {job['pdf']}")
+    except (FileNotFoundError, ConnectionRefusedError):
+        print(f"Error: no extraction daemon at {args.address} (start one with 'serve').")
+        sys.exit(1)
+    except (ConnectionError, http.client.HTTPException) as e:
+        # The daemon is there but dropped the request (reset, broken pipe, bad reply)
+        print(f"Error: lost the connection to the daemon at {args.address}: {e!r}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
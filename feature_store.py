@@ -0,0 +1,198 @@
+import os
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from report_writer import StreamingReportWriter, SUMMARY_COLUMNS
+from instrumentation import stage
+
+# --- Columnar Feature Store ---
+# The canonical output of an extraction run. Three Parquet datasets live under one root:
+#   <root>/features/document=<file>/page=<n>/part-0.parquet   detailed geometry + text labels
+#   <root>/text/document=<file>/page=<n>/part-0.parquet       every text span
+#   <root>/summary/document=<file>/page=<n>/part-0.parquet    per-page category totals
+# Category (and the other low-cardinality strings) are dictionary-encoded, coordinates
+# are stored unrounded, and rewriting a page replaces only that page's partition.
+# The Excel/CSV/JSONL reports are an export generated from the store.
+
+STORE_ROOT = "feature_store"
+# Directory document keys are taken relative to (default: the working directory)
+DOCUMENT_ROOT_ENV = "PDF_EXTRACTOR_DOCUMENT_ROOT"
+
+PARTITIONING = ds.partitioning(
+    pa.schema([("document", pa.string()), ("page", pa.int32())]),
+    flavor="hive"
+)
+
+FEATURE_SCHEMA = pa.schema([
+    ("category", pa.dictionary(pa.int16(), pa.string())),
+    ("type", pa.dictionary(pa.int8(), pa.string())),
+    ("length", pa.float64()),
+    ("x_min", pa.float64()),
+    ("y_min", pa.float64()),
+    ("x_max", pa.float64()),
+    ("y_max", pa.float64())
+])
+
+TEXT_SCHEMA = pa.schema([
+    ("text", pa.string()),
+    ("font", pa.dictionary(pa.int16(), pa.string())),
+    ("size", pa.float32()),
+    ("x", pa.float64()),
+    ("y", pa.float64())
+])
+
+SUMMARY_SCHEMA = pa.schema([
+    ("category", pa.dictionary(pa.int16(), pa.string())),
+    ("count", pa.int64()),
+    ("total_length", pa.float64())
+])
+
+# --- Document Keys ---
+# Every entry point (batch_extract, run_pipeline, the daemon) names a document by its path
+# relative to the document root, with "/" separators, so the same PDF always lands in the
+# same partition and a/plan.pdf and b/plan.pdf stay apart. A file outside the root is keyed
+# relative to the deepest directory holding both. The key depends on nothing but the file
+# and the root, not on which other files a run happens to include.
+def document_key(pdf_path, root=None):
+    """
+    Store key for one document, relative to root (default: PDF_EXTRACTOR_DOCUMENT_ROOT, else the working directory).
+    """
+    root = os.path.abspath(root or os.environ.get(DOCUMENT_ROOT_ENV) or os.getcwd())
+    path = os.path.abspath(pdf_path)
+    try:
+        base = os.path.commonpath([root, os.path.dirname(path)])
+    except ValueError: # another drive
+        base = os.path.splitdrive(path)[0] + os.sep
+    return os.path.relpath(path, base).replace(os.sep, "/")
+
+def document_keys(pdf_files, root=None):
+    """
+    {path: store key} for the documents (see document_key).
+    """
+    return {p: document_key(p, root) for p in pdf_files}
+
+def _table_from_rows(rows, schema):
+    """
+    Builds a typed table from row tuples laid out in schema order.
+    """
+    columns = list(zip(*rows)) if rows else [[] for _ in schema]
+    arrays = []
+    for values, field in zip(columns, schema):
+        if pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(values, type=pa.string()).dictionary_encode().cast(field.type))
+        else:
+            arrays.append(pa.array(values, type=field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+def _write_partition(table, root, dataset, document, page):
+    table = table.append_column("document", pa.array([document] * len(table), type=pa.string()))
+    table = table.append_column("page", pa.array([page] * len(table), type=pa.int32()))
+    ds.write_dataset(
+        table,
+        os.path.join(root, dataset),
+        format="parquet",
+        partitioning=PARTITIONING,
+        basename_template="part-{i}.parquet",
+        existing_data_behavior="delete_matching",
+        preserve_order=True
+    )
+
+# --- Writing ---
+def write_page(root, document, page, features, text_rows):
+    """
+    Stores one page. features is a feature_table.FeatureTable, text_rows TEXT_COLUMNS tuples;
+    page is 1-based. Returns the page's per-category stats.
+    """
+    stats = features.category_totals()
+    summary_rows = [(cat, stats[cat]["count"], stats[cat]["length"]) for cat in sorted(stats)]
+
+    with stage("feature_store", items=len(features) + len(text_rows)) as st:
+        _write_partition(features.to_arrow().cast(FEATURE_SCHEMA), root, "features", document, page)
+        _write_partition(_table_from_rows(text_rows, TEXT_SCHEMA), root, "text", document, page)
+        _write_partition(_table_from_rows(summary_rows, SUMMARY_SCHEMA), root, "summary", document, page)
+        st.set_categories({cat: stats[cat]["count"] for cat in stats})
+    return stats
+
+# --- Reading ---
+def _dataset(root, name):
+    return ds.dataset(os.path.join(root, name), format="parquet", partitioning=PARTITIONING)
+
+def _filter(categories=None, documents=None, pages=None):
+    expr = None
+    for field, values in (("category", categories), ("document", documents), ("page", pages)):
+        if values is None:
+            continue
+        term = ds.field(field).isin(list(values))
+        expr = term if expr is None else expr & term
+    return expr
+
+def load_features(root=STORE_ROOT, columns=None, categories=None, documents=None, pages=None):
+    """
+    Loads detailed features as a pyarrow Table, reading only the requested columns,
+    categories, documents and pages. Call .to_pandas() for a DataFrame.
+    """
+    return _dataset(root, "features").to_table(columns=columns, filter=_filter(categories, documents, pages))
+
+def load_text(root=STORE_ROOT, columns=None, documents=None, pages=None):
+    return _dataset(root, "text").to_table(columns=columns, filter=_filter(None, documents, pages))
+
+def load_summary(root=STORE_ROOT, documents=None, pages=None, per_page=False):
+    """
+    Category totals over the selected pages; per_page=True keeps one row per (document, page, category).
+    """
+    table = _dataset(root, "summary").to_table(filter=_filter(None, documents, pages))
+    if per_page:
+        return table.sort_by([("document", "ascending"), ("page", "ascending")])
+    table = table.cast(table.schema.set(0, pa.field("category", pa.string())))
+    totals = table.group_by("category").aggregate([("count", "sum"), ("total_length", "sum")])
+    totals = pa.table({
+        "category": totals["category"],
+        "count": totals["count_sum"],
+        "total_length": totals["total_length_sum"]
+    })
+    return totals.sort_by("category")
+
+def list_pages(root=STORE_ROOT):
+    """
+    Returns the stored (document, page) pairs in document/page order.
+    """
+    table = _dataset(root, "summary").to_table(columns=["document", "page"])
+    pairs = set(zip(table["document"].to_pylist(), table["page"].to_pylist()))
+    return sorted(pairs)
+
+# --- Export ---
+def export_report(root, path, documents=None, pages=None):
+    """
+    Generates the Summary / Page Summary / Detailed Features / All Text report from the
+    store. The format follows the file extension (.xlsx, .csv, .jsonl). documents and
+    pages ((document, page) pairs) restrict it to those stored pages.
+    """
+    selected = None if pages is None else set(pages)
+    pages = [(doc, page) for doc, page in list_pages(root)
+             if (documents is None or doc in documents) and (selected is None or (doc, page) in selected)]
+    features = _dataset(root, "features")
+    text = _dataset(root, "text")
+
+    page_summary_columns = ["File", "Page"] + SUMMARY_COLUMNS
+    with StreamingReportWriter(path, lead_columns=["File", "Page"],
+                               extra_sheets=[("Page Summary", page_summary_columns)]) as writer:
+        for doc, page in pages:
+            lead = (doc, page)
+            page_filter = (ds.field("document") == doc) & (ds.field("page") == page)
+            for batch in features.to_batches(columns=list(FEATURE_SCHEMA.names), filter=page_filter):
+                for row in zip(*(col.to_pylist() for col in batch.columns)):
+                    writer.write_feature(row, lead)
+            for batch in text.to_batches(columns=list(TEXT_SCHEMA.names), filter=page_filter):
+                for row in zip(*(col.to_pylist() for col in batch.columns)):
+                    writer.write_text(row, lead)
+
+        summary = load_summary(root, documents=documents, per_page=True)
+        for doc, page, cat, count, length in zip(
+            summary["document"].to_pylist(), summary["page"].to_pylist(), summary["category"].to_pylist(),
+            summary["count"].to_pylist(), summary["total_length"].to_pylist()
+        ):
+            if selected is not None and (doc, page) not in selected:
+                continue
+            writer.write_extra("Page Summary", (doc, page, cat, count, length))
+
+    print(f"Exported {writer.feature_count} features and {writer.text_count} text rows to {os.path.abspath(path)}")
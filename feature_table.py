@@ -0,0 +1,185 @@
+import numpy as np
+
+# --- Array-Backed Feature Table ---
+# A page's detailed features as a handful of typed columns instead of one Python
+# object per feature:
+#   category  - int16 code into the `categories` lookup list
+#   type      - int8 code into the `types` lookup list ("Geometry", "Text Label", ...)
+#   length    - float64
+#   bounds    - (4, n) float64: X_Min, Y_Min, X_Max, Y_Max rows, each one contiguous
+# Rows are kept in report order (Category, then Y_Min), the order ordered_feature_rows
+# has always produced. sample.pdf's 81k features take 3.5 MB here against 18 MB as row tuples.
+# Per-row access goes through FeatureRow, a __slots__ view that copies nothing;
+# to_arrow() wraps the numeric columns without copying them, to_pandas() builds
+# Categoricals straight from the codes.
+
+TYPE_NAMES = ["Geometry", "Text Label"]
+
+class FeatureRow:
+    """
+    View of one table row; attributes follow DETAILED_COLUMNS.
+    """
+    __slots__ = ("table", "index")
+
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+
+    @property
+    def category(self):
+        return self.table.categories[self.table.category[self.index]]
+
+    @property
+    def type(self):
+        return self.table.types[self.table.type[self.index]]
+
+    @property
+    def length(self):
+        return float(self.table.length[self.index])
+
+    @property
+    def bbox(self):
+        return tuple(self.table.bounds[:, self.index].tolist())
+
+    def as_tuple(self):
+        """
+        The row as a DETAILED_COLUMNS tuple (unrounded).
+        """
+        return (self.category, self.type, self.length) + self.bbox
+
+    def __repr__(self):
+        return f"FeatureRow{self.as_tuple()}"
+
+class FeatureTable:
+    """
+    Detailed features of one page in typed columns (see the module comment).
+    """
+    __slots__ = ("categories", "types", "category", "type", "length", "bounds")
+
+    def __init__(self, categories, types, category, type, length, bounds):
+        self.categories = categories
+        self.types = types
+        self.category = category
+        self.type = type
+        self.length = length
+        self.bounds = bounds
+
+    @classmethod
+    def from_parts(cls, lengths, codes, bboxes, categories, text_feats=(), extra_rows=()):
+        """
+        Builds the table in report order from per-shape arrays (geometry_kernel codes into
+        categories), text features (dicts with Category, X, Y) and ready detailed rows.
+        Ties on Y_Min keep geometry before text before extra rows, each in input order.
+        """
+        names = list(categories)
+        lookup = {name: code for code, name in enumerate(names)}
+        types = list(TYPE_NAMES)
+        type_lookup = {name: code for code, name in enumerate(types)}
+
+        def code_of(name, table, index):
+            if name not in index:
+                index[name] = len(table)
+                table.append(name)
+            return index[name]
+
+        text_feats = list(text_feats)
+        extra_rows = list(extra_rows)
+        n_geometry = len(codes)
+        n_text = len(text_feats)
+        n = n_geometry + n_text + len(extra_rows)
+
+        category = np.empty(n, dtype=np.int16)
+        type_codes = np.zeros(n, dtype=np.int8)
+        length = np.zeros(n, dtype=np.float64)
+        bbox = np.empty((n, 4), dtype=np.float64)
+        source = np.zeros(n, dtype=np.int8)
+
+        category[:n_geometry] = codes
+        length[:n_geometry] = lengths
+        bbox[:n_geometry] = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+
+        # Text location is a point for simplicity in this view
+        for i, feat in enumerate(text_feats, start=n_geometry):
+            category[i] = code_of(feat["Category"], names, lookup)
+            type_codes[i] = type_lookup["Text Label"]
+            bbox[i] = (feat["X"], feat["Y"], feat["X"], feat["Y"])
+        source[n_geometry:n_geometry + n_text] = 1
+
+        for i, row in enumerate(extra_rows, start=n_geometry + n_text):
+            category[i] = code_of(row[0], names, lookup)
+            type_codes[i] = code_of(row[1], types, type_lookup)
+            length[i] = row[2]
+            bbox[i] = row[3:7]
+        source[n_geometry + n_text:] = 2
+
+        # Categories sort by name, then Y_Min, then source, then input position
+        name_rank = np.argsort(np.argsort(np.array(names, dtype=object))).astype(np.int16)
+        order = np.lexsort((np.arange(n), source, bbox[:, 1], name_rank[category]))
+        return cls(names, types, category[order], type_codes[order], length[order],
+                   np.ascontiguousarray(bbox[order].T))
+
+    def __len__(self):
+        return len(self.length)
+
+    def __getitem__(self, index):
+        if not -len(self) <= index < len(self):
+            raise IndexError("feature index out of range")
+        return FeatureRow(self, index % len(self))
+
+    def __iter__(self):
+        return (FeatureRow(self, i) for i in range(len(self)))
+
+    @property
+    def nbytes(self):
+        return self.category.nbytes + self.type.nbytes + self.length.nbytes + self.bounds.nbytes
+
+    def rows(self):
+        """
+        Yields DETAILED_COLUMNS tuples (unrounded) in report order, for the streaming writers.
+        """
+        categories = self.categories
+        types = self.types
+        x_min, y_min, x_max, y_max = self.bounds.tolist()
+        for cat, typ, length, x0, y0, x1, y1 in zip(self.category.tolist(), self.type.tolist(),
+                                                    self.length.tolist(), x_min, y_min, x_max, y_max):
+            yield (categories[cat], types[typ], length, x0, y0, x1, y1)
+
+    def category_totals(self):
+        """
+        {category: {"count": n, "length": total}} for the categories present.
+        """
+        counts = np.bincount(self.category, minlength=len(self.categories))
+        lengths = np.bincount(self.category, weights=self.length, minlength=len(self.categories))
+        return {self.categories[code]: {"count": int(counts[code]), "length": float(lengths[code])}
+                for code in np.flatnonzero(counts).tolist()}
+
+    def to_arrow(self):
+        """
+        pyarrow Table in feature_store.FEATURE_SCHEMA layout (dictionary-encoded category
+        and type); the numeric columns are wrapped, not copied.
+        """
+        import pyarrow as pa
+        return pa.table({
+            "category": pa.DictionaryArray.from_arrays(self.category, pa.array(self.categories, type=pa.string())),
+            "type": pa.DictionaryArray.from_arrays(self.type, pa.array(self.types, type=pa.string())),
+            "length": self.length,
+            "x_min": self.bounds[0],
+            "y_min": self.bounds[1],
+            "x_max": self.bounds[2],
+            "y_max": self.bounds[3]
+        })
+
+    def to_pandas(self):
+        """
+        DataFrame with DETAILED_COLUMNS; Category and Type are pandas Categoricals over the codes.
+        """
+        import pandas as pd
+        return pd.DataFrame({
+            "Category": pd.Categorical.from_codes(self.category, self.categories),
+            "Type": pd.Categorical.from_codes(self.type, self.types),
+            "Length": self.length,
+            "X_Min": self.bounds[0],
+            "Y_Min": self.bounds[1],
+            "X_Max": self.bounds[2],
+            "Y_Max": self.bounds[3]
+        }, copy=False)
@@ -0,0 +1,143 @@
+import numpy as np
+
+from geometry import (
+    WALL_MIN_WIDTH, BASIN_MIN_PERIMETER, BASIN_MAX_PERIMETER, CLOSURE_TOLERANCE, LOOP_MIN_COMPACTNESS
+)
+from geometry_kernel import CATEGORY_CODES
+from spatial_index import EndpointIndex
+
+# --- Multi-Path Fixture Loops ---
+# The basin heuristic only sees a loop when one path closes on itself. CAD exporters
+# often split a basin or WC bowl into several open paths, which then classify as door
+# arcs. Here every open thin path short enough to be part of a basin is an edge between
+# its two end points; end points within CLOSURE_TOLERANCE are merged into one vertex
+# (EndpointIndex pairs + connected components, O(n log n)). A component of that graph
+# is a closed loop when it is a simple cycle: every vertex has degree 2 and there are as
+# many paths as vertices. Loops of at least two paths, holding a curve, whose perimeter
+# falls in the basin range are reported as "Sanitary: Wash Basin (Est.)", unless they
+# enclose next to nothing (an arc drawn out and back again). Areas come from the
+# kernel's signed path areas, each path counted in the direction the cycle is walked.
+
+LOOP_CATEGORY = "Sanitary: Wash Basin (Est.)"
+
+def _components(n, edges):
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    graph = coo_matrix((np.ones(len(edges), dtype=np.int8), (edges[:, 0], edges[:, 1])), shape=(n, n))
+    return connected_components(graph, directed=False)
+
+def find_fixture_loops(cols, wall_min_width=WALL_MIN_WIDTH):
+    """
+    Finds closed loops chained from several open paths.
+    cols are geometry_kernel columns with a "code" entry (page_model.classified_columns);
+    paths at least wall_min_width wide never take part.
+    Returns a dict:
+      loop      - (n,) loop index per shape, -1 outside any loop
+      perimeter - (k,) summed path lengths
+      area      - (k,) enclosed area
+      bbox      - (k, 4) combined bbox
+      paths     - (k,) number of paths in the loop
+    """
+    n = len(cols["code"])
+    candidates = np.flatnonzero(
+        cols["has_start"] & cols["has_end"] & ~cols["is_closed"]
+        & (cols["width"] < wall_min_width) & (cols["length"] < BASIN_MAX_PERIMETER)
+        & (cols["code"] != CATEGORY_CODES.get(LOOP_CATEGORY, -1))
+    )
+    loop = np.full(n, -1, dtype=np.int64)
+    if not len(candidates):
+        return _loops(cols, loop, [], [])
+
+    # Vertices: clusters of touching end points (rows 0..m-1 are starts, m..2m-1 ends)
+    m = len(candidates)
+    index = EndpointIndex(np.concatenate([cols["start"][candidates], cols["end"][candidates]]),
+                          tolerance=CLOSURE_TOLERANCE)
+    _, vertex = _components(2 * m, index.self_pairs())
+    first, last = vertex[:m], vertex[m:]
+
+    # Simple cycles: every vertex of the component has degree 2 and edges == vertices
+    n_vertices = vertex.max() + 1
+    degree = np.bincount(vertex, minlength=n_vertices)
+    _, component = _components(n_vertices, np.stack([first, last], axis=1))
+    n_components = component.max() + 1
+    edge_component = component[first]
+    edges = np.bincount(edge_component, minlength=n_components)
+    vertices = np.bincount(component, minlength=n_components)
+    all_degree_2 = np.bincount(component, weights=degree != 2, minlength=n_components) == 0
+    curves = np.bincount(edge_component, weights=cols["is_curve"][candidates], minlength=n_components)
+    perimeter = np.bincount(edge_component, weights=cols["length"][candidates], minlength=n_components)
+    is_loop = (all_degree_2 & (edges == vertices) & (edges >= 2) & (curves > 0)
+               & (perimeter > BASIN_MIN_PERIMETER) & (perimeter < BASIN_MAX_PERIMETER))
+
+    loops = np.flatnonzero(is_loop)
+
+    # Walk each cycle once so every path's signed area is counted in the walking direction
+    order = np.argsort(edge_component, kind="stable")
+    ordered = edge_component[order]
+    starts = np.searchsorted(ordered, loops, side="left")
+    stops = np.searchsorted(ordered, loops, side="right")
+    signed = cols["area"][candidates]
+    areas = np.array([abs(_cycle_area(order[lo:hi], first, last, signed))
+                      for lo, hi in zip(starts.tolist(), stops.tolist())], dtype=np.float64)
+    compact = 4 * np.pi * areas >= LOOP_MIN_COMPACTNESS * perimeter[loops] ** 2
+
+    for k, (lo, hi) in enumerate(zip(starts[compact].tolist(), stops[compact].tolist())):
+        loop[candidates[order[lo:hi]]] = k
+    return _loops(cols, loop, areas[compact], perimeter[loops][compact])
+
+def _cycle_area(paths, first, last, signed):
+    """
+    Sums the signed areas of a cycle's paths, negating the ones walked end to start.
+    """
+    at_vertex = {}
+    for p in paths.tolist():
+        at_vertex.setdefault(first[p], []).append(p)
+        at_vertex.setdefault(last[p], []).append(p)
+    total = 0.0
+    path = paths[0]
+    vertex = last[path]
+    total += signed[path]
+    for _ in range(len(paths) - 1):
+        a, b = at_vertex[vertex]
+        path = b if a == path else a
+        if first[path] == vertex:
+            total += signed[path]
+            vertex = last[path]
+        else:
+            total -= signed[path]
+            vertex = first[path]
+    return total
+
+def _loops(cols, loop, areas, perimeters):
+    count = len(areas)
+    members = np.flatnonzero(loop >= 0)
+    labels = loop[members]
+    bbox = np.zeros((count, 4), dtype=np.float64)
+    if count:
+        bbox[:, 0:2] = np.inf
+        bbox[:, 2:4] = -np.inf
+        np.minimum.at(bbox[:, 0:2], labels, cols["bbox"][members, 0:2])
+        np.maximum.at(bbox[:, 2:4], labels, cols["bbox"][members, 2:4])
+    return {
+        "loop": loop,
+        "perimeter": np.asarray(perimeters, dtype=np.float64),
+        "area": np.asarray(areas, dtype=np.float64),
+        "bbox": bbox,
+        "paths": np.bincount(labels, minlength=count)
+    }
+
+def loop_rows(loops):
+    """
+    One detailed row (DETAILED_COLUMNS order) per loop, with its perimeter as the length.
+    """
+    for perimeter, box in zip(loops["perimeter"].tolist(), loops["bbox"].tolist()):
+        yield (LOOP_CATEGORY, "Loop", perimeter, box[0], box[1], box[2], box[3])
+
+def loop_table_rows(loops):
+    """
+    One row per loop in report_writer.LOOP_COLUMNS order, rounded for output.
+    """
+    for paths, perimeter, area, box in zip(loops["paths"].tolist(), loops["perimeter"].tolist(),
+                                           loops["area"].tolist(), loops["bbox"].tolist()):
+        yield [LOOP_CATEGORY, paths, round(perimeter, 2), round(area, 2)] + [round(v, 2) for v in box]
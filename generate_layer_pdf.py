@@ -1,19 +1,37 @@
-#!/Users/alimran/Documents/pdf_extractor/venv/bin/python3
 import fitz # PyMuPDF
+import argparse
+import numpy as np
 import os
-from math import sqrt
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from geometry_kernel import shape_columns, classify_columns, CATEGORIES, OP_LINE, OP_CURVE
+from shape_rules import LAYER_NAMES
+from door_assembly import find_door_assemblies, ARC_CATEGORY, LEAF_CATEGORIES
+from fixture_loops import find_fixture_loops, LOOP_CATEGORY
+from page_model import classified_columns, scanned_text, door_assemblies, fixture_loops
+from text_labels import labels_by_layer
+from extraction_cache import load_cached_page_model
+from instrumentation import stage
 
 # --- Configuration ---
 PDF_FILE = "sample.pdf"
 OUTPUT_DIR = "generated_layers"
+LAYERED_PDF_FILE = "layers.pdf"
+
+# Layers are rendered in chunks of this many shapes; pages with fewer shapes
+# in total than PARALLEL_MIN_SHAPES are rendered without a process pool
+LAYER_CHUNK_SHAPES = 10000
+PARALLEL_MIN_SHAPES = 20000
 
-if not os.path.exists(OUTPUT_DIR):
-    os.makedirs(OUTPUT_DIR)
+# Report categories map to layer names through the "layer" of their shape_rules rule
 
 # --- Geometry Binding Logic ---
-def classify_geometry_two_pass(shapes):
+def classify_geometry_two_pass(shapes, cols=None, assemblies=None, loops=None):
     """
     Performs advanced classification linking lines to curves.
+    cols are precomputed geometry_kernel columns with a "code" entry (page_model.classified_columns),
+    loops and assemblies the matching fixture_loops / door_assembly results.
     Returns: Dict {Category: [List of Shapes]}
     """
     
@@ -25,226 +43,322 @@ def classify_geometry_two_pass(shapes):
         "Standard_Line": [],
         "Other": []
     }
+    for layer in LAYER_NAMES.values():
+        categorized_shapes.setdefault(layer, [])
     
-    # Pass 1: Initial Heuristics & Identify Door Arcs
-    door_arcs = [] # (StartPoint, EndPoint, ShapeObject)
-    
-    # Temporary container for line candidates that might be doors
-    line_candidates = [] 
+    if cols is None:
+        cols = shape_columns(shapes)
+        cols["code"] = classify_columns(cols)
+    if loops is None:
+        loops = find_fixture_loops(cols)
+    if assemblies is None:
+        assemblies = find_door_assemblies(cols, exclude=loops["loop"] >= 0)
+    codes = cols["code"]
+    layers = [LAYER_NAMES[name] for name in CATEGORIES]
+    basin_layer = LAYER_NAMES.get(LOOP_CATEGORY, "Sanitary_Basin")
+    door_layer = LAYER_NAMES.get(ARC_CATEGORY, "Door")
+    leaf_layers = {LAYER_NAMES[name] for name in LEAF_CATEGORIES if name in LAYER_NAMES}
+
+    # Pass 1 (kernel codes), the fixture loops and the door assemblies are precomputed;
+    # pass 2 moves paths of multi-path loops onto the basin layer and thin lines that
+    # belong to a door assembly (leaves, frame stubs) onto the Door layer
+    in_loop = (loops["loop"] >= 0).tolist()
+    in_door = (assemblies["assembly"] >= 0).tolist()
+    print(f"  [Pass 2] Binding lines to {len(assemblies['leaf_width'])} door assemblies"
+          f" and {len(loops['area'])} fixture loops...")
     
-    for shape in shapes:
-        shape_type = shape.get('type')
-        width = shape.get('width', 0)
-        if width is None: width = 0
-        
-        # Calculate Length & Check Curve
-        length = 0.0
-        is_curve = False
-        is_closed = False
-        start_p = None
-        end_p = None
-        
-        if shape_type == 's' and 'items' in shape:
-            for i, item in enumerate(shape['items']):
+    for shape, code, door, loop in zip(shapes, codes.tolist(), in_door, in_loop):
+        layer = layers[code]
+        if loop:
+            layer = basin_layer
+        elif door and layer in leaf_layers:
+            layer = door_layer
+        categorized_shapes[layer].append(shape)
+
+    return categorized_shapes
+
+# --- Compact Layer Data ---
+# Layer rendering runs as a worker step. Workers never see the PyMuPDF drawing dicts,
+# only a packed layer: NumPy arrays that pickle compactly across process boundaries.
+#   width       - stroke width per shape (after the visibility minimum)
+#   close       - per shape, close the path after its last segment
+#   seg_shape   - owning shape of every 'l'/'c' item, in drawing order
+#   seg_op      - OP_LINE or OP_CURVE
+#   seg_points  - (N, 4, 2) anchor/control points; lines repeat their anchors
+#   rect_shape / rects - owning shape and (x0, y0, x1, y1) of 'r' shapes
+
+def pack_layer(shapes):
+    """
+    Packs a layer's drawing dicts into the compact form rendered by layer_stream().
+    """
+    widths = []
+    close = []
+    seg_shape = []
+    seg_op = []
+    coords = []
+    rect_shape = []
+    rects = []
+    for sid, s in enumerate(shapes):
+        w = s.get('width')
+        width_val = float(w) if w is not None else 0.5
+        widths.append(max(width_val, 0.5)) # Visibility Enhancement
+        close.append(bool(s.get('closePath')))
+        if 'items' in s:
+            for item in s['items']:
                 op = item[0]
                 if op == 'l':
                     p1, p2 = item[1], item[2]
-                    length += sqrt((p2.x - p1.x)**2 + (p2.y - p1.y)**2)
-                    if i == 0: start_p = p1
-                    end_p = p2
+                    seg_shape.append(sid)
+                    seg_op.append(OP_LINE)
+                    coords += (p1.x, p1.y, p1.x, p1.y, p2.x, p2.y, p2.x, p2.y)
                 elif op == 'c':
-                    is_curve = True
-                    p1, p4 = item[1], item[4]
-                    length += sqrt((p4.x - p1.x)**2 + (p4.y - p1.y)**2)
-                    if i == 0: start_p = p1
-                    end_p = p4
-            
-            if start_p and end_p and abs(start_p.x - end_p.x) < 1 and abs(start_p.y - end_p.y) < 1:
-                is_closed = True
-
-        elif shape_type == 'r':
-            rect = shape.get('rect')
-            length = 2 * (abs(rect[2]-rect[0]) + abs(rect[3]-rect[1]))
-
-        # --- Initial Classification ---
-        if is_curve and is_closed and length < 200 and length > 10:
-            categorized_shapes["Sanitary_Basin"].append(shape)
-            
-        elif width >= 0.70:
-            categorized_shapes["Wall"].append(shape)
-            
-        elif is_curve and width < 0.70:
-            # Found a Door Arc!
-            categorized_shapes["Door"].append(shape)
-            if start_p and end_p:
-                door_arcs.append((start_p, end_p))
-                
-        elif width > 0 and width < 0.25:
-            categorized_shapes["Window_Detail"].append(shape)
-            
-        elif width >= 0.25 and width < 0.70:
-            # Candidate for Door Leaf (if connected to arc) OR Standard Line
-            line_candidates.append(shape)
-        else:
-             categorized_shapes["Other"].append(shape)
-
-    # Pass 2: Check Line Candidates against Door Arcs
-    print(f"  [Pass 2] Checking {len(line_candidates)} lines against {len(door_arcs)} door arcs...")
-    
-    tolerance = 1.0
-    
-    for shape in line_candidates:
-        # Get start/end of this line shape
-        s_start = None
-        s_end = None
-        if shape['type'] == 's' and 'items' in shape:
-            # Assuming simple lines for door leaves (usually single segment)
-            item = shape['items'][0] 
-            if item[0] == 'l':
-                s_start = item[1]
-                s_end = item[2]
-        
-        is_door_leaf = False
-        if s_start and s_end:
-            for (a_start, a_end) in door_arcs:
-                 if (abs(s_start.x - a_start.x) < tolerance and abs(s_start.y - a_start.y) < tolerance) or \
-                    (abs(s_end.x - a_start.x) < tolerance and abs(s_end.y - a_start.y) < tolerance) or \
-                    (abs(s_start.x - a_end.x) < tolerance and abs(s_start.y - a_end.y) < tolerance) or \
-                    (abs(s_end.x - a_end.x) < tolerance and abs(s_end.y - a_end.y) < tolerance):
-                     is_door_leaf = True
-                     break
-        
-        if is_door_leaf:
-            categorized_shapes["Door"].append(shape)
-        else:
-            categorized_shapes["Standard_Line"].append(shape)
+                    p1, p2, p3, p4 = item[1], item[2], item[3], item[4]
+                    seg_shape.append(sid)
+                    seg_op.append(OP_CURVE)
+                    coords += (p1.x, p1.y, p2.x, p2.y, p3.x, p3.y, p4.x, p4.y)
+        elif s['type'] == 'r':
+            rect = s['rect']
+            rect_shape.append(sid)
+            rects.append((rect[0], rect[1], rect[2], rect[3]))
+    return {
+        "width": np.array(widths, dtype=np.float64),
+        "close": np.array(close, dtype=bool),
+        "seg_shape": np.array(seg_shape, dtype=np.int32),
+        "seg_op": np.array(seg_op, dtype=np.int8),
+        "seg_points": np.array(coords, dtype=np.float64).reshape(-1, 4, 2),
+        "rect_shape": np.array(rect_shape, dtype=np.int32),
+        "rects": np.array(rects, dtype=np.float64).reshape(-1, 4)
+    }
 
-    return categorized_shapes
+def split_pack(pack, chunk_shapes=LAYER_CHUNK_SHAPES):
+    """
+    Splits a packed layer into runs of at most chunk_shapes shapes, so one huge layer
+    is spread over several workers too.
+    """
+    n = len(pack["width"])
+    for lo in range(0, n, chunk_shapes):
+        hi = min(lo + chunk_shapes, n)
+        seg = (pack["seg_shape"] >= lo) & (pack["seg_shape"] < hi)
+        rect = (pack["rect_shape"] >= lo) & (pack["rect_shape"] < hi)
+        yield {
+            "width": pack["width"][lo:hi],
+            "close": pack["close"][lo:hi],
+            "seg_shape": pack["seg_shape"][seg] - lo,
+            "seg_op": pack["seg_op"][seg],
+            "seg_points": pack["seg_points"][seg],
+            "rect_shape": pack["rect_shape"][rect] - lo,
+            "rects": pack["rects"][rect]
+        }
 
-# --- Text Classification ---
-def extract_categorized_text(page):
-    text = page.get_text("dict")
-    categorized_text = {}
-    
-    keywords = {
-        "WC": "Sanitary_Toilet_WC", 
-        "TM": "Appliance_Washing_Machine",
-        "TT": "Appliance_Tumble_Dryer",
-        "DM": "Appliance_Dishwasher", 
-        "Dusch": "Sanitary_Shower"
-    }
+def layer_stream(pack, page_height):
+    """
+    Worker step: builds the PDF content stream for a packed layer, drawn in black.
+    Shapes are grouped by stroke width so each width is set and stroked once,
+    instead of one graphics-state change and stroke per source shape.
+    """
+    sid = pack["seg_shape"]
+    pts = pack["seg_points"]
 
-    for block in text["blocks"]:
-        if block["type"] == 0:
-            for line in block["lines"]:
-                for span in line["spans"]:
-                    txt = span["text"].strip()
-                    cat = None
-                    
-                    # 1. Expanded Door Labels
-                    if (txt.startswith("D-") or 
-                        txt.startswith("DBD-") or 
-                        txt.startswith("HVD-") or 
-                        txt.startswith("VVD-") or 
-                        txt.startswith("YDS-") or 
-                        "BASTUDÖRR" in txt):
-                        cat = "Door"
-                    
-                    # 2. Check Keywords
-                    if not cat:
-                        for key, val in keywords.items():
-                            if key == txt or f" {key} " in f" {txt} ":
-                                cat = val
-                                break
-                    
-                    if cat:
-                        if cat not in categorized_text:
-                            categorized_text[cat] = []
-                        categorized_text[cat].append({
-                            "text": txt,
-                            "bbox": span["bbox"],
-                            "size": span["size"],
-                            "font": span["font"]
-                        })
-    return categorized_text
+    # A subpath starts at each shape's first segment and wherever a segment does not
+    # continue from the previous one; it is closed after the shape's last segment
+    new_shape = np.ones(len(sid), dtype=bool)
+    new_shape[1:] = sid[1:] != sid[:-1]
+    move = new_shape.copy()
+    move[1:] |= np.any(pts[1:, 0] != pts[:-1, 3], axis=1)
+    last = np.ones(len(sid), dtype=bool)
+    last[:-1] = new_shape[1:]
+    close_after = last & pack["close"][sid]
 
-# --- PDF Generation Logic ---
-def generate_layer_pdfs():
-    if not os.path.exists(PDF_FILE):
-        print(f"Error: {PDF_FILE} not found.")
-        return
+    # Coordinates are written in PDF space (y up)
+    flipped = pts.copy()
+    flipped[..., 1] = page_height - flipped[..., 1]
+    rects = pack["rects"]
 
-    print(f"Reading {PDF_FILE}...")
-    doc = fitz.open(PDF_FILE)
-    src_page = doc[0]
-    src_rect = src_page.rect 
-    
-    # 1. Advanced Geometry Classification
-    shapes = src_page.get_drawings()
+    ops = ["q", "0 0 0 RG"]
+    widths, first_seen = np.unique(pack["width"], return_index=True)
+    for stroke_width in widths[np.argsort(first_seen)].tolist():
+        in_group = pack["width"] == stroke_width
+        ops.append(f"{stroke_width:.3f} w")
+        seg_idx = np.flatnonzero(in_group[sid])
+        for op, m, h, p in zip(pack["seg_op"][seg_idx].tolist(), move[seg_idx].tolist(),
+                               close_after[seg_idx].tolist(), flipped[seg_idx].tolist()):
+            if m:
+                ops.append(f"{p[0][0]:.3f} {p[0][1]:.3f} m")
+            if op == OP_LINE:
+                ops.append(f"{p[3][0]:.3f} {p[3][1]:.3f} l")
+            else:
+                ops.append(f"{p[1][0]:.3f} {p[1][1]:.3f} {p[2][0]:.3f} {p[2][1]:.3f} {p[3][0]:.3f} {p[3][1]:.3f} c")
+            if h:
+                ops.append("h")
+        for x0, y0, x1, y1 in rects[in_group[pack["rect_shape"]]].tolist():
+            ops.append(f"{x0:.3f} {page_height - y1:.3f} {x1 - x0:.3f} {y1 - y0:.3f} re")
+        ops.append("S")
+    ops.append("Q")
+    return "\n".join(ops).encode()
+
+def _layer_stream_job(job):
+    # Compressed here so deflating the content is spread over the workers as well
+    layer, pack, page_height = job
+    return layer, zlib.compress(layer_stream(pack, page_height))
+
+def render_layer_streams(categorized_shapes, page_height, workers=None):
+    """
+    Builds the content streams of every layer, chunk by chunk, in a process pool.
+    Small pages are rendered in-process, where pool start-up would dominate.
+    Returns: {layer: [deflated content stream per chunk]}
+    """
+    jobs = []
+    for layer, shapes in categorized_shapes.items():
+        if shapes:
+            jobs.extend((layer, chunk, page_height) for chunk in split_pack(pack_layer(shapes)))
+
+    workers = workers or os.cpu_count() or 1
+    total = sum(len(shapes) for shapes in categorized_shapes.values())
+    streams = {}
+    if workers > 1 and len(jobs) > 1 and total >= PARALLEL_MIN_SHAPES:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            results = list(pool.map(_layer_stream_job, jobs))
+    else:
+        results = [_layer_stream_job(job) for job in jobs]
+    for layer, stream in results:
+        streams.setdefault(layer, []).append(stream)
+    return streams
+
+# --- Layer Drawing ---
+def layer_page(width, height, streams, labels):
+    """
+    A one-page document holding one layer: its deflated content streams plus its text labels.
+    """
+    doc = fitz.open()
+    page = doc.new_page(width=width, height=height)
+    if streams:
+        xrefs = []
+        for stream in streams:
+            xref = doc.get_new_xref()
+            doc.update_object(xref, "<<>>")
+            doc.update_stream(xref, stream, compress=False)
+            doc.xref_set_key(xref, "Filter", "/FlateDecode") # update_stream resets the dictionary
+            xrefs.append(xref)
+        doc.xref_set_key(page.xref, "Contents", "[" + " ".join(f"{x} 0 R" for x in xrefs) + "]")
+    for t in labels:
+        p = fitz.Point(t["bbox"][0], t["bbox"][3])
+        page.insert_text(p, t["text"], fontsize=t["size"], color=(0, 0, 1))
+    return doc
+
+def categorize_page(model):
+    """
+    Two-pass shape classification and categorized labels for a page model.
+    Returns: ({layer: [shapes]}, {layer: [labels]})
+    """
+    shapes = model["shapes"]
     print(f"Classifying {len(shapes)} elements (Two-Pass Logic)...")
-    categorized_shapes = classify_geometry_two_pass(shapes)
-        
-    # 2. Extract Categorized Text
-    categorized_text = extract_categorized_text(src_page)
-    
-    doc.close()
-    
-    # 3. Generate PDF for each category
+    cols = classified_columns(model)
+    loops = fixture_loops(model)
+    assemblies = door_assemblies(model)
+    with stage("door_binding", items=len(shapes)) as st:
+        categorized_shapes = classify_geometry_two_pass(shapes, cols, assemblies, loops)
+        st.set_categories({layer: len(members) for layer, members in categorized_shapes.items()})
+
+    categorized_text = labels_by_layer(scanned_text(model)[1])
+    return categorized_shapes, categorized_text
+
+def _load_default_model(pdf_path=PDF_FILE, page_number=0):
+    if not os.path.exists(pdf_path):
+        print(f"Error: {pdf_path} not found.")
+        return None
+    print(f"Reading {pdf_path}...")
+    return load_cached_page_model(pdf_path, page_number)
+
+# --- PDF Generation Logic ---
+def generate_layer_pdfs(model=None, output_dir=OUTPUT_DIR, workers=None):
+    """
+    Writes one PDF per layer (layer_<name>.pdf) into output_dir.
+    Layer content is rendered over `workers` processes (default: CPU count).
+    """
+    if model is None:
+        model = _load_default_model()
+        if model is None:
+            return
+
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    src_rect = fitz.Rect(model["rect"])
+    categorized_shapes, categorized_text = categorize_page(model)
+
     print("\nGenerating Layer PDFs...")
-    
     all_categories = set(categorized_shapes.keys()).union(set(categorized_text.keys()))
-    
-    for cat in all_categories:
-        shape_list = categorized_shapes.get(cat, [])
-        text_list = categorized_text.get(cat, [])
-        
-        if not shape_list and not text_list: continue
 
-        # Create new PDF
+    with stage("layer_pdfs") as st:
+        streams = render_layer_streams(categorized_shapes, src_rect.height, workers)
+        for cat in all_categories:
+            shape_list = categorized_shapes.get(cat, [])
+            text_list = categorized_text.get(cat, [])
+            if not shape_list and not text_list: continue
+
+            filename = f"layer_{cat}.pdf"
+            with layer_page(src_rect.width, src_rect.height, streams.get(cat), text_list) as out_pdf:
+                out_pdf.save(os.path.join(output_dir, filename), deflate=True)
+
+            print(f"  -> Generated {filename} ({len(shape_list)} shapes, {len(text_list)} labels)")
+            st.add_items(len(shape_list))
+
+    print(f"\nAll files saved to folder: {os.path.abspath(output_dir)}")
+
+def generate_layered_pdf(model=None, output_file=LAYERED_PDF_FILE, workers=None):
+    """
+    Writes a single PDF with one optional-content group (OCG) per layer,
+    so every layer can be toggled in a viewer's layer panel.
+    """
+    if model is None:
+        model = _load_default_model()
+        if model is None:
+            return
+
+    src_rect = fitz.Rect(model["rect"])
+    categorized_shapes, categorized_text = categorize_page(model)
+
+    print("\nGenerating Layered PDF...")
+    all_categories = sorted(set(categorized_shapes.keys()).union(set(categorized_text.keys())))
+
+    with stage("layer_pdfs") as st:
+        streams = render_layer_streams(categorized_shapes, src_rect.height, workers)
         out_pdf = fitz.open()
         out_page = out_pdf.new_page(width=src_rect.width, height=src_rect.height)
-        
-        # A. Draw Shapes
-        draw_count = 0
-        if shape_list:
-            shape_drawer = out_page.new_shape()
-            for s in shape_list:
-                w = s.get('width')
-                width_val = float(w) if w is not None else 0.5
-                stroke_width = max(width_val, 0.5) 
-                stroke_color = (0, 0, 0)
-                
-                if 'items' in s:
-                    for item in s['items']:
-                        op = item[0]
-                        if op == 'l':
-                            shape_drawer.draw_line(item[1], item[2])
-                        elif op == 'c':
-                            shape_drawer.draw_bezier(item[1], item[2], item[3], item[4])
-                    shape_drawer.finish(width=stroke_width, color=stroke_color, stroke_opacity=1)
-                elif s['type'] == 'r':
-                    rect = fitz.Rect(s['rect'])
-                    shape_drawer.draw_rect(rect)
-                    shape_drawer.finish(width=stroke_width, color=stroke_color, stroke_opacity=1)
-                draw_count += 1
-            shape_drawer.commit()
-
-        # B. Draw Text
-        text_count = 0
-        if text_list:
-            for t in text_list:
-                p = fitz.Point(t["bbox"][0], t["bbox"][3]) 
-                out_page.insert_text(p, t["text"], fontsize=t["size"], color=(0, 0, 1)) 
-                text_count += 1
-        
-        filename = f"layer_{cat}.pdf"
-        filepath = os.path.join(OUTPUT_DIR, filename)
-        out_pdf.save(filepath)
+        for cat in all_categories:
+            shape_list = categorized_shapes.get(cat, [])
+            text_list = categorized_text.get(cat, [])
+            if not shape_list and not text_list: continue
+
+            # Each layer is placed as one Form XObject inside its own OCG
+            oc = out_pdf.add_ocg(cat, on=True)
+            with layer_page(src_rect.width, src_rect.height, streams.get(cat), text_list) as layer_doc:
+                out_page.show_pdf_page(out_page.rect, layer_doc, 0, oc=oc)
+            print(f"  -> Layer {cat} ({len(shape_list)} shapes, {len(text_list)} labels)")
+            st.add_items(len(shape_list))
+
+        out_pdf.save(output_file, deflate=True)
         out_pdf.close()
-        
-        print(f"  -> Generated {filename} ({draw_count} shapes, {text_count} labels)")
 
-    print(f"\nAll files saved to folder: {os.path.abspath(OUTPUT_DIR)}")
+    print(f"\nSaved layered PDF to {os.path.abspath(output_file)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-draw the classified geometry as layer PDFs.")
+    parser.add_argument("pdf", nargs="?", default=PDF_FILE, help="Source PDF")
+    parser.add_argument("--page", type=int, default=1, help="1-based page number")
+    parser.add_argument("-o", "--output-dir", default=OUTPUT_DIR, help=f"Folder for the layer PDFs (default: {OUTPUT_DIR})")
+    parser.add_argument("--single", nargs="?", const=LAYERED_PDF_FILE, metavar="PDF",
+                        help=f"Write one PDF with a toggleable layer per category (default: {LAYERED_PDF_FILE})")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Rendering processes (default: CPU count)")
+    args = parser.parse_args()
+
+    model = _load_default_model(args.pdf, args.page - 1)
+    if model is None:
+        return
+    if args.single:
+        generate_layered_pdf(model, output_file=args.single, workers=args.workers)
+    else:
+        generate_layer_pdfs(model, args.output_dir, workers=args.workers)
 
 if __name__ == "__main__":
-    generate_layer_pdfs()
+    main()
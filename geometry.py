@@ -0,0 +1,107 @@
+from math import sqrt, inf
+
+# --- Heuristic Thresholds (PDF units) ---
+WALL_MIN_WIDTH = 0.70
+WINDOW_MAX_WIDTH = 0.25
+BASIN_MIN_PERIMETER = 10
+BASIN_MAX_PERIMETER = 200
+CLOSURE_TOLERANCE = 1.0
+DOOR_TOLERANCE = 1.0
+LOOP_MIN_COMPACTNESS = 0.1 # 4*pi*area / perimeter^2 of a multi-path loop; rules out retraced arcs
+FRAME_STUB_MAX_RATIO = 0.5 # frame stubs are at most this fraction of the leaf they touch
+ROOM_MIN_AREA = 400 # smaller wall-bounded faces are shafts, columns or wall cavities (0.5 m2 at 1:100)
+ROOM_MIN_WIDTH = 8 # 2 * area / perimeter of a room face; the strip between a wall's two lines stays below it
+DOOR_OPENING_EXTENSION = 0.2 # the line closing a door opening reaches this fraction of the leaf past each jamb
+LABEL_LINK_RADIUS = 75 # a label further than this from every compatible feature stays unlinked (2.6 m at 1:100)
+
+# --- Utility: Measure Shape ---
+def measure_shape(shape):
+    """
+    Walks a drawing's path items once.
+    Returns: (length, bbox, is_curve, is_closed, start_p, end_p) where bbox is (min_x, min_y, max_x, max_y)
+    """
+    shape_type = shape.get('type')
+    length = 0.0
+
+    # Initialize BBox
+    min_x, min_y = inf, inf
+    max_x, max_y = -inf, -inf
+
+    # Check for Curves (Doors/Basins)
+    is_curve = False
+    is_closed = False
+
+    # Start/End points for loop detection
+    start_p = None
+    end_p = None
+
+    if shape_type == 's' and 'items' in shape: # Stroke path
+        for i, item in enumerate(shape['items']):
+            operator = item[0]
+
+            if operator == 'l':
+                p1, p2 = item[1], item[2]
+                length += sqrt((p2.x - p1.x)**2 + (p2.y - p1.y)**2)
+                if i == 0: start_p = p1
+                end_p = p2
+                points = (p1, p2)
+
+            elif operator == 'c':
+                # Curve: ("c", p1, p2, p3, p4)
+                # Control points p2, p3 also define the curve's extent, so they go into the bbox too
+                is_curve = True
+                p1, p4 = item[1], item[4]
+                length += sqrt((p4.x - p1.x)**2 + (p4.y - p1.y)**2)
+                if i == 0: start_p = p1
+                end_p = p4
+                points = (p1, item[2], item[3], p4)
+
+            else:
+                continue
+
+            for p in points:
+                if p.x < min_x: min_x = p.x
+                if p.y < min_y: min_y = p.y
+                if p.x > max_x: max_x = p.x
+                if p.y > max_y: max_y = p.y
+
+        # Check for simple closure
+        if start_p and end_p and abs(start_p.x - end_p.x) < CLOSURE_TOLERANCE and abs(start_p.y - end_p.y) < CLOSURE_TOLERANCE:
+             is_closed = True
+
+    elif shape_type == 'r': # Rectangle
+        rect = shape.get('rect')
+        # rect is [x0, y0, x1, y1]
+        min_x, min_y, max_x, max_y = rect[0], rect[1], rect[2], rect[3]
+        length = 2 * (abs(max_x - min_x) + abs(max_y - min_y))
+
+    # Handle case where no points found (shouldn't happen for valid shapes)
+    if min_x == inf:
+        min_x, min_y, max_x, max_y = 0, 0, 0, 0
+
+    bbox = (min_x, min_y, max_x, max_y)
+    return length, bbox, is_curve, is_closed, start_p, end_p
+
+# --- Classification Logic ---
+def classify_shape(width, length, is_curve, is_closed, **attributes):
+    """
+    Applies the width/curve/closure cascade shared by every script (shape_rules.RULES).
+    Rules testing other attributes (type, fill, color, area) and the OCG layer map need
+    them passed by keyword (layer is the drawing's OCG name).
+    """
+    from shape_rules import classify_attributes # shape_rules reads the thresholds above
+    return classify_attributes(width=width, length=length, is_curve=is_curve, is_closed=is_closed, **attributes)
+
+# --- Utility: Quantify Shape ---
+def quantify_shape(shape):
+    """
+    Analyzes a shape to determine its length, classification, and bounding box.
+    Returns: (length, category, bbox) where bbox is (min_x, min_y, max_x, max_y)
+    """
+    width = shape.get('width', 0)
+    if width is None: width = 0
+
+    length, bbox, is_curve, is_closed, _, _ = measure_shape(shape)
+    category = classify_shape(width, length, is_curve, is_closed, type=shape.get('type') or '',
+                              fill=shape.get('fill'), color=shape.get('color'), layer=shape.get('layer'))
+    return length, category, bbox
@@ -0,0 +1,265 @@
+import numpy as np
+
+from geometry import CLOSURE_TOLERANCE
+from shape_rules import CATEGORIES, CATEGORY_CODES, classify_with_rules
+
+# --- Columnar Geometry Kernel ---
+# Vectorized counterpart of geometry.quantify_shape. Every 'l' and 'c' item of
+# every stroke path is flattened into one row of a segment table:
+#   shape_id  - index of the owning shape in the drawing list
+#   op        - OP_LINE or OP_CURVE
+#   first     - True when the segment is items[0] of its shape
+#   points    - (N, 4, 2) anchor/control points; lines repeat their anchors
+# The same walk also collects the per-shape type, stroke width, fill and stroke colours,
+# OCG layer name and rectangle shapes, so nothing else needs to loop over the drawing dicts.
+# Lengths, bboxes, curve flags, start/end closure and signed areas for all shapes are
+# then computed with a handful of NumPy reductions instead of a Python loop per item.
+# Paths of more than one segment also keep their segments' end points (SEGMENT_KEYS,
+# indexed by shape), so polylines can be rebuilt from the columns without the drawings.
+# Cost on sample.pdf (81,547 paths): the NumPy part takes ~35 ms, but the walk over the
+# drawing dicts takes ~150 ms. PyMuPDF hands every path over as a Python dict, and reading
+# them is the floor: rewriting the walk as C-level iterator chains (itertools/operator)
+# measured no faster. The kernel as a whole is 3-4x faster than calling quantify_shape
+# per path, not an order of magnitude.
+
+OP_LINE = 0
+OP_CURVE = 1
+
+# Column entries holding one row per segment of a multi-segment path instead of one per shape
+SEGMENT_KEYS = ("segment_shape", "segment_start", "segment_end")
+
+# Category codes returned by classify_columns index into CATEGORIES, which (like
+# CATEGORY_CODES) comes from the shape_rules table in effect
+NO_COLOR = (np.nan, np.nan, np.nan)
+
+def _rgb(color):
+    return color if color and len(color) == 3 else NO_COLOR
+
+def flatten_segments(shapes, raw=False):
+    """
+    Flattens the 'l'/'c' items of all stroke paths into a segment table.
+    raw=True takes page.get_cdrawings() paths, whose points are plain (x, y) tuples.
+    """
+    shape_ids = []
+    ops = []
+    first = []
+    coords = []
+    widths = []
+    types = []
+    fills = []
+    colors = []
+    layers = []
+    rect_ids = []
+
+    for sid, shape in enumerate(shapes):
+        shape_type = shape.get('type')
+        widths.append(shape.get('width'))
+        types.append(shape_type or '')
+        fills.append(_rgb(shape.get('fill')))
+        colors.append(_rgb(shape.get('color')))
+        layers.append(shape.get('layer'))
+        if shape_type == 'r':
+            rect_ids.append(sid)
+            continue
+        if shape_type != 's' or 'items' not in shape:
+            continue
+        for i, item in enumerate(shape['items']):
+            op = item[0]
+            if op == 'l':
+                p1, p2 = item[1], item[2]
+                shape_ids.append(sid)
+                ops.append(OP_LINE)
+                first.append(i == 0)
+                if raw:
+                    coords += (*p1, *p1, *p2, *p2)
+                else:
+                    coords += (p1.x, p1.y, p1.x, p1.y, p2.x, p2.y, p2.x, p2.y)
+            elif op == 'c':
+                p1, p2, p3, p4 = item[1], item[2], item[3], item[4]
+                shape_ids.append(sid)
+                ops.append(OP_CURVE)
+                first.append(i == 0)
+                if raw:
+                    coords += (*p1, *p2, *p3, *p4)
+                else:
+                    coords += (p1.x, p1.y, p2.x, p2.y, p3.x, p3.y, p4.x, p4.y)
+
+    return {
+        "shape_id": np.array(shape_ids, dtype=np.int64),
+        "op": np.array(ops, dtype=np.int8),
+        "first": np.array(first, dtype=bool),
+        "points": np.array(coords, dtype=np.float64).reshape(-1, 4, 2),
+        "raw_width": np.array(widths, dtype=np.float64), # None -> nan
+        "type": np.array(types, dtype='U4'),
+        "fill": np.array(fills, dtype=np.float32).reshape(-1, 3), # None -> nan
+        "color": np.array(colors, dtype=np.float32).reshape(-1, 3),
+        "layer": layers,
+        "rect_ids": rect_ids
+    }
+
+# Green's theorem for a cubic Bezier: integral of (x dy - y dx) over t in [0, 1] is
+# sum over i < j of weight * (x_i * y_j - x_j * y_i) for the control points P0..P3.
+# Lines are stored as (p1, p1, p2, p2), for which the weights add up to the exact chord term.
+_AREA_WEIGHTS = ((0, 1, 0.6), (0, 2, 0.3), (0, 3, 0.1), (1, 2, 0.3), (1, 3, 0.3), (2, 3, 0.6))
+
+def segment_areas(points):
+    """
+    Signed area swept by each (N, 4, 2) segment about the origin; summed around a closed
+    loop this is the enclosed area, with the sign of the drawing direction.
+    """
+    x = points[:, :, 0]
+    y = points[:, :, 1]
+    total = np.zeros(len(points), dtype=np.float64)
+    for i, j, weight in _AREA_WEIGHTS:
+        total += weight * (x[:, i] * y[:, j] - x[:, j] * y[:, i])
+    return total / 2
+
+def shape_columns(shapes, segments=None, raw=False):
+    """
+    Computes per-shape attributes for the whole drawing list at once.
+    Returns a dict of arrays, one entry per shape:
+      type, layer, raw_width (nan when unset), width (unset -> 0), length, bbox (n, 4),
+      fill / color (n, 3) RGB (nan when unset),
+      is_curve, is_closed, has_start / start (n, 2), has_end / end (n, 2),
+      area (signed, in drawing direction; see segment_areas)
+    plus, per segment of every path with more than one segment (chords for curves):
+      segment_shape (m,), segment_start / segment_end (m, 2)
+    """
+    n = len(shapes)
+    if segments is None:
+        segments = flatten_segments(shapes, raw)
+
+    sid = segments["shape_id"]
+    op = segments["op"]
+    pts = segments["points"]
+
+    raw_width = segments["raw_width"]
+    width = np.nan_to_num(raw_width, nan=0.0)
+
+    # Segment lengths: straight chord from first to last anchor (as in quantify_shape)
+    chord = pts[:, 3, :] - pts[:, 0, :]
+    seg_len = np.hypot(chord[:, 0], chord[:, 1])
+    length = np.bincount(sid, weights=seg_len, minlength=n)
+
+    area = np.bincount(sid, weights=segment_areas(pts), minlength=n)
+
+    curve_count = np.bincount(sid, weights=(op == OP_CURVE), minlength=n)
+    is_curve = curve_count > 0
+
+    # Group boundaries (segments are already ordered by shape id)
+    seg_count = np.bincount(sid, minlength=n)
+    has_segments = seg_count > 0
+    group_start = np.concatenate(([0], np.cumsum(seg_count)[:-1]))[has_segments]
+    group_end = group_start + seg_count[has_segments] - 1
+
+    bbox = np.zeros((n, 4), dtype=np.float64)
+    if len(sid):
+        seg_min = np.minimum(np.minimum(pts[:, 0], pts[:, 1]), np.minimum(pts[:, 2], pts[:, 3]))
+        seg_max = np.maximum(np.maximum(pts[:, 0], pts[:, 1]), np.maximum(pts[:, 2], pts[:, 3]))
+        bbox[has_segments, 0:2] = np.minimum.reduceat(seg_min, group_start, axis=0)
+        bbox[has_segments, 2:4] = np.maximum.reduceat(seg_max, group_start, axis=0)
+
+    # Rectangles carry their own bbox/perimeter
+    for i in segments["rect_ids"]:
+        rect = shapes[i].get('rect')
+        bbox[i] = (rect[0], rect[1], rect[2], rect[3])
+        length[i] = 2 * (abs(rect[2] - rect[0]) + abs(rect[3] - rect[1]))
+        area[i] = abs(rect[2] - rect[0]) * abs(rect[3] - rect[1])
+
+    # Start point only exists when items[0] is itself a line/curve; end is the last segment
+    start = np.zeros((n, 2), dtype=np.float64)
+    end = np.zeros((n, 2), dtype=np.float64)
+    has_start = np.zeros(n, dtype=bool)
+    has_end = np.zeros(n, dtype=bool)
+    if len(sid):
+        starts_owner = sid[group_start]
+        first_ok = segments["first"][group_start]
+        start[starts_owner] = pts[group_start, 0, :]
+        has_start[starts_owner] = first_ok
+        end[sid[group_end]] = pts[group_end, 3, :]
+        has_end[sid[group_end]] = True
+
+    # fitz.Point(0, 0) is falsy, so the scalar "if start_p and end_p" checks skip it
+    has_start &= np.any(start != 0, axis=1)
+    has_end &= np.any(end != 0, axis=1)
+    delta = np.abs(start - end)
+    is_closed = has_start & has_end & (delta[:, 0] < CLOSURE_TOLERANCE) & (delta[:, 1] < CLOSURE_TOLERANCE)
+
+    multi = seg_count[sid] > 1
+
+    return {
+        "type": segments["type"],
+        "fill": segments["fill"],
+        "color": segments["color"],
+        "layer": segments["layer"],
+        "raw_width": raw_width,
+        "width": width,
+        "length": length,
+        "bbox": bbox,
+        "is_curve": is_curve,
+        "is_closed": is_closed,
+        "has_start": has_start,
+        "start": start,
+        "has_end": has_end,
+        "end": end,
+        "area": area,
+        "segment_shape": sid[multi],
+        "segment_start": pts[multi, 0, :],
+        "segment_end": pts[multi, 3, :]
+    }
+
+def _concat_segments(parts, order):
+    """
+    Joins the SEGMENT_KEYS tables of several parts, renumbering their shapes like concat_columns.
+    """
+    offsets = np.cumsum([0] + [len(part["length"]) for part in parts[:-1]])
+    shape = np.concatenate([part["segment_shape"] + offset for part, offset in zip(parts, offsets.tolist())])
+    start = np.concatenate([part["segment_start"] for part in parts])
+    end = np.concatenate([part["segment_end"] for part in parts])
+    if order is not None:
+        position = np.empty(len(order), dtype=np.int64)
+        position[order] = np.arange(len(order))
+        shape = position[shape]
+        keep = np.argsort(shape, kind="stable")
+        shape, start, end = shape[keep], start[keep], end[keep]
+    return {"segment_shape": shape, "segment_start": start, "segment_end": end}
+
+def concat_columns(parts, order=None):
+    """
+    Joins shape_columns results of consecutive drawing chunks (or tiles) into one,
+    optionally reordered by an index array over the joined shapes.
+    """
+    joined = _concat_segments(parts, order)
+    for key in parts[0]:
+        if key in SEGMENT_KEYS:
+            continue
+        if isinstance(parts[0][key], list):
+            values = [value for part in parts for value in part[key]]
+            joined[key] = values if order is None else [values[i] for i in order.tolist()]
+        else:
+            values = np.concatenate([part[key] for part in parts])
+            joined[key] = values if order is None else values[order]
+    return joined
+
+def classify_columns(cols, thresholds=None):
+    """
+    Vectorized geometry.classify_shape: returns an int8 code per shape (see CATEGORIES),
+    from the first shape_rules rule whose masks all hold.
+    thresholds overrides named rule thresholds (see width_calibration).
+    """
+    return classify_with_rules(cols, thresholds=thresholds)
+
+def category_counts(codes):
+    """
+    {category name: shape count} for an array of category codes (empty categories omitted).
+    """
+    counts = np.bincount(codes, minlength=len(CATEGORIES)) if len(codes) else np.zeros(len(CATEGORIES), dtype=np.int64)
+    return {name: int(n) for name, n in zip(CATEGORIES, counts.tolist()) if n}
+
+def quantify_shapes(shapes):
+    """
+    Vectorized geometry.quantify_shape over a whole drawing list.
+    Returns: (lengths, category_codes, bboxes) as arrays of shape (n,), (n,), (n, 4)
+    """
+    cols = shape_columns(shapes)
+    return cols["length"], classify_columns(cols), cols["bbox"]
@@ -0,0 +1,261 @@
+import atexit
+import json
+import os
+import platform
+import sys
+import time
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+# --- Configuration ---
+# Instrumentation is off unless enabled here or through enable():
+#   PDF_EXTRACTOR_INSTRUMENT=1              write run_report.json when the process exits
+#   PDF_EXTRACTOR_INSTRUMENT=report.json    ... to that path instead
+#   PDF_EXTRACTOR_PROFILE_STAGE=<stage>     also profile one stage (see STAGE_NAMES)
+#   PDF_EXTRACTOR_PROFILER=pyinstrument     use pyinstrument instead of cProfile for it
+REPORT_FILE = "run_report.json"
+
+# Stages wrapped across the pipeline (nested stages record their parent)
+STAGE_NAMES = [
+    "load_page", "get_drawings", "get_text", "tiles", "text_scan", "classification", "fixture_loops", "door_assembly", "symbols", "rooms", "label_links", "door_binding",
+    "excel_report", "separated_sheets", "layer_pdfs", "feature_store", "batch"
+]
+
+# --- Memory Probes ---
+def _proc_status_mb(field):
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+def current_rss_mb():
+    """
+    Current resident set size in MB (None where /proc is unavailable).
+    """
+    return _proc_status_mb("VmRSS:")
+
+def peak_rss_mb():
+    """
+    Peak resident set size of this process so far, in MB (None where unsupported).
+    """
+    # Linux carries ru_maxrss across exec, so prefer the per-process high-water mark
+    peak = _proc_status_mb("VmHWM:")
+    if peak is not None or resource is None:
+        return peak
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, other Unixes KB
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+# --- Stages ---
+class _NullStage:
+    """
+    What stage() returns while instrumentation is off: every call is a no-op.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def add_items(self, count):
+        pass
+
+    def set_categories(self, counts):
+        pass
+
+_NULL_STAGE = _NullStage()
+
+class Stage:
+    """
+    Times one pipeline stage: wall and CPU time, RSS before/after, process peak RSS,
+    items processed and per-category item counts.
+    """
+
+    def __init__(self, run, name, items=None):
+        self.run = run
+        self.name = name
+        self.items = items
+        self.categories = None
+
+    def add_items(self, count):
+        self.items = (self.items or 0) + count
+
+    def set_categories(self, counts):
+        self.categories = dict(counts)
+
+    def __enter__(self):
+        self.parent = self.run.stack[-1].name if self.run.stack else None
+        self.run.stack.append(self)
+        self.rss_start = current_rss_mb()
+        self.profiling = self.run.start_profile(self.name)
+        self.cpu_start = time.process_time()
+        self.wall_start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self.wall_start
+        cpu = time.process_time() - self.cpu_start
+        if self.profiling:
+            self.run.stop_profile()
+        self.run.stack.pop()
+        record = {
+            "name": self.name,
+            "parent": self.parent,
+            "wall_s": round(wall, 4),
+            "cpu_s": round(cpu, 4),
+            "items": self.items,
+            "items_per_s": round(self.items / wall, 1) if self.items and wall > 0 else None,
+            "categories": self.categories,
+            "rss_start_mb": self.rss_start,
+            "rss_end_mb": current_rss_mb(),
+            "peak_rss_mb": peak_rss_mb()
+        }
+        self.run.stages.append(record)
+        return False
+
+# --- Run ---
+class Run:
+    """
+    One instrumented process: the stage records plus the optional single-stage profiler.
+    """
+
+    def __init__(self, report_path=REPORT_FILE, profile_stage=None, profiler="cprofile"):
+        self.report_path = report_path
+        self.profile_stage = profile_stage
+        self.profiler_name = profiler
+        self.profiler = None
+        self.profile_path = None
+        self.stack = []
+        self.stages = []
+        self.started = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+
+    def start_profile(self, name):
+        if name != self.profile_stage or (self.profiler is not None and self.profiler_name == "pyinstrument"):
+            return False
+        if self.profiler is None:
+            self.profiler = self._new_profiler()
+        if self.profiler_name == "pyinstrument":
+            self.profiler.start()
+        else:
+            self.profiler.enable() # cProfile accumulates over every call of the stage
+        return True
+
+    def stop_profile(self):
+        if self.profiler_name == "pyinstrument":
+            self.profiler.stop() # only the first call is profiled
+        else:
+            self.profiler.disable()
+
+    def _new_profiler(self):
+        if self.profiler_name == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+                return Profiler()
+            except ImportError:
+                print("pyinstrument is not installed; profiling with cProfile instead.")
+                self.profiler_name = "cprofile"
+        import cProfile
+        return cProfile.Profile()
+
+    def _save_profile(self):
+        stem = os.path.splitext(self.report_path)[0]
+        if self.profiler_name == "pyinstrument":
+            self.profile_path = f"{stem}.{self.profile_stage}.html"
+            with open(self.profile_path, "w") as f:
+                f.write(self.profiler.output_html())
+        else:
+            self.profile_path = f"{stem}.{self.profile_stage}.prof" # open with pstats or snakeviz
+            self.profiler.dump_stats(self.profile_path)
+
+    def totals(self):
+        """
+        Per-stage-name aggregates, for stages that run once per page or per layer.
+        """
+        totals = {}
+        for record in self.stages:
+            total = totals.setdefault(record["name"], {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "items": 0})
+            total["calls"] += 1
+            total["wall_s"] = round(total["wall_s"] + record["wall_s"], 4)
+            total["cpu_s"] = round(total["cpu_s"] + record["cpu_s"], 4)
+            total["items"] += record["items"] or 0
+        return totals
+
+    def report(self):
+        if self.profiler is not None and self.profile_path is None:
+            self._save_profile()
+        return {
+            "argv": sys.argv,
+            "pid": os.getpid(),
+            "started": self.started,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "wall_s": round(time.perf_counter() - self.wall_start, 4),
+            "cpu_s": round(time.process_time() - self.cpu_start, 4),
+            "peak_rss_mb": peak_rss_mb(),
+            "profile": {"stage": self.profile_stage, "profiler": self.profiler_name, "path": self.profile_path}
+                       if self.profile_path else None,
+            "stages": self.stages,
+            "totals": self.totals()
+        }
+
+    def write(self):
+        with open(self.report_path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+        print(f"Run report saved to {os.path.abspath(self.report_path)}")
+
+_run = None
+
+def enable(report_path=REPORT_FILE, profile_stage=None, profiler="cprofile"):
+    """
+    Turns instrumentation on for this process; the JSON report is written at exit.
+    """
+    global _run
+    if _run is None:
+        atexit.register(lambda: _run.write())
+    _run = Run(report_path, profile_stage, profiler)
+    return _run
+
+def enabled():
+    return _run is not None
+
+def stage(name, items=None):
+    """
+    Context manager wrapping one pipeline stage. Costs a single global lookup when off:
+        with stage("get_drawings") as st:
+            shapes = page.get_drawings()
+            st.add_items(len(shapes))
+    """
+    if _run is None:
+        return _NULL_STAGE
+    return Stage(_run, name, items)
+
+def add_arguments(parser):
+    """
+    Adds the --instrument / --profile-stage / --profiler options to a script's argparse parser.
+    """
+    parser.add_argument("--instrument", nargs="?", const=REPORT_FILE, metavar="REPORT",
+                        help=f"Record per-stage timings and memory to a JSON report (default: {REPORT_FILE})")
+    parser.add_argument("--profile-stage", choices=STAGE_NAMES, help="Profile one stage (implies --instrument)")
+    parser.add_argument("--profiler", choices=["cprofile", "pyinstrument"], default="cprofile")
+
+def enable_from_args(args):
+    if args.instrument or args.profile_stage:
+        enable(args.instrument or REPORT_FILE, args.profile_stage, args.profiler)
+
+_env = os.environ.get("PDF_EXTRACTOR_INSTRUMENT", "")
+if _env or os.environ.get("PDF_EXTRACTOR_PROFILE_STAGE"):
+    enable(
+        REPORT_FILE if _env.lower() in ("", "1", "true", "yes") else _env,
+        os.environ.get("PDF_EXTRACTOR_PROFILE_STAGE"),
+        os.environ.get("PDF_EXTRACTOR_PROFILER", "cprofile")
+    )
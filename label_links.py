@@ -0,0 +1,112 @@
+import numpy as np
+
+from geometry import LABEL_LINK_RADIUS
+from geometry_kernel import CATEGORY_CODES
+from door_assembly import ASSEMBLY_CATEGORY
+from fixture_loops import LOOP_CATEGORY
+from spatial_index import CentroidIndex
+from text_labels import MATCHER, DOOR_LABEL, label_points
+
+# --- Label-to-Feature Links ---
+# Door labels and fixture/appliance codes are matched as text at a point, while the doors
+# and basins themselves are found in the geometry (door_assembly, fixture_loops). A label
+# category is linked to one kind of feature through LINK_TARGETS; each kind's features go
+# into a CentroidIndex over their bbox centres, and all labels of one category are
+# resolved with a single nearest query bounded by the link radius. A label with nothing
+# in range stays unlinked; several labels may share a feature (a double door labelled on
+# both sides). Only categories with a detector for their own geometry are linked: WC,
+# shower and appliance codes stay unlinked rather than being paired with the nearest
+# wash basin, and a basin label rule ("Sanitary: Wash Basin") would link to basins.
+
+KIND_DOOR = "door"
+KIND_BASIN = "basin"
+
+LINK_TARGETS = {
+    DOOR_LABEL: KIND_DOOR,
+    "Sanitary: Wash Basin": KIND_BASIN
+}
+
+def link_features(cols, loops, assemblies):
+    """
+    The linkable features per kind: {kind: {"category", "bbox" (k, 4), "leaf_width",
+    "arcs", "leaves", "area" (k,)}}. Basins are the multi-path loops followed by the
+    single-path basins; fields that don't apply to a kind are nan or 0.
+    """
+    doors = len(assemblies["bbox"])
+    single = np.flatnonzero((cols["code"] == CATEGORY_CODES.get(LOOP_CATEGORY, -1)) & (loops["loop"] < 0))
+    basins = len(loops["bbox"]) + len(single)
+    return {
+        KIND_DOOR: {
+            "category": ASSEMBLY_CATEGORY,
+            "bbox": assemblies["bbox"],
+            "leaf_width": assemblies["leaf_width"],
+            "arcs": assemblies["arcs"],
+            "leaves": assemblies["leaves"],
+            "area": np.full(doors, np.nan)
+        },
+        KIND_BASIN: {
+            "category": LOOP_CATEGORY,
+            "bbox": np.concatenate([loops["bbox"], cols["bbox"][single]]).reshape(-1, 4),
+            "leaf_width": np.full(basins, np.nan),
+            "arcs": np.zeros(basins, dtype=np.int64),
+            "leaves": np.zeros(basins, dtype=np.int64),
+            "area": np.concatenate([loops["area"], np.abs(cols["area"][single])])
+        }
+    }
+
+def link_labels(labels, features, radius=LABEL_LINK_RADIUS, matcher=MATCHER):
+    """
+    Links every label (text_labels.scan_text tuple) to the nearest compatible feature
+    within radius. Returns a dict:
+      kind     - (l,) feature kind per label, "" where the category links to nothing
+      feature  - (l,) index into features[kind], -1 when unlinked
+      distance - (l,) label centre to feature centre, inf when unlinked
+    """
+    categories = np.array([matcher.rules[label[0]][2] for label in labels], dtype=object)
+    points = label_points(labels)
+    kind = np.full(len(labels), "", dtype=object)
+    feature = np.full(len(labels), -1, dtype=np.int64)
+    distance = np.full(len(labels), np.inf)
+
+    indexes = {}
+    for category in np.unique(categories).tolist() if len(labels) else []:
+        target = LINK_TARGETS.get(category)
+        if target is None:
+            continue
+        if target not in indexes:
+            box = features[target]["bbox"]
+            indexes[target] = CentroidIndex((box[:, 0:2] + box[:, 2:4]) / 2)
+        picked = np.flatnonzero(categories == category)
+        kind[picked] = target
+        feature[picked], distance[picked] = indexes[target].nearest(points[picked], radius)
+    return {"kind": kind, "feature": feature, "distance": distance}
+
+def label_type(rule, matcher=MATCHER):
+    """
+    The label's type code: its rule pattern without the separator (D, HVD, BASTUDÖRR, WC...).
+    """
+    return matcher.rules[rule][1].rstrip("-")
+
+def link_table_rows(links, features, labels, point_room=None, matcher=MATCHER):
+    """
+    One row per label in report_writer.LINK_COLUMNS order; the feature columns are empty
+    for unlinked labels. point_room (rooms.find_rooms, same label order) fills the Room column.
+    """
+    for i, (rule, txt, *_) in enumerate(labels):
+        room = -1 if point_room is None else int(point_room[i])
+        row = [txt, matcher.rules[rule][2], label_type(rule, matcher), f"R{room + 1}" if room >= 0 else None]
+        index = int(links["feature"][i])
+        if index < 0:
+            yield row + [None] * 10
+            continue
+        table = features[links["kind"][i]]
+        width = float(table["leaf_width"][index])
+        area = float(table["area"][index])
+        yield row + [
+            table["category"],
+            round(float(links["distance"][i]), 2),
+            None if np.isnan(width) else round(width, 2),
+            int(table["arcs"][index]),
+            int(table["leaves"][index]),
+            None if np.isnan(area) else round(area, 2)
+        ] + [round(v, 2) for v in table["bbox"][index].tolist()]
@@ -0,0 +1,349 @@
+import fitz # PyMuPDF
+import fnmatch
+import os
+import pickle
+import queue
+import threading
+
+from geometry_kernel import shape_columns, classify_columns, concat_columns, category_counts
+from text_labels import scan_text, label_points
+from door_assembly import find_door_assemblies, assembly_rows
+from fixture_loops import find_fixture_loops, loop_rows
+from symbol_fingerprints import find_symbols
+from rooms import find_rooms
+from label_links import link_features, link_labels
+from width_calibration import WidthHistogram, page_thresholds, calibration_enabled, default_thresholds
+from instrumentation import stage
+
+# Text extraction flags: the "dict" defaults minus image blocks, which no extractor reads
+TEXT_FLAGS = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+
+# Paths per chunk when drawings are streamed instead of materialized
+DRAWING_CHUNK_SHAPES = 10000
+
+# Semicolon-separated OCG name globs; when set, only drawings on matching layers are extracted
+OCG_FILTER_ENV = "PDF_EXTRACTOR_OCGS"
+
+# --- Page Model ---
+# A page model is the result of parsing one page exactly once:
+#   {
+#     "file":   source PDF path,
+#     "page":   0-based page number,
+#     "rect":   (x0, y0, x1, y1) of the page,
+#     "shapes": page.get_drawings(),
+#     "text":   page.get_text("dict", flags=TEXT_FLAGS),
+#   }
+# Every extractor takes this dict instead of a fitz.Page, so the expensive
+# get_drawings() call is paid once per page no matter how many outputs are produced.
+# classified_columns() adds a memoized "columns" entry (geometry_kernel output plus a
+# "code" category array) and the "width_thresholds" it was classified with (see
+# width_calibration), and scanned_text() a memoized "text_scan" entry (all-text rows and
+# matched labels from text_labels.scan_text); fixture_loops() and door_assemblies() derive
+# memoized "fixture_loops" / "door_assemblies" entries from the columns alone, symbols()
+# fingerprints their instances into a "symbols" entry, rooms() rebuilds rooms from the
+# walls and door openings, with the matched text labels assigned to them, into "rooms", and
+# label_links() links door and fixture labels to the nearest of those features into
+# "label_links". A model stripped of "shapes" but holding the columns and the text scan is
+# enough for every tabular output, which is what the extraction cache stores.
+
+# Keys get_drawings() fills in (with None) on fill and stroke paths
+_PATH_KEYS = (
+    "closePath", "fill", "color", "width", "lineCap", "lineJoin", "dashes",
+    "stroke_opacity", "fill_opacity", "even_odd"
+)
+
+def drawing_from_raw(path):
+    """
+    Converts one page.get_cdrawings() path (plain tuples) into the get_drawings() form
+    (Point/Rect items, default keys), in place.
+    """
+    path["rect"] = fitz.Rect(path["rect"])
+    items = []
+    for item in path["items"]:
+        op = item[0]
+        if op == "re":
+            item = ("re", fitz.Rect(item[1]).normalize(), item[2])
+        elif op == "qu":
+            item = ("qu", fitz.Quad(item[1]))
+        else:
+            item = (op,) + tuple(fitz.Point(p) for p in item[1:])
+        items.append(item)
+    path["items"] = items
+    if path["type"] in ("f", "s"):
+        for key in _PATH_KEYS:
+            path[key] = path.get(key)
+    return path
+
+def ocg_patterns():
+    """
+    The OCG name globs extraction is limited to (PDF_EXTRACTOR_OCGS), or None.
+    """
+    patterns = [p.strip() for p in os.environ.get(OCG_FILTER_ENV, "").split(";") if p.strip()]
+    return patterns or None
+
+def ocg_path_filter(doc):
+    """
+    Predicate keeping the drawings whose OCG matches ocg_patterns(), or None to keep all.
+    Documents without OCGs are never filtered (there would be nothing left).
+    """
+    patterns = ocg_patterns()
+    if patterns is None:
+        return None
+    if not doc.get_ocgs():
+        print(f"Note: {doc.name} has no layers (OCGs); {OCG_FILTER_ENV} is ignored.")
+        return None
+    patterns = [p.lower() for p in patterns]
+    seen = {}
+
+    def keep(path):
+        name = path.get("layer") or ""
+        if name not in seen:
+            seen[name] = bool(name) and any(fnmatch.fnmatchcase(name.lower(), p) for p in patterns)
+        return seen[name]
+    return keep
+
+def build_page_model(page, file_path=None):
+    """
+    Parses a fitz.Page into a page model.
+    """
+    rect = page.rect
+    keep = ocg_path_filter(page.parent)
+    with stage("get_drawings") as st:
+        if keep is None:
+            shapes = page.get_drawings()
+        else:
+            # Only the kept paths pay for the Point/Rect conversion
+            shapes = [drawing_from_raw(path) for path in page.get_cdrawings() if keep(path)]
+        st.add_items(len(shapes))
+    with stage("get_text"):
+        text = page.get_text("dict", flags=TEXT_FLAGS)
+    return {
+        "file": file_path if file_path is not None else page.parent.name,
+        "page": page.number,
+        "rect": (rect.x0, rect.y0, rect.x1, rect.y1),
+        "shapes": shapes,
+        "text": text,
+    }
+
+# --- Streamed Drawings ---
+# get_drawings() builds the whole page's list of dicts with Point/Rect objects before
+# anything can use it. get_cdrawings(callback=...) hands the same paths over one at a
+# time as plain tuples. iter_drawing_chunks() runs it in a producer thread feeding a
+# bounded queue, so a consumer sees lists of chunk_size raw paths while the rest of the
+# page is still being parsed, and no more than a few chunks are alive at once.
+
+_END = object()
+
+def iter_drawing_chunks(page, chunk_size=DRAWING_CHUNK_SHAPES, max_pending=2, path_filter=None):
+    """
+    Yields the page's drawings as lists of raw get_cdrawings() paths, chunk_size at a time,
+    leaving out paths path_filter rejects.
+    The page must not be used from another thread until the generator is exhausted or closed.
+    """
+    chunks = queue.Queue(maxsize=max_pending)
+    stop = threading.Event()
+    chunk = []
+
+    def collect(path):
+        if stop.is_set() or (path_filter is not None and not path_filter(path)):
+            return
+        chunk.append(path)
+        if len(chunk) >= chunk_size:
+            chunks.put(chunk[:])
+            chunk.clear()
+
+    def produce():
+        try:
+            page.get_cdrawings(callback=collect)
+            if chunk and not stop.is_set():
+                chunks.put(chunk[:])
+            chunks.put(_END)
+        except BaseException as e:
+            chunks.put(e)
+
+    producer = threading.Thread(target=produce, name="get_cdrawings", daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = chunks.get()
+            if item is _END:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        # Early exit: let the producer run to completion without queueing more chunks
+        stop.set()
+        while producer.is_alive():
+            try:
+                chunks.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        producer.join()
+
+def build_streamed_page_model(page, file_path=None, chunk_size=DRAWING_CHUNK_SHAPES):
+    """
+    Parses a fitz.Page into a light page model (columns + text, no drawing dicts),
+    classifying each chunk of drawings as it arrives; memory follows the chunk size.
+    """
+    rect = page.rect
+    parts = []
+    histogram = WidthHistogram()
+    calibrate = calibration_enabled()
+    with stage("get_drawings") as st:
+        for chunk in iter_drawing_chunks(page, chunk_size, path_filter=ocg_path_filter(page.parent)):
+            cols = shape_columns(chunk, raw=True)
+            histogram.add(cols["raw_width"])
+            if not calibrate:
+                cols["code"] = classify_columns(cols)
+            parts.append(cols)
+            st.add_items(len(chunk))
+    cols = concat_columns(parts) if parts else shape_columns([])
+    # Calibrated cut-offs are only known once the whole page has been seen
+    thresholds = page_thresholds(histogram)
+    if calibrate or not parts:
+        cols["code"] = classify_columns(cols, thresholds)
+    with stage("get_text"):
+        text = page.get_text("dict", flags=TEXT_FLAGS)
+    return {
+        "file": file_path if file_path is not None else page.parent.name,
+        "page": page.number,
+        "rect": (rect.x0, rect.y0, rect.x1, rect.y1),
+        "columns": cols,
+        "width_thresholds": thresholds,
+        "text": text,
+    }
+
+def load_page_model(pdf_path, page_number=0):
+    """
+    Opens pdf_path and parses a single page into a page model.
+    """
+    with stage("load_page"), fitz.open(pdf_path) as doc:
+        return build_page_model(doc[page_number], pdf_path)
+
+def classified_columns(model):
+    """
+    Vectorized attributes and category codes for every shape, computed once per model.
+    """
+    if "columns" not in model:
+        with stage("classification") as st:
+            cols = shape_columns(model["shapes"])
+            thresholds = page_thresholds(WidthHistogram().add(cols["raw_width"]))
+            cols["code"] = classify_columns(cols, thresholds)
+            st.add_items(len(cols["code"]))
+            st.set_categories(category_counts(cols["code"]))
+        model["columns"] = cols
+        model["width_thresholds"] = thresholds
+    return model["columns"]
+
+def width_thresholds(model):
+    """
+    The width cut-offs the page's shapes were classified with.
+    """
+    classified_columns(model)
+    return model.get("width_thresholds") or default_thresholds()
+
+def scanned_text(model):
+    """
+    All-text rows and matched labels for the page, from a single pass over its text.
+    """
+    if "text_scan" not in model:
+        with stage("text_scan") as st:
+            model["text_scan"] = scan_text(model["text"])
+            st.add_items(len(model["text_scan"][0]))
+    return model["text_scan"]
+
+def fixture_loops(model):
+    """
+    Basin loops chained from several open paths, computed once per model.
+    """
+    if "fixture_loops" not in model:
+        with stage("fixture_loops") as st:
+            model["fixture_loops"] = find_fixture_loops(classified_columns(model), width_thresholds(model)["wall_min_width"])
+            st.add_items(len(model["fixture_loops"]["area"]))
+    return model["fixture_loops"]
+
+def door_assemblies(model):
+    """
+    Whole doors (arcs + leaves + frame stubs) found over the classified columns, computed once per model.
+    Paths already taken by a fixture loop are left out.
+    """
+    if "door_assemblies" not in model:
+        in_loop = fixture_loops(model)["loop"] >= 0
+        with stage("door_assembly") as st:
+            model["door_assemblies"] = find_door_assemblies(classified_columns(model), exclude=in_loop)
+            st.add_items(len(model["door_assemblies"]["leaf_width"]))
+    return model["door_assemblies"]
+
+def symbols(model):
+    """
+    Repeated door/fixture symbols (symbol_fingerprints.find_symbols), computed once per model.
+    """
+    if "symbols" not in model:
+        loops = fixture_loops(model)
+        assemblies = door_assemblies(model)
+        with stage("symbols") as st:
+            model["symbols"] = find_symbols(classified_columns(model), loops, assemblies)
+            st.add_items(int(model["symbols"]["instances"].sum()))
+    return model["symbols"]
+
+def rooms(model):
+    """
+    Rooms rebuilt from the walls and door openings (rooms.find_rooms), with the scanned
+    labels assigned to them, computed once per model.
+    """
+    if "rooms" not in model:
+        assemblies = door_assemblies(model)
+        labels = scanned_text(model)[1]
+        with stage("rooms") as st:
+            model["rooms"] = find_rooms(classified_columns(model), assemblies, label_points(labels))
+            st.add_items(len(model["rooms"]["area"]))
+    return model["rooms"]
+
+def label_links(model):
+    """
+    Door labels and fixture/appliance codes linked to the nearest door assembly or basin
+    (label_links.link_labels), computed once per model. Returns (links, features).
+    """
+    if "label_links" not in model:
+        loops = fixture_loops(model)
+        assemblies = door_assemblies(model)
+        labels = scanned_text(model)[1]
+        with stage("label_links") as st:
+            features = link_features(classified_columns(model), loops, assemblies)
+            model["label_links"] = (link_labels(labels, features), features)
+            st.add_items(int((model["label_links"][0]["feature"] >= 0).sum()))
+    return model["label_links"]
+
+def reported_geometry(model):
+    """
+    What the tabular reports list for a page: lengths, codes and bboxes of the shapes that
+    are a row each, plus ready detailed rows for features made of several shapes
+    (multi-path fixture loops replace their member paths, door assemblies come on top).
+    Returns: (lengths, codes, bboxes, extra_rows)
+    """
+    cols = classified_columns(model)
+    loops = fixture_loops(model)
+    single = loops["loop"] < 0
+    extra_rows = list(loop_rows(loops)) + list(assembly_rows(door_assemblies(model)))
+    return cols["length"][single], cols["code"][single], cols["bbox"][single], extra_rows
+
+def without_shapes(model):
+    """
+    Returns a light copy of the model (columns + text, no drawing dicts).
+    """
+    classified_columns(model)
+    scanned_text(model)
+    return {key: value for key, value in model.items() if key != "shapes"}
+
+# --- On-Disk Representation ---
+def save_page_model(model, path):
+    """
+    Writes a page model to disk so later runs can skip parsing entirely.
+    """
+    with open(path, "wb") as f:
+        pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+def read_page_model(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
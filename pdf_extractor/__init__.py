@@ -0,0 +1,9 @@
+"""
+Floor plan feature extraction from vector PDF drawings.
+
+The extractors are the top-level modules of this distribution (page_model,
+extract_pdf_data, generate_layer_pdf, ...); this package holds the
+`pdf-extractor` command line entry point (pdf_extractor.cli).
+"""
+
+__version__ = "0.1.0"
@@ -0,0 +1,3 @@
+from pdf_extractor.cli import main
+
+main()
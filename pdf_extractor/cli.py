@@ -0,0 +1,51 @@
+import importlib
+import sys
+
+from pdf_extractor import __version__
+
+# --- Subcommands ---
+# name -> (module, summary). Each subcommand is the module's own main() with its own
+# options; the module is imported only when its subcommand runs, so `pdf-extractor probe`
+# never loads openpyxl or scipy, and `pdf-extractor --help` loads nothing at all.
+COMMANDS = {
+    "extract": ("extract_pdf_data", "Feature report for one page (Excel)"),
+    "layers": ("extract_layers", "One Excel sheet per layer for one page"),
+    "render": ("generate_layer_pdf", "Layer PDFs (one per layer, or one with toggleable layers)"),
+    "pipeline": ("run_pipeline", "Every output from a single parse"),
+    "batch": ("batch_extract", "Every page of a set of PDFs into the feature store"),
+    "widths": ("analyze_widths", "Stroke width distribution and calibrated cut-offs"),
+    "ocg": ("check_ocg", "Shape counts per PDF layer (OCG) and their mapped categories"),
+    "probe": ("probe_layers", "Pages and PDF layers of a document, without parsing drawings"),
+    "fixtures": ("probe_fixtures", "Fixture keywords, XObjects and curves on a page"),
+    "rules": ("shape_rules", "Dump or validate the shape rule table"),
+    "cache": ("extraction_cache", "Inspect, prune or clear the extraction cache"),
+    "daemon": ("extraction_daemon", "Warm extraction daemon and its client"),
+}
+
+PROG = "pdf-extractor"
+
+def usage():
+    lines = [f"usage: {PROG} <command> [options]   ({PROG} <command> --help for its options)", "", "commands:"]
+    lines += [f"  {name:<10} {summary}" for name, (_, summary) in COMMANDS.items()]
+    return "\n".join(lines)
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ("-h", "--help"):
+        print(usage())
+        return
+    if argv[0] == "--version":
+        print(f"{PROG} {__version__}")
+        return
+    name, rest = argv[0], argv[1:]
+    if name not in COMMANDS:
+        print(f"{PROG}: unknown command '{name}'\n\n{usage()}", file=sys.stderr)
+        sys.exit(2)
+
+    module = importlib.import_module(COMMANDS[name][0])
+    # The subcommand parses sys.argv itself; its usage line reads "pdf-extractor <command>"
+    sys.argv = [f"{PROG} {name}"] + rest
+    module.main()
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,14 @@
+import argparse
 import fitz
 
-def probe_features(pdf_path):
-    doc = fitz.open(pdf_path)
-    page = doc[0]
-    
+# A quick look at one page: this probe parses it once and leaves the extractor (and its
+# symbol table, see the report's Symbols sheet) alone, so it starts fast
+
+def probe_features(pdf_path, page_number=0):
+    with fitz.open(pdf_path) as doc:
+        _probe_page(doc[page_number])
+
+def _probe_page(page):
     print("--- Text Analysis ---")
     text = page.get_text("dict")
     # Search for keywords
@@ -43,5 +48,12 @@ def probe_features(pdf_path):
                  circles += 1
     print(f"Total Curve Segments found: {circles}")
 
+def main():
+    parser = argparse.ArgumentParser(description="Fixture keywords, XObjects and curves on a page.")
+    parser.add_argument("pdf", nargs="?", default="sample.pdf", help="Source PDF")
+    parser.add_argument("--page", type=int, default=1, help="1-based page number")
+    args = parser.parse_args()
+    probe_features(args.pdf, args.page - 1)
+
 if __name__ == "__main__":
-    probe_features("sample.pdf")
+    main()
@@ -1,10 +1,13 @@
+import argparse
 import fitz
-import sys
 
 def probe_layers(pdf_path):
     try:
         doc = fitz.open(pdf_path)
         print(f"File: {pdf_path}")
+        print(f"Pages: {doc.page_count}")
+        for page in doc:
+            print(f"  Page {page.number + 1}: {page.rect.width:.0f} x {page.rect.height:.0f} pt")
         
         # Check for OCGs (Optional Content Groups) which map to layers
         ocgs = doc.get_ocgs()
@@ -20,5 +23,11 @@ def probe_layers(pdf_path):
         # Fallback to simple print if items() fails (depends on version)
         print("Raw OCGs:", doc.get_ocgs())
 
+def main():
+    parser = argparse.ArgumentParser(description="Pages and PDF layers (OCGs) of a document, without parsing any drawings.")
+    parser.add_argument("pdf", nargs="?", default="sample.pdf", help="Source PDF")
+    args = parser.parse_args()
+    probe_layers(args.pdf)
+
 if __name__ == "__main__":
-    probe_layers("sample.pdf")
+    main()
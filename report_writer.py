@@ -0,0 +1,205 @@
+import csv
+import json
+import os
+
+from feature_table import FeatureTable
+
+# --- Report Layout ---
+DETAILED_COLUMNS = ["Category", "Type", "Length", "X_Min", "Y_Min", "X_Max", "Y_Max"]
+TEXT_COLUMNS = ["Text", "Font", "Size", "X", "Y"]
+SUMMARY_COLUMNS = ["Category", "Count", "Total Length"]
+LOOP_COLUMNS = ["Category", "Paths", "Perimeter", "Area", "X_Min", "Y_Min", "X_Max", "Y_Max"]
+WIDTH_COLUMNS = ["Threshold", "Value", "Source"]
+SYMBOL_COLUMNS = ["Symbol", "Category", "Instances", "Paths", "Length", "Leaf_Width", "Area"]
+ROOM_COLUMNS = ["Room", "Area", "Perimeter", "Holes", "Labels", "X_Min", "Y_Min", "X_Max", "Y_Max"]
+LINK_COLUMNS = ["Label", "Category", "Type", "Room", "Feature", "Distance", "Leaf_Width", "Arcs", "Leaves", "Area",
+                "X_Min", "Y_Min", "X_Max", "Y_Max"]
+
+REPORT_FORMATS = ("xlsx", "csv", "jsonl")
+
+# --- Row Production ---
+def ordered_feature_rows(lengths, codes, bboxes, categories, text_feats, extra_rows=()):
+    """
+    Yields detailed rows (tuples in DETAILED_COLUMNS order, unrounded) for one page, grouped
+    by category and ordered by Y_Min inside each group, without building a DataFrame.
+    lengths/codes/bboxes come from geometry_kernel.quantify_shapes, text_feats from a
+    text extractor (dicts with Category, X, Y), extra_rows are ready detailed rows from
+    other detectors (e.g. door_assembly.assembly_rows).
+    """
+    return FeatureTable.from_parts(lengths, codes, bboxes, categories, text_feats, extra_rows).rows()
+
+def rounded_row(row):
+    """
+    Rounds Length and the bbox coordinates of a detailed row for output.
+    """
+    return list(row[:2]) + [round(v, 2) for v in row[2:]]
+
+# --- Sheet Backends ---
+# Every backend exposes sheet(name, columns) -> object with append(values), and close().
+# Rows go straight to disk, so memory stays flat however many rows a report has.
+
+class _XlsxBackend:
+    def __init__(self, path):
+        from openpyxl import Workbook
+        self.path = path
+        self.workbook = Workbook(write_only=True)
+
+    def sheet(self, name, columns):
+        ws = self.workbook.create_sheet(title=name)
+        ws.append(columns)
+        return ws
+
+    def close(self):
+        self.workbook.save(self.path)
+
+class _CsvSheet:
+    def __init__(self, path, columns):
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+
+    def append(self, values):
+        self.writer.writerow(values)
+
+class _CsvBackend:
+    """One CSV file per sheet: <stem>.<sheet>.csv"""
+    def __init__(self, path):
+        self.stem = os.path.splitext(path)[0]
+        self.sheets = []
+
+    def sheet(self, name, columns):
+        slug = name.lower().replace(" ", "_")
+        sheet = _CsvSheet(f"{self.stem}.{slug}.csv", columns)
+        self.sheets.append(sheet)
+        return sheet
+
+    def close(self):
+        for sheet in self.sheets:
+            sheet.file.close()
+
+class _JsonlSheet:
+    def __init__(self, file, name, columns):
+        self.file = file
+        self.name = name
+        self.columns = columns
+
+    def append(self, values):
+        record = {"sheet": self.name}
+        record.update(zip(self.columns, values))
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+class _JsonlBackend:
+    """A single JSON Lines file; every record carries a "sheet" field."""
+    def __init__(self, path):
+        self.file = open(path, "w", encoding="utf-8")
+
+    def sheet(self, name, columns):
+        return _JsonlSheet(self.file, name, columns)
+
+    def close(self):
+        self.file.close()
+
+def open_backend(path, fmt=None):
+    """
+    Opens a sheet backend, picking the format from the file extension unless fmt is given.
+    """
+    fmt = fmt or os.path.splitext(path)[1].lstrip(".").lower()
+    if fmt == "xlsx":
+        return _XlsxBackend(path)
+    if fmt == "csv":
+        return _CsvBackend(path)
+    if fmt == "jsonl":
+        return _JsonlBackend(path)
+    raise ValueError(f"Unsupported report format '{fmt}' (expected one of {', '.join(REPORT_FORMATS)})")
+
+# --- Streaming Report Writer ---
+class StreamingReportWriter:
+    """
+    Writes the Summary / Detailed Features / All Text report row by row.
+    The Summary sheet is built from running per-category aggregates when the writer closes.
+    lead_columns (e.g. ["File", "Page"]) are prepended to the detailed and text sheets.
+    """
+
+    def __init__(self, path, fmt=None, lead_columns=(), extra_sheets=()):
+        self.path = path
+        self.backend = open_backend(path, fmt)
+        self.lead_columns = list(lead_columns)
+        self.stats = {}
+        self.feature_count = 0
+        self.text_count = 0
+
+        # Summary first so it is the first tab; it is filled in on close()
+        self.summary_sheet = self.backend.sheet("Summary", SUMMARY_COLUMNS)
+        self.extra = {name: self.backend.sheet(name, columns) for name, columns in extra_sheets}
+        self.detailed_sheet = self.backend.sheet("Detailed Features", self.lead_columns + DETAILED_COLUMNS)
+        self.text_sheet = self.backend.sheet("All Text", self.lead_columns + TEXT_COLUMNS)
+
+    def write_feature(self, row, lead=()):
+        """
+        row is a tuple in DETAILED_COLUMNS order; the Summary uses the unrounded length.
+        """
+        cat = row[0]
+        if cat not in self.stats:
+            self.stats[cat] = {"count": 0, "length": 0.0}
+        self.stats[cat]["count"] += 1
+        self.stats[cat]["length"] += row[2]
+        self.feature_count += 1
+        self.detailed_sheet.append(list(lead) + rounded_row(row))
+
+    def write_text(self, row, lead=()):
+        """
+        row is a tuple in TEXT_COLUMNS order.
+        """
+        self.text_count += 1
+        self.text_sheet.append(list(lead) + list(row))
+
+    def write_extra(self, name, row):
+        self.extra[name].append(list(row))
+
+    def summary_rows(self):
+        return [(cat, self.stats[cat]["count"], self.stats[cat]["length"]) for cat in sorted(self.stats)]
+
+    def close(self):
+        for row in self.summary_rows():
+            self.summary_sheet.append(list(row))
+        self.backend.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+# --- Per-Category Sheets Writer ---
+class CategorySheetsWriter:
+    """
+    Streams detailed rows into one sheet per category, creating sheets as categories appear.
+    """
+
+    def __init__(self, path, fmt=None):
+        self.path = path
+        self.backend = open_backend(path, fmt)
+        self.sheets = {}
+        self.counts = {}
+
+    @staticmethod
+    def sheet_name(cat):
+        # Sanitize sheet name (Max 31 chars)
+        return str(cat).replace(":", "").replace("/", "_").strip()[:30]
+
+    def write(self, row):
+        cat = row[0]
+        if cat not in self.sheets:
+            self.sheets[cat] = self.backend.sheet(self.sheet_name(cat), DETAILED_COLUMNS)
+            self.counts[cat] = 0
+        self.sheets[cat].append(rounded_row(row))
+        self.counts[cat] += 1
+
+    def close(self):
+        self.backend.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,305 @@
+import numpy as np
+
+from geometry import CLOSURE_TOLERANCE, ROOM_MIN_AREA, ROOM_MIN_WIDTH, DOOR_OPENING_EXTENSION
+from geometry_kernel import CATEGORY_CODES
+from door_assembly import ROLE_ARC, ROLE_LEAF
+from spatial_index import EndpointIndex, PolygonIndex, expand_runs
+
+# --- Room Reconstruction ---
+# Rooms are the faces of the planar graph drawn by the walls:
+#   1. Segments: every "Wall" path (each segment of a polyline), plus a line across every
+#      swing door's opening, from the hinge to where the closed leaf would end, stretched
+#      DOOR_OPENING_EXTENSION of the leaf past both ends so it meets the jambs
+#   2. Noding: segments are split where they cross and where an end point lies within
+#      CLOSURE_TOLERANCE of another segment (junctions that stop short, overlapping lines).
+#      Candidate pairs come from a sweep over bounding boxes sorted by x. End points
+#      within CLOSURE_TOLERANCE merge into one vertex (EndpointIndex + components)
+#   3. Dangling edges (stubs, the overhang of the door lines) are pruned
+#   4. Faces are traced over half-edges: arriving at a vertex, leave by the next edge
+#      clockwise. Bounded faces come out counter-clockwise (positive area), and the outer
+#      boundary of every connected piece of the graph comes out negative
+#   5. Faces of at least ROOM_MIN_AREA whose mean width (2 * area / perimeter) reaches
+#      ROOM_MIN_WIDTH are rooms. The cavity between a wall's two lines is narrower than
+#      that. A separate piece inside a room (a shaft, a column) is subtracted as a hole
+# Text labels are assigned to the room containing their span centre through a
+# PolygonIndex. Openings without a swing door (arches, sliding doors, open plan) stay
+# open, so the spaces on either side come out as one room.
+
+WALL_CATEGORY = "Wall"
+
+def wall_segments(cols):
+    """
+    (s, 2, 2) start/end points of every segment of the page's "Wall" paths.
+    """
+    wall = cols["code"] == CATEGORY_CODES.get(WALL_CATEGORY, -1)
+    multi = np.zeros(len(wall), dtype=bool)
+    multi[cols["segment_shape"]] = True
+    single = wall & ~multi & cols["has_end"]
+    in_wall = wall[cols["segment_shape"]]
+    start = np.concatenate([cols["start"][single], cols["segment_start"][in_wall]])
+    end = np.concatenate([cols["end"][single], cols["segment_end"][in_wall]])
+    return np.stack([start, end], axis=1)
+
+def door_openings(cols, assemblies):
+    """
+    (d, 2, 2) lines closing the openings of the door assemblies that have a leaf.
+    The hinge is the leaf end whose quarter turn lands on an end of the door's arc.
+    """
+    role = assemblies["role"]
+    assembly = assemblies["assembly"]
+    leaves = np.flatnonzero(role == ROLE_LEAF)
+    if not len(leaves):
+        return np.empty((0, 2, 2))
+
+    # The longest leaf of each door
+    order = np.lexsort((-cols["length"][leaves], assembly[leaves]))
+    doors, first = np.unique(assembly[leaves][order], return_index=True)
+    leaf = leaves[order[first]]
+    slot = np.full(len(assemblies["leaf_width"]), -1, dtype=np.int64)
+    slot[doors] = np.arange(len(doors))
+
+    arcs = np.flatnonzero(role == ROLE_ARC)
+    ends = np.concatenate([cols["start"][arcs], cols["end"][arcs]])
+    end_slot = slot[np.concatenate([assembly[arcs], assembly[arcs]])]
+    ends, end_slot = ends[end_slot >= 0], end_slot[end_slot >= 0]
+
+    # Four candidates: hinge at either leaf end, the leaf closed either way round
+    hinges = []
+    closed = []
+    a, b = cols["start"][leaf], cols["end"][leaf]
+    for hinge, tip in ((a, b), (b, a)):
+        v = tip - hinge
+        for turn in (1, -1):
+            hinges.append(hinge)
+            closed.append(hinge + turn * np.stack([-v[:, 1], v[:, 0]], axis=1))
+    hinges = np.stack(hinges, axis=1)
+    closed = np.stack(closed, axis=1)
+    miss = np.full((len(doors), 4), np.inf)
+    for k in range(4):
+        np.minimum.at(miss[:, k], end_slot, np.hypot(*(closed[end_slot, k] - ends).T))
+
+    best = np.argmin(miss, axis=1)
+    rows = np.arange(len(doors))
+    hinge, shut = hinges[rows, best], closed[rows, best]
+    width = np.hypot(*(shut - hinge).T)
+    ok = (width > 0) & (miss[rows, best] <= DOOR_OPENING_EXTENSION * width)
+    reach = DOOR_OPENING_EXTENSION * (shut - hinge)
+    return np.stack([hinge - reach, shut + reach], axis=1)[ok]
+
+def _cross(a, b):
+    return a[:, 0] * b[:, 1] - a[:, 1] * b[:, 0]
+
+def node_segments(segments, tolerance=CLOSURE_TOLERANCE):
+    """
+    Splits segments where they cross or where an end point lies on another segment and
+    merges end points within tolerance.
+    Returns: (vertices (v, 2), edges (e, 2) as vertex pairs, without loops or duplicates)
+    """
+    n = len(segments)
+    p = segments[:, 0]
+    q = segments[:, 1]
+    r = q - p
+    length = np.hypot(r[:, 0], r[:, 1])
+    low = np.minimum(p, q) - tolerance
+    high = np.maximum(p, q) + tolerance
+
+    # Candidate pairs: sweep over segments sorted by x_min
+    order = np.argsort(low[:, 0], kind="stable")
+    stop = np.searchsorted(low[order, 0], high[order, 0], side="right")
+    first, offset = expand_runs(np.maximum(stop - np.arange(n) - 1, 0))
+    i, j = order[first], order[first + 1 + offset]
+    overlap = (low[i, 1] <= high[j, 1]) & (low[j, 1] <= high[i, 1])
+    i, j = i[overlap], j[overlap]
+
+    split_seg = [np.arange(n), np.arange(n)]
+    split_t = [np.zeros(n), np.ones(n)]
+    split_point = [p, q]
+
+    # Crossings, including ones that miss an end by less than the tolerance
+    denom = _cross(r[i], r[j])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = _cross(p[j] - p[i], r[j]) / denom
+        u = _cross(p[j] - p[i], r[i]) / denom
+        slack_i = tolerance / length[i]
+        slack_j = tolerance / length[j]
+    hit = (denom != 0) & (t >= -slack_i) & (t <= 1 + slack_i) & (u >= -slack_j) & (u <= 1 + slack_j)
+    point = p[i[hit]] + t[hit, None] * r[i[hit]]
+    split_seg += [i[hit], j[hit]]
+    split_t += [np.clip(t[hit], 0, 1), np.clip(u[hit], 0, 1)]
+    split_point += [point, point]
+
+    # End points lying on the other segment (junctions that stop short, collinear overlaps)
+    for a, b in ((i, j), (j, i)):
+        for end in (p[b], q[b]):
+            with np.errstate(divide="ignore", invalid="ignore"):
+                s = np.einsum("ij,ij->i", end - p[a], r[a]) / length[a] ** 2
+            foot = p[a] + s[:, None] * r[a]
+            on = (s > 0) & (s < 1) & (np.hypot(*(foot - end).T) < tolerance)
+            split_seg.append(a[on])
+            split_t.append(s[on])
+            split_point.append(end[on])
+
+    seg = np.concatenate(split_seg)
+    t = np.concatenate(split_t)
+    points = np.concatenate(split_point)
+    order = np.lexsort((t, seg))
+    seg, points = seg[order], points[order]
+
+    # Merge points within tolerance into vertices
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+    pairs = EndpointIndex(points, tolerance=tolerance).self_pairs()
+    graph = coo_matrix((np.ones(len(pairs), dtype=np.int8), (pairs[:, 0], pairs[:, 1])), shape=(len(points), len(points)))
+    count, vertex = connected_components(graph, directed=False)
+    weight = np.bincount(vertex, minlength=count)
+    vertices = np.stack([np.bincount(vertex, weights=points[:, 0], minlength=count),
+                         np.bincount(vertex, weights=points[:, 1], minlength=count)], axis=1) / weight[:, None]
+
+    # Consecutive points along the same segment are an edge
+    same = seg[1:] == seg[:-1]
+    edges = np.stack([vertex[:-1][same], vertex[1:][same]], axis=1)
+    edges = edges[edges[:, 0] != edges[:, 1]]
+    edges = np.unique(np.sort(edges, axis=1), axis=0)
+    return vertices, edges
+
+def prune_dangles(vertex_count, edges):
+    """
+    Drops edges with an end of degree one, repeatedly, until every vertex closes a cycle.
+    """
+    keep = np.ones(len(edges), dtype=bool)
+    while True:
+        degree = np.bincount(edges[keep].ravel(), minlength=vertex_count)
+        dangling = keep & ((degree[edges[:, 0]] < 2) | (degree[edges[:, 1]] < 2))
+        if not dangling.any():
+            return edges[keep]
+        keep &= ~dangling
+
+def trace_faces(vertices, edges):
+    """
+    Traces every face of the planar graph over half-edges (see above).
+    Returns a dict:
+      face      - (2e,) face index per half-edge
+      origin    - (2e,) start vertex per half-edge, dest (2e,) end vertex
+      area      - (f,) signed area per face (positive for bounded faces)
+      perimeter - (f,) per face
+      piece     - (f,) connected piece of the graph each face belongs to
+    """
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    e = len(edges)
+    origin = np.concatenate([edges[:, 0], edges[:, 1]])
+    dest = np.concatenate([edges[:, 1], edges[:, 0]])
+    twin = np.concatenate([np.arange(e) + e, np.arange(e)])
+    d = vertices[dest] - vertices[origin]
+
+    # Half-edges around each vertex in counter-clockwise order
+    order = np.lexsort((np.arctan2(d[:, 1], d[:, 0]), origin))
+    position = np.empty(2 * e, dtype=np.int64)
+    position[order] = np.arange(2 * e)
+    group_start = np.searchsorted(origin[order], origin, side="left")
+    group_end = np.searchsorted(origin[order], origin, side="right")
+    # Next around the face: the edge leaving the far vertex just clockwise of the way back
+    back = position[twin]
+    before = np.where(back == group_start[twin], group_end[twin] - 1, back - 1)
+    following = order[before]
+
+    graph = coo_matrix((np.ones(2 * e, dtype=np.int8), (np.arange(2 * e), following)), shape=(2 * e, 2 * e))
+    count, face = connected_components(graph, directed=True, connection="weak")
+    area = np.bincount(face, weights=_cross(vertices[origin], vertices[dest]), minlength=count) / 2
+    perimeter = np.bincount(face, weights=np.hypot(d[:, 0], d[:, 1]), minlength=count)
+
+    pieces_graph = coo_matrix((np.ones(e, dtype=np.int8), (edges[:, 0], edges[:, 1])), shape=(len(vertices), len(vertices)))
+    _, vertex_piece = connected_components(pieces_graph, directed=False)
+    piece = np.zeros(count, dtype=np.int64)
+    piece[face] = vertex_piece[origin]
+    return {"face": face, "origin": origin, "dest": dest, "area": area, "perimeter": perimeter, "piece": piece}
+
+def find_rooms(cols, assemblies, points=None):
+    """
+    Rebuilds rooms from the classified wall columns and door assemblies (see above) and
+    assigns the given points (e.g. text_labels.label_points) to them.
+    Returns a dict, rooms numbered top to bottom, then left to right:
+      area, perimeter - (k,) per room, holes subtracted from the area
+      holes           - (k,) number of separate pieces inside each room
+      bbox            - (k, 4)
+      index           - PolygonIndex over the room boundaries
+      point_room      - (p,) room index per point, -1 outside every room
+      openings        - number of door openings closed
+    """
+    openings = door_openings(cols, assemblies)
+    segments = np.concatenate([wall_segments(cols), openings])
+    segments = segments[np.hypot(*(segments[:, 1] - segments[:, 0]).T) > 0]
+    points = np.empty((0, 2)) if points is None else points
+
+    empty = {"area": np.zeros(0), "perimeter": np.zeros(0), "holes": np.zeros(0, dtype=np.int64),
+             "bbox": np.zeros((0, 4)), "index": PolygonIndex(np.zeros((0, 2)), np.zeros((0, 2)), np.zeros(0, dtype=np.int64), 0),
+             "point_room": np.full(len(points), -1, dtype=np.int64), "openings": len(openings)}
+    if not len(segments):
+        return empty
+    vertices, edges = node_segments(segments)
+    edges = prune_dangles(len(vertices), edges)
+    if not len(edges):
+        return empty
+    faces = trace_faces(vertices, edges)
+
+    area = faces["area"]
+    perimeter = faces["perimeter"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        is_room = (area >= ROOM_MIN_AREA) & (2 * area / perimeter >= ROOM_MIN_WIDTH)
+    room_faces = np.flatnonzero(is_room)
+
+    # Number rooms top to bottom, then left to right
+    half_face = faces["face"]
+    bbox = np.zeros((len(area), 4))
+    bbox[:, 0:2] = np.inf
+    bbox[:, 2:4] = -np.inf
+    np.minimum.at(bbox[:, 0:2], half_face, vertices[faces["origin"]])
+    np.maximum.at(bbox[:, 2:4], half_face, vertices[faces["origin"]])
+    room_faces = room_faces[np.lexsort((np.round(bbox[room_faces, 0], 2), np.round(bbox[room_faces, 1], 2)))]
+    room_of_face = np.full(len(area), -1, dtype=np.int64)
+    room_of_face[room_faces] = np.arange(len(room_faces))
+
+    on_room = room_of_face[half_face] >= 0
+    index = PolygonIndex(vertices[faces["origin"][on_room]], vertices[faces["dest"][on_room]],
+                         room_of_face[half_face[on_room]], len(room_faces))
+
+    # Holes: the outer boundary of another piece, inside the smallest room around it
+    room_area = area[room_faces].copy()
+    holes = np.zeros(len(room_faces), dtype=np.int64)
+    outer = np.flatnonzero(area < 0)
+    if len(outer) and len(room_faces):
+        _, first_half = np.unique(half_face, return_index=True)
+        pairs = index.containing_pairs(vertices[faces["origin"][first_half[outer]]])
+        hole, room = outer[pairs[:, 0]], pairs[:, 1]
+        other = faces["piece"][hole] != faces["piece"][room_faces[room]]
+        hole, room = hole[other], room[other]
+        order = np.lexsort((room_area[room], hole))
+        _, first = np.unique(hole[order], return_index=True)
+        hole, room = hole[order[first]], room[order[first]]
+        np.add.at(room_area, room, area[hole])
+        holes = np.bincount(room, minlength=len(room_faces))
+
+    return {
+        "area": room_area,
+        "perimeter": perimeter[room_faces],
+        "holes": holes,
+        "bbox": bbox[room_faces],
+        "index": index,
+        "point_room": index.locate(points, areas=area[room_faces]),
+        "openings": len(openings)
+    }
+
+def room_table_rows(rooms, labels):
+    """
+    One row per room in report_writer.ROOM_COLUMNS order, with the texts of the labels
+    (text_labels.scan_text tuples, in the order rooms["point_room"] was computed for) inside it.
+    """
+    texts = [[] for _ in range(len(rooms["area"]))]
+    for label, room in zip(labels, rooms["point_room"].tolist()):
+        if room >= 0:
+            texts[room].append(label[1])
+    for k, (area, perimeter, holes, box) in enumerate(zip(rooms["area"].tolist(), rooms["perimeter"].tolist(),
+                                                          rooms["holes"].tolist(), rooms["bbox"].tolist())):
+        yield (f"R{k + 1}", round(area, 2), round(perimeter, 2), holes, "; ".join(texts[k]),
+               round(box[0], 2), round(box[1], 2), round(box[2], 2), round(box[3], 2))
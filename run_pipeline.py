@@ -0,0 +1,100 @@
+import argparse
+import os
+
+from page_model import load_page_model, save_page_model, read_page_model, OCG_FILTER_ENV
+from extraction_cache import load_cached_page_model
+from tiled_extraction import load_tiled_page_model, parse_grid
+from extract_pdf_data import write_report, page_feature_table, extract_all_text, EXCEL_FILE
+from extract_layers import write_separated_sheets, SEPARATED_FILE
+from generate_layer_pdf import generate_layer_pdfs, generate_layered_pdf, OUTPUT_DIR, LAYERED_PDF_FILE
+from width_calibration import CALIBRATE_ENV
+import instrumentation
+
+# --- Single-Parse Pipeline ---
+def run_pipeline(model, excel_file=EXCEL_FILE, separated_file=SEPARATED_FILE, output_dir=OUTPUT_DIR, store_root=None,
+                 layered_file=None):
+    """
+    Produces the Excel summary, the separated sheets and the layer PDFs from one page model,
+    and optionally stores the page in the Parquet feature store.
+    layered_file writes one PDF with a toggleable layer per category instead of output_dir.
+    Pass None for any output to skip it.
+    """
+    if store_root:
+        from feature_store import write_page, document_key
+        print("\n=== Feature Store ===")
+        write_page(store_root, document_key(model["file"]), model["page"] + 1,
+                   page_feature_table(model), list(extract_all_text(model)))
+        print(f"Stored page {model['page'] + 1} in {os.path.abspath(store_root)}")
+    if excel_file:
+        print("\n=== Feature Report ===")
+        write_report(model, excel_file)
+    if separated_file:
+        print("\n=== Separated Sheets ===")
+        write_separated_sheets(model, separated_file)
+    if layered_file:
+        print("\n=== Layered PDF ===")
+        generate_layered_pdf(model, layered_file)
+    elif output_dir:
+        print("\n=== Layer PDFs ===")
+        generate_layer_pdfs(model, output_dir)
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse a PDF page once and produce every output from it.")
+    parser.add_argument("pdf", nargs="?", default="sample.pdf", help="Source PDF")
+    parser.add_argument("--page", type=int, default=1, help="1-based page number")
+    parser.add_argument("--model", help="Reuse a page model saved by --save-model instead of parsing the PDF")
+    parser.add_argument("--save-model", help="Write the parsed page model to this file")
+    parser.add_argument("--no-cache", action="store_true", help="Always re-parse the PDF instead of using the extraction cache")
+    parser.add_argument("--tiles", type=parse_grid, metavar="RxC",
+                        help="Extract the page in a grid of tiles (e.g. 3x3) to bound memory on oversized sheets; implies --no-layers")
+    parser.add_argument("--store", help="Also write the page into this Parquet feature store")
+    parser.add_argument("--calibrate-widths", action="store_true",
+                        help="Pick the wall/window width cut-offs per page from its width histogram (same as PDF_EXTRACTOR_CALIBRATE=1)")
+    parser.add_argument("--ocg", action="append", metavar="PATTERN",
+                        help="Only extract drawings on PDF layers (OCGs) matching this name glob; repeatable (same as PDF_EXTRACTOR_OCGS)")
+    parser.add_argument("--no-report", action="store_true", help=f"Skip {EXCEL_FILE}")
+    parser.add_argument("--no-sheets", action="store_true", help=f"Skip {SEPARATED_FILE}")
+    parser.add_argument("--no-layers", action="store_true", help=f"Skip {OUTPUT_DIR}/")
+    parser.add_argument("--layered", nargs="?", const=LAYERED_PDF_FILE, metavar="PDF",
+                        help=f"Write one PDF with a toggleable layer per category instead of {OUTPUT_DIR}/ (default: {LAYERED_PDF_FILE})")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    instrumentation.enable_from_args(args)
+    if args.calibrate_widths:
+        os.environ[CALIBRATE_ENV] = "1" # read by every page load, including worker processes
+    if args.ocg:
+        os.environ[OCG_FILTER_ENV] = ";".join(args.ocg)
+
+    if args.model:
+        print(f"Loading page model {args.model}...")
+        model = read_page_model(args.model)
+    else:
+        if not os.path.exists(args.pdf):
+            print(f"Error: {args.pdf} not found.")
+            return
+        print(f"Parsing {args.pdf} (page {args.page})...")
+        if args.tiles:
+            # Tiles yield a light model: tabular outputs only
+            model = load_tiled_page_model(args.pdf, args.page - 1, args.tiles)
+            args.no_layers = True
+        elif args.no_cache:
+            model = load_page_model(args.pdf, args.page - 1)
+        else:
+            # Layer PDFs need the drawings themselves; the tabular outputs only need the light model
+            model = load_cached_page_model(args.pdf, args.page - 1, shapes=not args.no_layers or bool(args.save_model))
+
+    if args.save_model:
+        save_page_model(model, args.save_model)
+        print(f"Saved page model to {os.path.abspath(args.save_model)}")
+
+    run_pipeline(
+        model,
+        excel_file=None if args.no_report else EXCEL_FILE,
+        separated_file=None if args.no_sheets else SEPARATED_FILE,
+        output_dir=None if args.no_layers else OUTPUT_DIR,
+        store_root=args.store,
+        layered_file=None if args.no_layers else args.layered,
+    )
+
+if __name__ == "__main__":
+    main()
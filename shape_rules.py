@@ -0,0 +1,300 @@
+import argparse
+import fnmatch
+import json
+import operator
+import os
+import re
+import sys
+
+import numpy as np
+
+from geometry import WALL_MIN_WIDTH, WINDOW_MAX_WIDTH, BASIN_MIN_PERIMETER, BASIN_MAX_PERIMETER
+
+# --- Shape Rule Table ---
+# The width/curve/closure cascade shared by every script, as data. Rules are tried in
+# order and the first one whose tests all hold gives the shape its category; shapes no
+# rule matches fall into DEFAULT_RULE. Each rule is
+#   {"category": report category, "layer": layer PDF name, "when": {attribute: test, ...}}
+# with tests over the geometry_kernel.shape_columns attributes:
+#   width, length, area    {">": v, ">=": v, "<": v, "<=": v, "==": v} (all must hold);
+#                          v is a number or the name of one of the THRESHOLDS below
+#   is_curve, is_closed    true / false
+#   type                   "s" (stroke), "f" (fill) or "fs"
+#   fill, color            null (unset) or [r, g, b] (0..1, within COLOR_TOLERANCE)
+# The table is JSON-shaped, so PDF_EXTRACTOR_RULES=<rules.json> can replace it without
+# code changes; `python3 shape_rules.py > rules.json` writes the active table (and the
+# OCG layer map below) as a start.
+# "Door (Swing)", "Standard Line", "Window/Detail" and "Sanitary: Wash Basin (Est.)" are
+# also read by the door assembly and basin loop steps; keep them when editing the table.
+
+SHAPE_RULES = [
+    {"category": "Sanitary: Wash Basin (Est.)", "layer": "Sanitary_Basin",
+     "when": {"is_curve": True, "is_closed": True, "length": {">": "basin_min_perimeter", "<": "basin_max_perimeter"}}},
+    {"category": "Wall", "layer": "Wall",
+     "when": {"width": {">=": "wall_min_width"}}},
+    {"category": "Door (Swing)", "layer": "Door",
+     "when": {"is_curve": True, "width": {"<": "wall_min_width"}}},
+    {"category": "Window/Detail", "layer": "Window_Detail",
+     "when": {"width": {">": 0, "<": "window_max_width"}}},
+    {"category": "Standard Line", "layer": "Standard_Line",
+     "when": {"width": {">=": "window_max_width", "<": "wall_min_width"}}}
+]
+
+# Named thresholds rules can refer to (values from geometry.py). The two width cut-offs
+# may be replaced per document by width_calibration; literal numbers never are.
+THRESHOLDS = {
+    "wall_min_width": WALL_MIN_WIDTH,
+    "window_max_width": WINDOW_MAX_WIDTH,
+    "basin_min_perimeter": BASIN_MIN_PERIMETER,
+    "basin_max_perimeter": BASIN_MAX_PERIMETER
+}
+
+DEFAULT_RULE = {"category": "Other", "layer": "Other"}
+
+# --- OCG Layer Map ---
+# Drawings on an Optional Content Group (a real PDF layer) whose name matches an entry
+# take that entry's category; the shape rules above run for everything else. Entries are
+# tried in order, and the first whose glob matches decides for the layer:
+#   {"ocg": glob over the OCG name (case-insensitive), "category": ..., "layer": layer PDF name,
+#    "when": {attribute: test, ...}, "flag": name}
+# "when" (same tests as a shape rule) limits the category to some of the layer's drawings;
+# the rest go through the shape rules. "flag" marks every drawing on the layer for the
+# steps that read layers themselves (see ocg_flags): door_assembly takes the straight
+# paths on a "door" layer as leaf candidates whatever their width, since architects put
+# leaves and frame stubs on the door layer next to the swings. An entry needs a category,
+# a flag or both; "layer" is only needed for categories no shape rule has. The defaults
+# cover the US National CAD Standard layer names; a rules file can replace them with a
+# "layer_map" list.
+LAYER_MAP = [
+    {"ocg": "A-WALL-PATT*", "category": "Other"},
+    {"ocg": "A-WALL*", "category": "Wall"},
+    {"ocg": "A-DOOR*", "category": "Door (Swing)", "when": {"is_curve": True}, "flag": "door"},
+    {"ocg": "A-GLAZ*", "category": "Window/Detail"}
+]
+
+RULES_ENV = "PDF_EXTRACTOR_RULES"
+COLOR_TOLERANCE = 1e-3
+
+NUMERIC_ATTRIBUTES = ("width", "length", "area")
+FLAG_ATTRIBUTES = ("is_curve", "is_closed")
+COLOR_ATTRIBUTES = ("fill", "color")
+TYPE_ATTRIBUTES = ("type",)
+
+OPERATORS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq
+}
+
+# --- Loading ---
+def _validate_tests(name, when):
+    for attr, test in when.items():
+        if attr in NUMERIC_ATTRIBUTES:
+            if not isinstance(test, dict) or not test or set(test) - set(OPERATORS):
+                raise ValueError(f"{name}: {attr} needs comparisons among {', '.join(OPERATORS)}")
+            for bound in test.values():
+                if isinstance(bound, str) and bound not in THRESHOLDS:
+                    raise ValueError(f"{name}: unknown threshold {bound} (one of {', '.join(THRESHOLDS)})")
+        elif attr in FLAG_ATTRIBUTES:
+            if not isinstance(test, bool):
+                raise ValueError(f"{name}: {attr} must be true or false")
+        elif attr in COLOR_ATTRIBUTES:
+            if test is not None and (not isinstance(test, list) or len(test) != 3):
+                raise ValueError(f"{name}: {attr} must be null or [r, g, b]")
+        elif attr not in TYPE_ATTRIBUTES:
+            raise ValueError(f"{name}: unknown attribute {attr}")
+
+def validate_rules(rules):
+    """
+    Checks a rule table's shape and raises ValueError naming the first bad entry.
+    """
+    if not isinstance(rules, list):
+        raise ValueError("The rule table must be a list of rules")
+    for i, rule in enumerate(rules):
+        if not isinstance(rule, dict) or not isinstance(rule.get("category"), str) or not isinstance(rule.get("when"), dict):
+            raise ValueError(f"Rule {i} needs a \"category\" string and a \"when\" object")
+        _validate_tests(f"Rule {i}", rule["when"])
+    return rules
+
+def validate_layer_map(layer_map):
+    """
+    Checks an OCG layer map and raises ValueError naming the first bad entry.
+    """
+    if not isinstance(layer_map, list):
+        raise ValueError("The layer map must be a list of entries")
+    for i, entry in enumerate(layer_map):
+        if not isinstance(entry, dict) or not isinstance(entry.get("ocg"), str):
+            raise ValueError(f"Layer map entry {i} needs an \"ocg\" string")
+        if not isinstance(entry.get("category", ""), str) or not isinstance(entry.get("flag", ""), str) \
+                or not (entry.get("category") or entry.get("flag")):
+            raise ValueError(f"Layer map entry {i} needs a \"category\" or \"flag\" string")
+        if "when" in entry:
+            if not entry.get("category") or not isinstance(entry["when"], dict):
+                raise ValueError(f"Layer map entry {i}: \"when\" must be an object and needs a \"category\"")
+            _validate_tests(f"Layer map entry {i}", entry["when"])
+    return layer_map
+
+def load_config(path):
+    """
+    Reads a rules file: a list of rules, or {"rules": [...], "layer_map": [...]}.
+    Returns (rules, layer_map); a file without "layer_map" keeps LAYER_MAP.
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        data = {"rules": data}
+    return validate_rules(data.get("rules")), validate_layer_map(data.get("layer_map", LAYER_MAP))
+
+def load_rules(path):
+    """
+    Reads the rule table of a rules file (see load_config).
+    """
+    return load_config(path)[0]
+
+def active_config():
+    """
+    The rules and layer map in effect: the file named by PDF_EXTRACTOR_RULES, else the defaults.
+    """
+    path = os.environ.get(RULES_ENV)
+    return load_config(path) if path else (SHAPE_RULES, LAYER_MAP)
+
+RULES, OCG_MAP = active_config()
+
+def _layer_file_name(category):
+    return re.sub(r"[^\w-]+", "_", category).strip("_") or "Other"
+
+# Category codes index into CATEGORIES: the default first, then rule categories in table
+# order, then categories only the layer map uses
+_MAPPED = [entry for entry in OCG_MAP if entry.get("category")]
+CATEGORIES = [DEFAULT_RULE["category"]] + list(dict.fromkeys(
+    [rule["category"] for rule in RULES] + [entry["category"] for entry in _MAPPED]))
+CATEGORY_CODES = {name: code for code, name in enumerate(CATEGORIES)}
+LAYER_NAMES = {DEFAULT_RULE["category"]: DEFAULT_RULE["layer"]}
+for _rule in RULES + _MAPPED:
+    LAYER_NAMES.setdefault(_rule["category"], _rule.get("layer") or _layer_file_name(_rule["category"]))
+
+# --- Evaluation ---
+def rule_mask(rule, cols, thresholds=THRESHOLDS):
+    """
+    Boolean mask of the shapes (geometry_kernel columns) passing every test of one rule.
+    """
+    mask = np.ones(len(cols["width"]), dtype=bool)
+    for attr, test in rule["when"].items():
+        values = cols[attr]
+        if attr in NUMERIC_ATTRIBUTES:
+            for op, bound in test.items():
+                mask &= OPERATORS[op](values, thresholds[bound] if isinstance(bound, str) else bound)
+        elif attr in COLOR_ATTRIBUTES:
+            if test is None:
+                mask &= np.isnan(values[:, 0])
+            else:
+                mask &= np.all(np.abs(values - np.asarray(test)) < COLOR_TOLERANCE, axis=1)
+        else:
+            mask &= values == test
+    return mask
+
+def ocg_entry(name, layer_map=None):
+    """
+    Index of the layer map entry for drawings on the OCG called name, or -1.
+    """
+    if not name:
+        return -1
+    name = name.lower()
+    for i, entry in enumerate(OCG_MAP if layer_map is None else layer_map):
+        if fnmatch.fnmatchcase(name, entry["ocg"].lower()):
+            return i
+    return -1
+
+def ocg_entries(layers, layer_map=None):
+    """
+    Layer map entry index per shape from its OCG name (-1 where the map says nothing), or
+    None when no shape is on a mapped layer. Each distinct name is matched once.
+    """
+    lookup = {name: ocg_entry(name, layer_map) for name in set(layers)}
+    if max(lookup.values(), default=-1) < 0:
+        return None
+    return np.fromiter((lookup[name] for name in layers), dtype=np.int16, count=len(layers))
+
+def ocg_flags(layers, flag, layer_map=None):
+    """
+    Boolean mask of the shapes on an OCG whose layer map entry carries flag.
+    """
+    layer_map = OCG_MAP if layer_map is None else layer_map
+    entries = ocg_entries(layers, layer_map)
+    if entries is None:
+        return np.zeros(len(layers), dtype=bool)
+    flagged = [i for i, entry in enumerate(layer_map) if entry.get("flag") == flag]
+    return np.isin(entries, flagged)
+
+def _subset(cols, attributes, ids):
+    return {attr: cols[attr][ids] for attr in attributes}
+
+def _rule_codes(cols, rules, thresholds):
+    codes = np.full(len(cols["width"]), CATEGORY_CODES[DEFAULT_RULE["category"]], dtype=np.int8)
+    unassigned = np.ones(len(codes), dtype=bool)
+    for rule in rules:
+        mask = unassigned & rule_mask(rule, cols, thresholds)
+        codes[mask] = CATEGORY_CODES[rule["category"]]
+        unassigned &= ~mask
+    return codes
+
+def classify_with_rules(cols, rules=None, thresholds=None, layer_map=None):
+    """
+    Category code per shape: the layer map's category for drawings on a mapped OCG
+    (passing the entry's "when" tests), else the first rule that matches, else the
+    default category.
+    thresholds overrides some of THRESHOLDS (e.g. width_calibration results).
+    """
+    rules = RULES if rules is None else rules
+    layer_map = OCG_MAP if layer_map is None else layer_map
+    thresholds = {**THRESHOLDS, **thresholds} if thresholds else THRESHOLDS
+    entries = ocg_entries(cols["layer"], layer_map) if "layer" in cols else None
+    if entries is None:
+        return _rule_codes(cols, rules, thresholds)
+
+    codes = np.full(len(entries), -1, dtype=np.int8)
+    for i in np.unique(entries[entries >= 0]).tolist():
+        entry = layer_map[i]
+        if not entry.get("category"):
+            continue
+        ids = np.flatnonzero(entries == i)
+        if entry.get("when"):
+            ids = ids[rule_mask(entry, _subset(cols, {"width", *entry["when"]}, ids), thresholds)]
+        codes[ids] = CATEGORY_CODES[entry["category"]]
+
+    # The shapes the layer map leaves open go through the rules
+    todo = np.flatnonzero(codes < 0)
+    if len(todo):
+        attributes = {"width"}.union(*(rule["when"] for rule in rules))
+        codes[todo] = _rule_codes(_subset(cols, attributes, todo), rules, thresholds)
+    return codes
+
+def classify_attributes(rules=None, thresholds=None, **attributes):
+    """
+    Scalar counterpart for a single shape's attributes (layer: its OCG name); returns the category name.
+    """
+    cols = {}
+    for attr, value in attributes.items():
+        if attr == "layer":
+            cols[attr] = [value]
+        elif attr in COLOR_ATTRIBUTES:
+            cols[attr] = np.array([value if value is not None and len(value) == 3 else (np.nan,) * 3], dtype=np.float64)
+        else:
+            cols[attr] = np.array([value])
+    return CATEGORIES[classify_with_rules(cols, rules, thresholds)[0]]
+
+def main():
+    parser = argparse.ArgumentParser(description="Print or check the shape classification rules and OCG layer map.")
+    parser.add_argument("check", nargs="?", metavar="RULES_JSON", help="Validate this rules file instead of printing the active table")
+    args = parser.parse_args()
+    if args.check:
+        rules, layer_map = load_config(args.check)
+        print(f"{args.check}: {len(rules)} rules, {len(layer_map)} layer map entries OK")
+        return
+    json.dump({"rules": RULES, "layer_map": OCG_MAP}, sys.stdout, indent=2, ensure_ascii=False)
+    print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+import numpy as np
+
+from geometry import DOOR_TOLERANCE
+
+# --- Endpoint Snapping Index ---
+# The door heuristics treat two endpoints as "touching" when
+#   abs(a.x - b.x) < tolerance and abs(a.y - b.y) < tolerance
+# i.e. a strict Chebyshev (L-infinity) distance test. A KD-tree queried with
+# p=inf gives the same test in O(log n) per point instead of a scan over every
+# candidate. cKDTree's radius test is inclusive (<=), so the radius is shrunk
+# to the next float below the tolerance to keep the comparison strict.
+
+class EndpointIndex:
+    """
+    KD-tree over path endpoints, each tagged with the index of the shape it came from.
+    """
+
+    def __init__(self, points, owners=None, tolerance=DOOR_TOLERANCE):
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if owners is None:
+            owners = np.arange(len(self.points))
+        self.owners = np.asarray(owners)
+        self.tolerance = tolerance
+        self._radius = np.nextafter(tolerance, 0)
+        from scipy.spatial import cKDTree
+        self._tree = cKDTree(self.points)
+
+    def __len__(self):
+        return len(self.points)
+
+    def touches(self, points):
+        """
+        Returns a bool array: True where the query point lies within tolerance of any indexed endpoint.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if len(points) == 0 or len(self.points) == 0:
+            return np.zeros(len(points), dtype=bool)
+        counts = self._tree.query_ball_point(points, self._radius, p=np.inf, return_length=True)
+        return counts > 0
+
+    def neighbours(self, points):
+        """
+        Returns, for each query point, the list of owners whose endpoints lie within tolerance.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if len(points) == 0 or len(self.points) == 0:
+            return [[] for _ in range(len(points))]
+        hits = self._tree.query_ball_point(points, self._radius, p=np.inf)
+        return [self.owners[h].tolist() for h in hits]
+
+    def pairs(self, other):
+        """
+        Returns (i, j) index pairs between this index and another EndpointIndex whose points touch.
+        """
+        if len(self.points) == 0 or len(other.points) == 0:
+            return np.empty((0, 2), dtype=np.int64)
+        hits = self._tree.query_ball_tree(other._tree, self._radius, p=np.inf)
+        return np.array([(i, j) for i, js in enumerate(hits) for j in js], dtype=np.int64).reshape(-1, 2)
+
+    def self_pairs(self):
+        """
+        Returns (i, j) index pairs, i < j, of indexed points that touch each other.
+        """
+        if len(self.points) < 2:
+            return np.empty((0, 2), dtype=np.int64)
+        return self._tree.query_pairs(self._radius, p=np.inf, output_type="ndarray").astype(np.int64)
+
+# --- Nearest-Centroid Index ---
+# Point features (door assemblies, basins) are reduced to their bbox centres and put in a
+# KD-tree; a batch of query points is answered by one query(k=1) bounded by a radius, so
+# pairing l labels with f features costs O((l + f) log f) instead of l * f distances.
+
+class CentroidIndex:
+    """
+    KD-tree over feature centroids, answering nearest-feature queries within a radius.
+    """
+
+    def __init__(self, points):
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        self._tree = None
+        if len(self.points):
+            from scipy.spatial import cKDTree
+            self._tree = cKDTree(self.points)
+
+    def __len__(self):
+        return len(self.points)
+
+    def nearest(self, points, radius):
+        """
+        Returns (index, distance) of the nearest centroid for each query point; index is -1
+        and distance inf where no centroid lies within radius (Euclidean, inclusive).
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if len(points) == 0 or self._tree is None:
+            return np.full(len(points), -1, dtype=np.int64), np.full(len(points), np.inf)
+        distance, index = self._tree.query(points, k=1, distance_upper_bound=np.nextafter(radius, np.inf))
+        return np.where(np.isfinite(distance), index, -1).astype(np.int64), distance
+
+# --- Point-in-Polygon Grid Index ---
+# Polygons are given as edge lists (any order, one owner per edge), which is what face
+# tracing produces. Every polygon is registered in the cells of a uniform grid that its
+# bounding box covers (cell size: the median bbox side, so a polygon spans a few cells).
+# A batch of query points is joined to the polygons registered in its cells with one
+# sorted search. Each (point, candidate) pair is then tested against the candidate's
+# edges with the even-odd crossing rule. Both steps are flat array operations, so
+# thousands of labels against hundreds of rooms cost a few vectorized passes.
+
+def expand_runs(counts):
+    """
+    For runs of the given lengths: (run index, offset within the run) of every element.
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    run = np.repeat(np.arange(len(counts)), counts)
+    starts = np.cumsum(counts) - counts
+    return run, np.arange(counts.sum()) - starts[run]
+
+class PolygonIndex:
+    """
+    Grid index over polygons for batched point-in-polygon queries.
+    """
+
+    def __init__(self, edge_start, edge_end, edge_owner, count, cell_size=None):
+        order = np.argsort(edge_owner, kind="stable")
+        self.edge_start = np.asarray(edge_start, dtype=np.float64).reshape(-1, 2)[order]
+        self.edge_end = np.asarray(edge_end, dtype=np.float64).reshape(-1, 2)[order]
+        owner = np.asarray(edge_owner, dtype=np.int64)[order]
+        self.count = count
+        self.edge_count = np.bincount(owner, minlength=count)
+        self.edge_offset = np.cumsum(self.edge_count) - self.edge_count
+
+        self.bbox = np.zeros((count, 4), dtype=np.float64)
+        if count:
+            self.bbox[:, 0:2] = np.inf
+            self.bbox[:, 2:4] = -np.inf
+            ends = np.concatenate([self.edge_start, self.edge_end])
+            owners = np.concatenate([owner, owner])
+            np.minimum.at(self.bbox[:, 0:2], owners, ends)
+            np.maximum.at(self.bbox[:, 2:4], owners, ends)
+        self.bbox[~np.isfinite(self.bbox)] = 0
+
+        sides = np.maximum(self.bbox[:, 2] - self.bbox[:, 0], self.bbox[:, 3] - self.bbox[:, 1])
+        self.cell_size = cell_size or (float(np.median(sides)) if count and np.median(sides) > 0 else 1.0)
+        self.origin = self.bbox[:, 0:2].min(axis=0) if count else np.zeros(2)
+        low = self._cells(self.bbox[:, 0:2])
+        high = self._cells(self.bbox[:, 2:4])
+        self.columns = int(high[:, 0].max()) + 1 if count else 1
+
+        # One (cell key, polygon) entry per covered cell, sorted by key
+        span = high - low + 1
+        poly, offset = expand_runs(span[:, 0] * span[:, 1])
+        cx = low[poly, 0] + offset // span[poly, 1]
+        cy = low[poly, 1] + offset % span[poly, 1]
+        keys = cy * self.columns + cx
+        order = np.argsort(keys, kind="stable")
+        self.cell_keys = keys[order]
+        self.cell_polygons = poly[order]
+
+    def __len__(self):
+        return self.count
+
+    def _cells(self, points):
+        return np.floor((points - self.origin) / self.cell_size).astype(np.int64)
+
+    def containing_pairs(self, points):
+        """
+        (point index, polygon index) for every polygon containing a query point.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        empty = np.empty((0, 2), dtype=np.int64)
+        if not len(points) or not self.count:
+            return empty
+
+        cells = self._cells(points)
+        inside_grid = (cells >= 0).all(axis=1) & (cells[:, 0] < self.columns)
+        keys = np.where(inside_grid, cells[:, 1] * self.columns + cells[:, 0], -1)
+        first = np.searchsorted(self.cell_keys, keys, side="left")
+        last = np.searchsorted(self.cell_keys, keys, side="right")
+        point, offset = expand_runs(np.where(inside_grid, last - first, 0))
+        poly = self.cell_polygons[first[point] + offset]
+
+        box = self.bbox[poly]
+        xy = points[point]
+        hit = (xy[:, 0] >= box[:, 0]) & (xy[:, 0] <= box[:, 2]) & (xy[:, 1] >= box[:, 1]) & (xy[:, 1] <= box[:, 3])
+        point, poly = point[hit], poly[hit]
+        if not len(point):
+            return empty
+
+        # Even-odd crossings of a ray towards +x, over every edge of every candidate
+        pair, offset = expand_runs(self.edge_count[poly])
+        edge = self.edge_offset[poly[pair]] + offset
+        a = self.edge_start[edge]
+        b = self.edge_end[edge]
+        px, py = points[point[pair], 0], points[point[pair], 1]
+        straddles = (a[:, 1] > py) != (b[:, 1] > py)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cross_x = a[:, 0] + (py - a[:, 1]) * (b[:, 0] - a[:, 0]) / (b[:, 1] - a[:, 1])
+        crossings = np.bincount(pair[straddles & (px < cross_x)], minlength=len(point))
+        inside = crossings % 2 == 1
+        return np.stack([point[inside], poly[inside]], axis=1)
+
+    def locate(self, points, areas=None):
+        """
+        Index of the polygon containing each point (the smallest by areas when nested), -1 for none.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        found = np.full(len(points), -1, dtype=np.int64)
+        pairs = self.containing_pairs(points)
+        if len(pairs):
+            size = np.zeros(len(pairs)) if areas is None else np.abs(np.asarray(areas))[pairs[:, 1]]
+            order = np.lexsort((size, pairs[:, 0]))
+            _, first = np.unique(pairs[order, 0], return_index=True)
+            found[pairs[order[first], 0]] = pairs[order[first], 1]
+        return found
@@ -0,0 +1,197 @@
+import numpy as np
+
+from geometry_kernel import CATEGORY_CODES
+from door_assembly import ASSEMBLY_CATEGORY
+from fixture_loops import LOOP_CATEGORY
+
+# --- Symbol Fingerprints ---
+# Plans repeat the same door and fixture symbols hundreds of times, exploded into raw
+# paths at different positions and angles. Every door assembly, multi-path fixture loop
+# and single-path basin is one symbol instance. Its fingerprint does not change when the
+# symbol is moved, rotated or mirrored. It is hashed from the multiset of its member paths,
+# each described by:
+#   curve flag, stroke width, length, start-to-end chord, |signed area| swept about the
+#   instance's end-point centroid, and the distances of both path ends from that centroid
+#   (smaller one first)
+# All values are quantized (FINGERPRINT_QUANTUM) before hashing. Rows are mixed with
+# splitmix64 and summed per instance, so the hash ignores path order and is computed for
+# all instances at once. Values close to a quantization step can still split one symbol
+# into two fingerprints.
+# The instances themselves come from the door assembly and fixture loop passes, which
+# run once per page over all paths (vectorized); fingerprinting needs their grouping.
+# Each distinct symbol is described by its first instance on the page. Nothing is kept
+# across pages, so a page's table never depends on which pages ran before it in the same
+# process. The result is an instance count table per symbol.
+
+FINGERPRINT_QUANTUM = 0.05 # PDF units; lengths and distances
+AREA_QUANTUM = 1.0 # PDF units squared
+WIDTH_QUANTUM = 0.01
+
+KIND_ASSEMBLY = 1
+KIND_LOOP = 2
+KIND_PATH = 3
+
+KIND_CATEGORIES = {
+    KIND_ASSEMBLY: ASSEMBLY_CATEGORY,
+    KIND_LOOP: LOOP_CATEGORY,
+    KIND_PATH: LOOP_CATEGORY
+}
+
+_M1 = np.uint64(0xBF58476D1CE4E5B9)
+_M2 = np.uint64(0x94D049BB133111EB)
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+def _mix(x):
+    """
+    splitmix64 finalizer over a uint64 array (wrapping arithmetic).
+    """
+    with np.errstate(over="ignore"):
+        x = x + _GOLDEN
+        x = (x ^ (x >> np.uint64(30))) * _M1
+        x = (x ^ (x >> np.uint64(27))) * _M2
+    return x ^ (x >> np.uint64(31))
+
+def _quantize(values, quantum):
+    return np.rint(values / quantum).astype(np.int64).view(np.uint64)
+
+def symbol_instances(cols, loops, assemblies):
+    """
+    Member paths of every symbol instance, as (members, instance, kind) where instance
+    numbers assemblies first, then fixture loops, then single-path basins.
+    """
+    assembly = assemblies["assembly"]
+    loop = loops["loop"]
+    n_assemblies = len(assemblies["leaf_width"])
+    n_loops = len(loops["area"])
+
+    in_assembly = np.flatnonzero(assembly >= 0)
+    in_loop = np.flatnonzero(loop >= 0)
+    single = np.flatnonzero((cols["code"] == CATEGORY_CODES.get(LOOP_CATEGORY, -1)) & (loop < 0))
+
+    members = np.concatenate([in_assembly, in_loop, single])
+    instance = np.concatenate([assembly[in_assembly], n_assemblies + loop[in_loop],
+                               n_assemblies + n_loops + np.arange(len(single))])
+    kind = np.concatenate([np.full(n_assemblies, KIND_ASSEMBLY), np.full(n_loops, KIND_LOOP),
+                           np.full(len(single), KIND_PATH)]).astype(np.int8)
+    return members, instance, kind
+
+def fingerprint_instances(cols, members, instance, kind):
+    """
+    uint64 fingerprint per instance (see above).
+    """
+    count = len(kind)
+    if not count:
+        return np.zeros(0, dtype=np.uint64)
+
+    # End-point centroid of each instance
+    ends = np.concatenate([cols["start"][members], cols["end"][members]])
+    owner = np.concatenate([instance, instance])
+    weight = np.bincount(owner, minlength=count)
+    centroid = np.stack([np.bincount(owner, weights=ends[:, 0], minlength=count),
+                         np.bincount(owner, weights=ends[:, 1], minlength=count)], axis=1) / weight[:, None]
+
+    start = cols["start"][members]
+    end = cols["end"][members]
+    centre = centroid[instance]
+    d_start = np.hypot(*(start - centre).T)
+    d_end = np.hypot(*(end - centre).T)
+    # The kernel's areas are swept about the origin; move them to the centroid
+    chord = end - start
+    area = cols["area"][members] - (centre[:, 0] * chord[:, 1] - centre[:, 1] * chord[:, 0]) / 2
+    features = [
+        cols["is_curve"][members].astype(np.uint64),
+        _quantize(cols["width"][members], WIDTH_QUANTUM),
+        _quantize(cols["length"][members], FINGERPRINT_QUANTUM),
+        _quantize(np.abs(area), AREA_QUANTUM),
+        _quantize(np.hypot(*chord.T), FINGERPRINT_QUANTUM),
+        _quantize(np.minimum(d_start, d_end), FINGERPRINT_QUANTUM),
+        _quantize(np.maximum(d_start, d_end), FINGERPRINT_QUANTUM)
+    ]
+    row = np.zeros(len(members), dtype=np.uint64)
+    for feature in features:
+        row = _mix(row ^ feature)
+
+    # Order-independent sum of the member rows, then the instance kind and size
+    fingerprint = np.zeros(count, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        np.add.at(fingerprint, instance, _mix(row))
+    fingerprint = _mix(fingerprint ^ kind.astype(np.uint64))
+    return _mix(fingerprint ^ np.bincount(instance, minlength=count).astype(np.uint64))
+
+def instance_sums(cols, members, instance, count):
+    """
+    (paths, length, area) per instance, grouped in one pass over the member paths.
+    """
+    paths = np.bincount(instance, minlength=count)
+    length = np.bincount(instance, weights=cols["length"][members], minlength=count)
+    area = np.bincount(instance, weights=cols["area"][members], minlength=count)
+    return paths, length, area
+
+def describe_symbol(index, kind, sums, loops, assemblies):
+    """
+    Attributes of one instance (sums from instance_sums), reported for every instance
+    sharing its fingerprint on the page.
+    """
+    paths, length, area = sums
+    attributes = {
+        "category": KIND_CATEGORIES[kind],
+        "paths": int(paths[index]),
+        "length": float(length[index]),
+        "leaf_width": None,
+        "area": None
+    }
+    n_assemblies = len(assemblies["leaf_width"])
+    if kind == KIND_ASSEMBLY:
+        attributes["leaf_width"] = float(assemblies["leaf_width"][index])
+    elif kind == KIND_LOOP:
+        attributes["area"] = float(loops["area"][index - n_assemblies])
+    else:
+        attributes["area"] = float(abs(area[index]))
+    return attributes
+
+def find_symbols(cols, loops, assemblies):
+    """
+    Fingerprints every symbol instance and groups instances by fingerprint.
+    Returns a dict:
+      symbol      - (n,) symbol index per shape, -1 for shapes in no instance
+      fingerprint - (s,) uint64 per distinct symbol, in order of first instance
+      instances   - (s,) instance count per symbol
+      attributes  - [dict] per symbol (see describe_symbol), from its first instance
+    """
+    members, instance, kind = symbol_instances(cols, loops, assemblies)
+    prints = fingerprint_instances(cols, members, instance, kind)
+    distinct, first, inverse, counts = np.unique(prints, return_index=True, return_inverse=True, return_counts=True)
+
+    # Number symbols in order of their first instance
+    order = np.argsort(first, kind="stable")
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+
+    sums = instance_sums(cols, members, instance, len(kind))
+    attributes = [describe_symbol(index, int(kind[index]), sums, loops, assemblies) for index in first[order].tolist()]
+
+    symbol = np.full(len(cols["code"]), -1, dtype=np.int64)
+    if len(members):
+        symbol[members] = rank[inverse.reshape(-1)][instance]
+    return {
+        "symbol": symbol,
+        "fingerprint": distinct[order],
+        "instances": counts[order],
+        "attributes": attributes
+    }
+
+def symbol_table_rows(symbols):
+    """
+    One row per distinct symbol in report_writer.SYMBOL_COLUMNS order, by category and
+    then most instances first, rounded for output.
+    """
+    rows = []
+    for fingerprint, count, attrs in zip(symbols["fingerprint"].tolist(), symbols["instances"].tolist(),
+                                         symbols["attributes"]):
+        leaf_width = attrs["leaf_width"]
+        area = attrs["area"]
+        rows.append([f"{fingerprint:016x}", attrs["category"], count, attrs["paths"], round(attrs["length"], 2),
+                     None if leaf_width is None else round(leaf_width, 2),
+                     None if area is None else round(area, 2)])
+    rows.sort(key=lambda row: (row[1], -row[2], row[0]))
+    return rows
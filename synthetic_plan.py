@@ -0,0 +1,174 @@
+import fitz # PyMuPDF
+import argparse
+import math
+import os
+import numpy as np
+
+# --- Configuration ---
+PLAN_DIR = "bench_plans"
+
+# Share of the drawing items spent on each feature. Doors cost 2 items (arc + leaf),
+# basins 4 (a circle is four Bezier curves), everything else 1 item per path.
+DEFAULT_MIX = {
+    "walls": 0.05,
+    "doors": 0.01,
+    "basins": 0.01,
+    "details": 0.08,
+    "lines": 0.85
+}
+ITEMS_PER_FEATURE = {"walls": 1, "doors": 2, "basins": 4, "details": 1, "lines": 1}
+
+# Text labels per 1000 drawing items, cycled from LABELS (labels, keywords and dimension strings)
+LABELS_PER_1000 = 10
+LABELS = ["WC", "D-101", "3600", "Kök", "1200", "TM", "Bad", "2400", "HVD-12", "Dusch", "900", "DM", "RUM 1"]
+
+# Widths chosen to land in each heuristic class of geometry.py
+WALL_WIDTH = 0.8
+LINE_WIDTH = 0.35
+DETAIL_WIDTH = 0.18
+
+MAX_PAGE_SIZE = 14000 # PDF viewers cap pages at 14400 units
+
+# --- Feature Counts ---
+def feature_counts(items, mix=None):
+    """
+    Splits a drawing-item budget into per-feature counts (walls are rounded to whole rooms).
+    """
+    mix = dict(DEFAULT_MIX, **(mix or {}))
+    total = sum(mix.values())
+    counts = {name: int(round(items * share / total / ITEMS_PER_FEATURE[name])) for name, share in mix.items()}
+    counts["rooms"] = max(1, int(math.ceil(counts["walls"] / 4)))
+    counts["walls"] = counts["rooms"] * 4 if mix["walls"] > 0 else 0
+    counts["labels"] = int(round(items * LABELS_PER_1000 / 1000))
+    return counts
+
+# --- Plan Generator ---
+def generate_plan(path, items=10000, mix=None, seed=0):
+    """
+    Writes a one-page synthetic floor plan with roughly `items` drawing items:
+    a grid of rooms (four wall paths each) holding door arcs with their leaves,
+    closed basin loops, thin detail lines, standard hatching and text labels.
+    Returns the feature counts actually drawn.
+    """
+    counts = feature_counts(items, mix)
+    rng = np.random.default_rng(seed)
+
+    side = int(math.ceil(math.sqrt(counts["rooms"])))
+    room = min(200.0, MAX_PAGE_SIZE / side)
+    margin = 20.0
+    size = side * room + 2 * margin
+
+    # Paths are written straight into the content stream (PDF space, y pointing up):
+    # fitz.Shape re-concatenates its buffer on every finish() and goes quadratic at this scale
+    ops = ["0 0 0 RG 1 J"]
+
+    def pt(x, y):
+        return f"{x:.3f} {size - y:.3f}"
+
+    def room_origin(k):
+        k %= counts["rooms"]
+        return margin + (k % side) * room, margin + (k // side) * room
+
+    # Walls: four separate thick paths per room
+    if counts["walls"]:
+        ops.append(f"{WALL_WIDTH} w")
+        for k in range(counts["rooms"]):
+            x0, y0 = room_origin(k)
+            corners = [(x0, y0), (x0 + room, y0), (x0 + room, y0 + room), (x0, y0 + room)]
+            for a, b in zip(corners, corners[1:] + corners[:1]):
+                ops.append(f"{pt(*a)} m {pt(*b)} l S")
+
+    # Doors: a quarter-circle swing arc plus the leaf line ending on the arc's start
+    ops.append(f"{LINE_WIDTH} w")
+    radius = room * 0.15
+    kappa = 0.5523 * radius
+    for k in range(counts["doors"]):
+        x0, y0 = room_origin(k)
+        hx = x0 + room * (0.2 + 0.5 * (k // counts["rooms"] % 2))
+        hy = y0 + 2.0
+        ops.append(f"{pt(hx, hy)} m {pt(hx, hy + radius)} l S")
+        ops.append(f"{pt(hx, hy + radius)} m {pt(hx + kappa, hy + radius)} {pt(hx + radius, hy + kappa)} {pt(hx + radius, hy)} c S")
+
+    # Basins: small closed circles (perimeter well inside the basin range)
+    basin_r = min(max(room * 0.04, 3.0), 20.0)
+    k_r = 0.5523 * basin_r
+    for k in range(counts["basins"]):
+        x0, y0 = room_origin(k)
+        cx = x0 + room * (0.75 - 0.15 * (k // counts["rooms"] % 3))
+        cy = y0 + room * 0.75
+        ops.append(
+            f"{pt(cx + basin_r, cy)} m "
+            f"{pt(cx + basin_r, cy + k_r)} {pt(cx + k_r, cy + basin_r)} {pt(cx, cy + basin_r)} c "
+            f"{pt(cx - k_r, cy + basin_r)} {pt(cx - basin_r, cy + k_r)} {pt(cx - basin_r, cy)} c "
+            f"{pt(cx - basin_r, cy - k_r)} {pt(cx - k_r, cy - basin_r)} {pt(cx, cy - basin_r)} c "
+            f"{pt(cx + k_r, cy - basin_r)} {pt(cx + basin_r, cy - k_r)} {pt(cx + basin_r, cy)} c S"
+        )
+
+    # Detail and standard lines: random short segments inside the lower half of a room,
+    # away from the door swings along the top wall
+    for name, width in (("details", DETAIL_WIDTH), ("lines", LINE_WIDTH)):
+        n = counts[name]
+        if not n:
+            continue
+        ops.append(f"{width} w")
+        rooms = rng.integers(0, counts["rooms"], n)
+        start = rng.uniform([0.05, 0.45], [0.85, 0.9], (n, 2)) * room
+        delta = rng.uniform(-0.1, 0.1, (n, 2)) * room
+        x1 = margin + (rooms % side) * room + start[:, 0]
+        y1 = size - (margin + (rooms // side) * room + start[:, 1])
+        x2 = x1 + delta[:, 0]
+        y2 = y1 - delta[:, 1]
+        for a, b, c, d in zip(x1.tolist(), y1.tolist(), x2.tolist(), y2.tolist()):
+            ops.append(f"{a:.3f} {b:.3f} m {c:.3f} {d:.3f} l S")
+
+    doc = fitz.open()
+    page = doc.new_page(width=size, height=size)
+    xref = doc.get_new_xref()
+    doc.update_object(xref, "<<>>")
+    doc.update_stream(xref, "\n".join(ops).encode())
+    page.set_contents(xref)
+
+    # Text labels, one per room slot, cycling through LABELS
+    fontsize = max(2.0, room * 0.05)
+    writer = fitz.TextWriter(page.rect)
+    for k in range(counts["labels"]):
+        x0, y0 = room_origin(k)
+        row = k // counts["rooms"] % 4
+        writer.append((x0 + room * 0.1, y0 + room * (0.3 + 0.1 * row)), LABELS[k % len(LABELS)], fontsize=fontsize)
+    writer.write_text(page)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    doc.save(path, deflate=True)
+    doc.close()
+    return counts
+
+def plan_path(items, plan_dir=PLAN_DIR, seed=0):
+    return os.path.join(plan_dir, f"plan_{items}_s{seed}.pdf")
+
+def ensure_plan(items, plan_dir=PLAN_DIR, seed=0):
+    """
+    Returns the path of the synthetic plan for this size, generating it on first use.
+    """
+    path = plan_path(items, plan_dir, seed)
+    if not os.path.exists(path):
+        generate_plan(path, items, seed=seed)
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic vector floor plan for benchmarking.")
+    parser.add_argument("items", type=int, help="Approximate number of drawing items")
+    parser.add_argument("-o", "--output", help=f"Output PDF (default: {PLAN_DIR}/plan_<items>_s<seed>.pdf)")
+    parser.add_argument("--seed", type=int, default=0)
+    for name in DEFAULT_MIX:
+        parser.add_argument(f"--{name}", type=float, help=f"Share of items spent on {name} (default {DEFAULT_MIX[name]})")
+    args = parser.parse_args()
+
+    mix = {name: getattr(args, name) for name in DEFAULT_MIX if getattr(args, name) is not None}
+    path = args.output or plan_path(args.items, seed=args.seed)
+    counts = generate_plan(path, args.items, mix=mix, seed=args.seed)
+    print(f"Wrote {os.path.abspath(path)}")
+    for name, count in counts.items():
+        print(f"  {name:<8} {count}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import fitz # PyMuPDF
+import numpy as np
+import pytest
+
+from page_model import build_page_model, classified_columns, door_assemblies
+from rooms import door_openings
+from shape_rules import CATEGORIES
+
+# --- Doors on a Mapped Door Layer ---
+# On an A-DOOR OCG the swing takes "Door (Swing)" from the layer map, while the leaf and
+# frame stub are leaf candidates through the layer's flag, whatever their pen width.
+
+HINGE = (100.0, 100.0)
+RADIUS = 40.0
+LEAF_WIDTH = 0.1 # a Window/Detail pen: never a leaf off a door layer
+
+def _door_page(doc, ocg=None):
+    page = doc.new_page(width=300, height=300)
+    x, y = HINGE
+    k = 0.5523 * RADIUS
+    oc = {"oc": ocg} if ocg else {}
+
+    swing = page.new_shape()
+    swing.draw_bezier((x, y - RADIUS), (x + k, y - RADIUS), (x + RADIUS, y - k), (x + RADIUS, y))
+    swing.finish(width=0.35, color=(0, 0, 0), closePath=False, **oc)
+    swing.commit()
+
+    for start, end in (((x, y), (x, y - RADIUS)), ((x, y), (x - 4, y))):
+        line = page.new_shape()
+        line.draw_line(start, end)
+        line.finish(width=LEAF_WIDTH, color=(0, 0, 0), closePath=False, **oc)
+        line.commit()
+    return page
+
+@pytest.fixture(scope="module")
+def doc():
+    doc = fitz.open()
+    _door_page(doc, doc.add_ocg("A-DOOR"))
+    _door_page(doc)
+    yield doc
+    doc.close()
+
+def test_door_layer_arc_and_leaf_form_one_assembly(doc):
+    model = build_page_model(doc[0])
+    cols = classified_columns(model)
+    assert [CATEGORIES[code] for code in cols["code"].tolist()] == ["Door (Swing)", "Window/Detail", "Window/Detail"]
+
+    assemblies = door_assemblies(model)
+    assert len(assemblies["leaf_width"]) == 1
+    assert assemblies["arcs"].tolist() == [1]
+    assert assemblies["leaves"].tolist() == [1]
+    assert assemblies["stubs"].tolist() == [1]
+    assert assemblies["leaf_width"][0] == pytest.approx(RADIUS)
+    assert len(door_openings(cols, assemblies)) == 1
+
+def test_unlayered_detail_pen_lines_are_not_leaves(doc):
+    assemblies = door_assemblies(build_page_model(doc[1]))
+    assert assemblies["arcs"].tolist() == [1]
+    assert assemblies["leaves"].tolist() == [0]
+    np.testing.assert_allclose(assemblies["leaf_width"], [RADIUS], rtol=1e-3)
@@ -0,0 +1,117 @@
+import copy
+
+import fitz # PyMuPDF
+import pytest
+
+import extraction_cache
+import geometry
+from extraction_cache import ExtractionCache, cached_page_model, output_up_to_date, record_output
+from synthetic_plan import generate_plan
+from width_calibration import CALIBRATE_ENV
+
+# --- Light-Entry Keys ---
+# A light entry holds classified columns, so any threshold or rule that changes the
+# classification must lead to a different key (and a cache miss), never a stale hit.
+
+@pytest.fixture
+def page(tmp_path):
+    path = tmp_path / "plan.pdf"
+    generate_plan(str(path), items=500)
+    doc = fitz.open(str(path))
+    yield doc[0]
+    doc.close()
+
+@pytest.fixture
+def cache(tmp_path):
+    return ExtractionCache(root=str(tmp_path / "cache"))
+
+def _light_key(page, cache):
+    return cached_page_model(page, shapes=False, cache=cache)["cache_key"]
+
+def test_same_config_reuses_the_entry(page, cache):
+    key = _light_key(page, cache)
+    assert cache.get(key) is not None
+    assert _light_key(page, cache) == key
+
+@pytest.mark.parametrize("name", [
+    "WALL_MIN_WIDTH", "WINDOW_MAX_WIDTH", "BASIN_MIN_PERIMETER",
+    "BASIN_MAX_PERIMETER", "CLOSURE_TOLERANCE", "DOOR_TOLERANCE"
+])
+def test_threshold_change_changes_the_key(page, cache, monkeypatch, name):
+    key = _light_key(page, cache)
+    monkeypatch.setattr(geometry, name, getattr(geometry, name) * 1.5)
+    assert _light_key(page, cache) != key
+
+def test_shape_rule_change_changes_the_key(page, cache, monkeypatch):
+    key = _light_key(page, cache)
+    rules = copy.deepcopy(extraction_cache.RULES)
+    rules[0]["category"] = "Sanitary: Basin"
+    monkeypatch.setattr(extraction_cache, "RULES", rules)
+    assert _light_key(page, cache) != key
+
+def test_layer_map_change_changes_the_key(page, cache, monkeypatch):
+    key = _light_key(page, cache)
+    layer_map = copy.deepcopy(extraction_cache.OCG_MAP) + [{"ocg": "*-DOOR-*", "category": "Door (Swing)"}]
+    monkeypatch.setattr(extraction_cache, "OCG_MAP", layer_map)
+    assert _light_key(page, cache) != key
+
+def test_label_rule_change_changes_the_key(page, cache, monkeypatch):
+    key = _light_key(page, cache)
+    monkeypatch.setattr(extraction_cache, "LABEL_RULES", extraction_cache.LABEL_RULES[1:])
+    assert _light_key(page, cache) != key
+
+def test_calibration_switch_changes_the_key(page, cache, monkeypatch):
+    monkeypatch.delenv(CALIBRATE_ENV, raising=False)
+    key = _light_key(page, cache)
+    monkeypatch.setenv(CALIBRATE_ENV, "1")
+    assert _light_key(page, cache) != key
+
+# --- Output Stamps ---
+
+def test_output_stamp_follows_the_entry(page, cache, tmp_path, monkeypatch):
+    output = tmp_path / "report.xlsx"
+    output.write_bytes(b"report")
+    model = cached_page_model(page, shapes=False, cache=cache)
+    assert not output_up_to_date(model, str(output), cache)
+    record_output(model, str(output), cache)
+    assert output_up_to_date(model, str(output), cache)
+
+    monkeypatch.setattr(geometry, "WALL_MIN_WIDTH", geometry.WALL_MIN_WIDTH * 1.5)
+    assert not output_up_to_date(cached_page_model(page, shapes=False, cache=cache), str(output), cache)
+
+def test_rewritten_output_is_stale(page, cache, tmp_path):
+    output = tmp_path / "report.xlsx"
+    output.write_bytes(b"report")
+    model = cached_page_model(page, shapes=False, cache=cache)
+    record_output(model, str(output), cache)
+    output.write_bytes(b"edited report")
+    assert not output_up_to_date(model, str(output), cache)
+
+# --- Resources Behind References ---
+
+def _gs_page(doc, line_width):
+    """
+    A page drawing one line whose width comes from an indirect ExtGState (/GS1 gs).
+    """
+    page = doc.new_page(width=200, height=200)
+    gs = doc.get_new_xref()
+    doc.update_object(gs, f"<< /Type /ExtGState /LW {line_width} >>")
+    doc.xref_set_key(page.xref, "Resources", f"<< /ExtGState << /GS1 {gs} 0 R >> >>")
+    contents = doc.get_new_xref()
+    doc.update_object(contents, "<<>>")
+    doc.update_stream(contents, b"/GS1 gs 10 10 m 190 10 l S")
+    page.set_contents(contents)
+    return page, gs
+
+def test_extgstate_edit_misses_the_cache(cache):
+    doc = fitz.open()
+    page, gs = _gs_page(doc, geometry.WALL_MIN_WIDTH + 0.2)
+    before = cached_page_model(page, shapes=False, cache=cache)
+    assert before["columns"]["width"].tolist() == pytest.approx([geometry.WALL_MIN_WIDTH + 0.2])
+
+    # Only the ExtGState object changes; the page object and content stream stay the same
+    doc.xref_set_key(gs, "LW", "0.1")
+    after = cached_page_model(doc[0], shapes=False, cache=cache)
+    assert after["cache_key"] != before["cache_key"]
+    assert after["columns"]["width"].tolist() == pytest.approx([0.1])
+    doc.close()
@@ -0,0 +1,23 @@
+import pytest
+
+from extraction_daemon import parse_address
+
+# --- Addresses ---
+
+@pytest.mark.parametrize("address, expected", [
+    ("daemon.sock", ("unix", "daemon.sock")),
+    ("run/daemon.sock", ("unix", "run/daemon.sock")),
+    ("./daemon.sock", ("unix", "./daemon.sock")),
+    ("/run/user/1000/pdf-extractor/daemon.sock", ("unix", "/run/user/1000/pdf-extractor/daemon.sock")),
+    ("unix:daemon.sock", ("unix", "daemon.sock")),
+    ("localhost:8765", ("tcp", ("localhost", 8765))),
+    ("[::1]:8765", ("tcp", ("::1", 8765))),
+    (":8765", ("tcp", ("127.0.0.1", 8765)))
+])
+def test_parse_address(address, expected):
+    assert parse_address(address) == expected
+
+def test_existing_socket_path_with_a_colon_is_unix(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "host:1234").touch()
+    assert parse_address("host:1234") == ("unix", "host:1234")
@@ -0,0 +1,79 @@
+import fitz # PyMuPDF
+import numpy as np
+import pytest
+
+from geometry import quantify_shape
+from geometry_kernel import quantify_shapes, shape_columns, classify_columns
+from shape_rules import CATEGORIES
+from synthetic_plan import generate_plan
+
+# --- Kernel vs quantify_shape ---
+# The columnar kernel must give, path for path, the length, category and bbox that
+# geometry.quantify_shape gives for the same drawing dict.
+
+def _mixed_page(doc):
+    """
+    A page with the path kinds the synthetic plan doesn't draw: polylines, closed
+    polygons, filled shapes, rectangles, unset and zero widths, a shape at the origin.
+    """
+    page = doc.new_page(width=400, height=400)
+    draws = [
+        (lambda s: s.draw_polyline([(10, 10), (60, 10), (60, 40)]), {"width": 0.35}),
+        (lambda s: s.draw_polyline([(100, 100), (140, 100), (140, 130), (100, 100)]), {"width": 0.8}),
+        (lambda s: s.draw_circle((200, 200), 8), {"width": 0.2}),
+        (lambda s: s.draw_circle((300, 300), 40), {"width": 0.35}),
+        (lambda s: s.draw_rect(fitz.Rect(20, 300, 90, 340)), {"width": 0.5}),
+        (lambda s: s.draw_rect(fitz.Rect(120, 300, 160, 360)), {"width": 0.5, "fill": (0.5, 0.5, 0.5)}),
+        (lambda s: s.draw_bezier((250, 20), (270, 60), (300, 0), (330, 40)), {"width": 0.1}),
+        (lambda s: s.draw_line((0, 0), (30, 30)), {"width": 0.35}),
+        (lambda s: s.draw_line((50, 200), (90, 250)), {"width": 0}),
+        (lambda s: s.draw_oval(fitz.Rect(220, 320, 260, 340)), {"width": 0.35, "fill": (1, 0, 0)})
+    ]
+    for draw, style in draws:
+        shape = page.new_shape()
+        draw(shape)
+        shape.finish(color=(0, 0, 0), **style)
+        shape.commit()
+    return page
+
+@pytest.fixture(scope="module")
+def pages(tmp_path_factory):
+    path = tmp_path_factory.mktemp("plans") / "plan.pdf"
+    generate_plan(str(path), items=2000, seed=3)
+    doc = fitz.open(str(path))
+    _mixed_page(doc)
+    yield [doc[0], doc[1]]
+    doc.close()
+
+def _reference(shapes):
+    lengths, categories, bboxes = [], [], []
+    for shape in shapes:
+        length, category, bbox = quantify_shape(shape)
+        lengths.append(length)
+        categories.append(category)
+        bboxes.append(bbox)
+    return np.array(lengths), categories, np.array(bboxes, dtype=np.float64).reshape(-1, 4)
+
+def _assert_matches(reference, lengths, codes, bboxes):
+    ref_lengths, ref_categories, ref_bboxes = reference
+    assert len(lengths) == len(ref_lengths)
+    np.testing.assert_allclose(lengths, ref_lengths, rtol=1e-9, atol=1e-9)
+    np.testing.assert_allclose(bboxes, ref_bboxes, rtol=1e-9, atol=1e-9)
+    assert [CATEGORIES[code] for code in codes.tolist()] == ref_categories
+
+@pytest.mark.parametrize("page_index", [0, 1])
+def test_kernel_matches_quantify_shape(pages, page_index):
+    shapes = pages[page_index].get_drawings()
+    assert shapes
+    _assert_matches(_reference(shapes), *quantify_shapes(shapes))
+
+@pytest.mark.parametrize("page_index", [0, 1])
+def test_raw_drawings_match_quantify_shape(pages, page_index):
+    page = pages[page_index]
+    cols = shape_columns(page.get_cdrawings(), raw=True)
+    _assert_matches(_reference(page.get_drawings()), cols["length"], classify_columns(cols), cols["bbox"])
+
+def test_synthetic_plan_covers_every_width_class(pages):
+    # Guards the comparison above against a plan that only exercises one rule
+    _, categories, _ = _reference(pages[0].get_drawings())
+    assert {"Wall", "Door (Swing)", "Window/Detail", "Standard Line", "Sanitary: Wash Basin (Est.)"} <= set(categories)
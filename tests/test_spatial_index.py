@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from geometry import DOOR_TOLERANCE
+from spatial_index import EndpointIndex
+
+# --- Strict Tolerance Edge ---
+# Endpoints touch when |dx| < tolerance and |dy| < tolerance (the scalar test in
+# geometry.py): a gap of exactly the tolerance does not touch, anything below it does.
+
+def _brute_touch(a, b, tolerance):
+    delta = np.abs(a[:, None, :] - b[None, :, :])
+    return np.all(delta < tolerance, axis=2)
+
+def test_gap_of_exactly_the_tolerance_does_not_touch():
+    index = EndpointIndex([(100.0, 100.0)])
+    edge = 100.0 + DOOR_TOLERANCE
+    assert not index.touches([(edge, 100.0), (100.0, edge), (edge, edge)]).any()
+
+def test_gap_just_below_the_tolerance_touches():
+    index = EndpointIndex([(100.0, 100.0)])
+    inside = np.nextafter(100.0 + DOOR_TOLERANCE, 0)
+    assert index.touches([(inside, 100.0), (100.0, inside), (inside, inside)]).all()
+
+def test_tolerance_is_per_axis_not_euclidean():
+    # (0.9, 0.9) is 1.27 away, but within tolerance on both axes
+    index = EndpointIndex([(0.0, 0.0)], tolerance=1.0)
+    assert index.touches([(0.9, 0.9)]).all()
+
+@pytest.mark.parametrize("seed", range(5))
+def test_queries_match_brute_force_on_tolerance_ties(seed):
+    # Points on a quarter-unit grid put many pairs exactly one tolerance apart
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, 24, (60, 2)) * 0.25
+    b = rng.integers(0, 24, (40, 2)) * 0.25
+    index = EndpointIndex(a, tolerance=1.0)
+    other = EndpointIndex(b, tolerance=1.0)
+    expected = _brute_touch(b, a, 1.0)
+
+    np.testing.assert_array_equal(index.touches(b), expected.any(axis=1))
+    assert [sorted(hits) for hits in index.neighbours(b)] == [np.flatnonzero(row).tolist() for row in expected]
+
+    pairs = {tuple(pair) for pair in index.pairs(other).tolist()}
+    assert pairs == {(i, j) for j, i in zip(*np.nonzero(expected))}
+
+    own = _brute_touch(a, a, 1.0)
+    self_pairs = {tuple(pair) for pair in index.self_pairs().tolist()}
+    assert self_pairs == {(i, j) for i, j in zip(*np.nonzero(own)) if i < j}
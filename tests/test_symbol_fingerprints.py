@@ -0,0 +1,39 @@
+import fitz # PyMuPDF
+import pytest
+
+from page_model import build_page_model, classified_columns, symbols
+
+# --- Per-Page Symbol Attributes ---
+# Two basins a hair apart in radius share a fingerprint (the quantization absorbs the
+# difference) but not their area. Each page must report its own basin, whichever page
+# the process saw first.
+
+RADII = (10.0, 10.0005)
+
+@pytest.fixture(scope="module")
+def doc():
+    doc = fitz.open()
+    for radius in RADII:
+        page = doc.new_page(width=300, height=300)
+        shape = page.new_shape()
+        shape.draw_circle((100, 100), radius)
+        shape.finish(width=0.35, color=(0, 0, 0))
+        shape.commit()
+    yield doc
+    doc.close()
+
+def _symbols(doc, pno):
+    return symbols(build_page_model(doc[pno]))
+
+def test_pages_share_the_fingerprint(doc):
+    first, second = _symbols(doc, 0), _symbols(doc, 1)
+    assert first["fingerprint"].tolist() == second["fingerprint"].tolist()
+    assert first["attributes"][0]["area"] != pytest.approx(second["attributes"][0]["area"], abs=0.01)
+
+@pytest.mark.parametrize("order", [(0, 1), (1, 0)])
+def test_attributes_come_from_the_page_itself(doc, order):
+    for pno in order:
+        model = build_page_model(doc[pno])
+        attributes = symbols(model)["attributes"]
+        assert len(attributes) == 1
+        assert attributes[0]["area"] == abs(classified_columns(model)["area"][0])
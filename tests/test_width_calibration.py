@@ -0,0 +1,42 @@
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+from width_calibration import jenks_breaks
+
+# --- Fisher-Jenks vs Brute Force ---
+# jenks_breaks must find a split with the least total weighted squared deviation; on
+# small inputs every split can be enumerated. Ties may pick different breaks, so the
+# costs are compared, not the break positions.
+
+def _cost(values, weights, breaks):
+    total = 0.0
+    for group in np.split(np.arange(len(values)), breaks):
+        v, w = values[group], weights[group]
+        mean = np.sum(w * v) / np.sum(w)
+        total += np.sum(w * (v - mean) ** 2)
+    return total
+
+def _brute_force(values, weights, classes):
+    return min(_cost(values, weights, list(breaks))
+               for breaks in combinations(range(1, len(values)), classes - 1))
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize("classes", [1, 2, 3, 4])
+def test_jenks_matches_brute_force(seed, classes):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(classes, 10))
+    values = np.sort(rng.choice(np.arange(0.05, 2.0, 0.05), n, replace=False))
+    weights = rng.integers(1, 500, n).astype(np.float64)
+
+    breaks = jenks_breaks(values, weights, classes)
+    assert len(breaks) == classes - 1
+    # Every group is non-empty: 0 < break_1 < ... < break_k < n
+    assert all(a < b for a, b in zip([0] + breaks, breaks + [n]))
+    assert _cost(values, weights, breaks) == pytest.approx(_brute_force(values, weights, classes), abs=1e-9)
+
+def test_jenks_separates_obvious_clusters():
+    values = np.array([0.1, 0.12, 0.13, 0.35, 0.36, 0.7, 0.72, 0.75])
+    weights = np.array([50, 10, 5, 400, 300, 20, 80, 10], dtype=np.float64)
+    assert jenks_breaks(values, weights, 3) == [3, 5]
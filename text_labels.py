@@ -0,0 +1,132 @@
+import re
+
+import numpy as np
+
+# --- Label Table ---
+# Every text label the extractors recognise, in priority order (the first matching row wins):
+#   (match, pattern, report category, layer name)
+# match is one of:
+#   "prefix"   - the span text starts with pattern
+#   "contains" - pattern appears anywhere in the span text
+#   "word"     - pattern is one of the space-separated words of the span text
+# The layer name is the generate_layer_pdf layer the label is drawn on (None = not drawn).
+LABEL_RULES = [
+    ("prefix", "D-", "Door (Label)", "Door"),
+    ("prefix", "DBD-", "Door (Label)", "Door"),
+    ("prefix", "HVD-", "Door (Label)", "Door"),
+    ("prefix", "VVD-", "Door (Label)", "Door"),
+    ("prefix", "YDS-", "Door (Label)", "Door"),
+    ("contains", "BASTUDÖRR", "Door (Label)", "Door"),
+    ("word", "WC", "Sanitary: Toilet/WC", "Sanitary_Toilet_WC"),
+    ("word", "TM", "Appliance: Washing Machine", "Appliance_Washing_Machine"),
+    ("word", "TT", "Appliance: Tumble Dryer", "Appliance_Tumble_Dryer"),
+    ("word", "DM", "Appliance: Dishwasher", "Appliance_Dishwasher"),
+    ("word", "KM", "Appliance: Combo Washer/Dryer", None),
+    ("word", "Kök", "Room: Kitchen", None),
+    ("word", "Bad", "Room: Bathroom", None),
+    ("word", "Dusch", "Sanitary: Shower", "Sanitary_Shower")
+]
+
+DOOR_LABEL = "Door (Label)"
+
+# --- Compiled Matcher ---
+def _rule_regex(match, pattern):
+    escaped = re.escape(pattern)
+    if match == "prefix":
+        return "^" + escaped
+    if match == "contains":
+        return escaped
+    if match == "word":
+        return f"(?<![^ ]){escaped}(?![^ ])"
+    raise ValueError(f"Unknown label match type: {match}")
+
+class LabelMatcher:
+    """
+    All label rules compiled into a single regex alternation (one named group per rule).
+    Spans that match nothing - the vast majority, e.g. dimension strings - cost one search.
+    """
+
+    def __init__(self, rules=LABEL_RULES):
+        self.rules = list(rules)
+        self.pattern = re.compile("|".join(
+            f"(?P<r{i}>{_rule_regex(match, pattern)})" for i, (match, pattern, _, _) in enumerate(self.rules)
+        ))
+
+    def match(self, txt, skip=None):
+        """
+        Returns the index of the highest-priority rule matching txt, or None.
+        Rules whose report category equals skip are ignored.
+        """
+        if self.pattern.search(txt) is None:
+            return None
+        # Rare path: several rules may match, the earliest row in the table wins
+        hits = [m.lastindex - 1 for m in self.pattern.finditer(txt)]
+        hits = [i for i in hits if self.rules[i][2] != skip]
+        return min(hits) if hits else None
+
+MATCHER = LabelMatcher()
+
+# --- Single-Pass Text Scan ---
+def scan_text(text, matcher=MATCHER):
+    """
+    Walks a page.get_text("dict") result once. Returns
+      rows:   every non-empty span as a (Text, Font, Size, X, Y) tuple
+      labels: (rule, Text, block X, block Y, span bbox, size, font) for spans matching a label rule
+    """
+    rows = []
+    labels = []
+    match = matcher.match
+    for block in text["blocks"]:
+        if block["type"] != 0:
+            continue
+        block_x = round(block["bbox"][0], 2)
+        block_y = round(block["bbox"][1], 2)
+        for line in block["lines"]:
+            for span in line["spans"]:
+                txt = span["text"].strip()
+                if not txt:
+                    continue
+                font = span.get("font", "")
+                size = span.get("size", 0)
+                bbox = span["bbox"]
+                rows.append((txt, font, size, round(bbox[0], 2), round(bbox[1], 2)))
+                rule = match(txt)
+                if rule is not None:
+                    labels.append((rule, txt, block_x, block_y, bbox, size, font))
+    return rows, labels
+
+# --- Label Views ---
+def label_features(labels, include_doors=True, matcher=MATCHER):
+    """
+    Report rows ({"Category", "Text", "X", "Y", "Length"}) for the matched labels,
+    positioned at their text block's top-left corner. With include_doors=False door
+    labels fall through to the next matching rule, if any.
+    """
+    features = []
+    for rule, txt, x, y, _, _, _ in labels:
+        if not include_doors and matcher.rules[rule][2] == DOOR_LABEL:
+            rule = matcher.match(txt, skip=DOOR_LABEL)
+            if rule is None:
+                continue
+        cat = matcher.rules[rule][2]
+        features.append({"Category": cat, "Text": txt, "X": x, "Y": y, "Length": 0})
+    return features
+
+def label_points(labels):
+    """
+    (l, 2) span centres of scan_text label tuples.
+    """
+    boxes = np.array([label[4] for label in labels], dtype=np.float64).reshape(-1, 4)
+    return (boxes[:, 0:2] + boxes[:, 2:4]) / 2
+
+def labels_by_layer(labels, matcher=MATCHER):
+    """
+    Groups the drawable labels by layer name: {layer: [{"text", "bbox", "size", "font"}]}.
+    """
+    layers = {}
+    for rule, txt, _, _, bbox, size, font in labels:
+        layer = matcher.rules[rule][3]
+        if layer is None:
+            continue
+        layers.setdefault(layer, []).append({"text": txt, "bbox": bbox, "size": size, "font": font})
+    return layers
@@ -0,0 +1,147 @@
+import fitz # PyMuPDF
+import argparse
+import numpy as np
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from geometry_kernel import shape_columns, classify_columns, concat_columns, category_counts
+from page_model import TEXT_FLAGS, fixture_loops, door_assemblies, ocg_path_filter
+from width_calibration import WidthHistogram, page_thresholds, calibration_enabled
+from instrumentation import stage
+import instrumentation
+
+# --- Configuration ---
+PDF_FILE = "sample.pdf"
+DEFAULT_GRID = (2, 2) # rows, columns
+
+# --- Tiled Extraction ---
+# For sheets whose drawing list does not fit in memory at once. The page is split into a
+# grid of tiles and each tile is extracted and classified on its own, in parallel:
+#   * every tile streams the page's paths through get_cdrawings(callback=...) and keeps
+#     only the paths it owns, the ones whose bbox centre falls inside it (clamped to the
+#     grid, so each path has exactly one owner). Only owned paths are kept, as raw
+#     tuples (geometry_kernel reads them with raw=True), so a worker's peak memory
+#     follows the tile, not the page. Each worker still walks the whole content stream,
+#     trading CPU for memory.
+#   * the worker returns compact geometry_kernel columns (plus category codes and the
+#     path's seqno); the parent concatenates them back into drawing order.
+# Paths are never cut at tile borders, so walls and arcs crossing a border are counted
+# once, exactly as untiled. Features made of several paths that may sit in different
+# tiles (door assemblies, multi-path basin loops) are stitched by running their endpoint
+# graphs over the merged columns. The result is a light page model (no "shapes") that
+# every tabular output accepts; layer PDFs still need an untiled parse.
+
+def owner_tile(path_rect, rect, grid):
+    """
+    Index of the tile owning a path: the one holding its bbox centre, clamped to the grid.
+    """
+    rows, columns = grid
+    cx = (path_rect[0] + path_rect[2]) / 2
+    cy = (path_rect[1] + path_rect[3]) / 2
+    c = min(max(int((cx - rect.x0) * columns / rect.width), 0), columns - 1)
+    r = min(max(int((cy - rect.y0) * rows / rect.height), 0), rows - 1)
+    return r * columns + c
+
+def drawing_rect(page):
+    """
+    The page rectangle in the unrotated space get_drawings() coordinates live in.
+    """
+    return page.rect * page.derotation_matrix
+
+def extract_tile(job):
+    """
+    Worker entry point: job is (pdf_path, page_number, grid, tile_index).
+    Returns the tile's geometry_kernel columns with "code" and "seqno" entries.
+    """
+    pdf_path, page_number, grid, index = job
+    shapes = []
+    seqnos = []
+
+    def keep(path):
+        if owner_tile(path["rect"], rect, grid) == index and (on_layer is None or on_layer(path)):
+            seqnos.append(path["seqno"])
+            shapes.append(path)
+
+    with fitz.open(pdf_path) as doc:
+        page = doc[page_number]
+        rect = drawing_rect(page)
+        on_layer = ocg_path_filter(doc)
+        page.get_cdrawings(callback=keep)
+
+    cols = shape_columns(shapes, raw=True)
+    cols["code"] = classify_columns(cols)
+    cols["seqno"] = np.array(seqnos, dtype=np.int64)
+    return cols
+
+def merge_columns(parts):
+    """
+    Concatenates per-tile columns and restores drawing (seqno) order.
+    """
+    order = np.argsort(np.concatenate([part.pop("seqno") for part in parts]), kind="stable")
+    return concat_columns(parts, order)
+
+def load_tiled_page_model(pdf_path, page_number=0, grid=DEFAULT_GRID, workers=None):
+    """
+    Extracts and classifies one page tile by tile (see above) and returns a light page model.
+    """
+    with fitz.open(pdf_path) as doc:
+        page = doc[page_number]
+        rect = page.rect
+        with stage("get_text"):
+            text = page.get_text("dict", flags=TEXT_FLAGS)
+
+    jobs = [(pdf_path, page_number, tuple(grid), i) for i in range(grid[0] * grid[1])]
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    with stage("tiles") as st:
+        if workers == 1:
+            parts = [extract_tile(job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                parts = list(pool.map(extract_tile, jobs))
+        cols = merge_columns(parts)
+        # Calibrated widths need the whole page's histogram, so tiles are re-coded here
+        thresholds = page_thresholds(WidthHistogram().add(cols["raw_width"]))
+        if calibration_enabled():
+            cols["code"] = classify_columns(cols, thresholds)
+        st.add_items(len(cols["code"]))
+        st.set_categories(category_counts(cols["code"]))
+
+    model = {
+        "file": pdf_path,
+        "page": page_number,
+        "rect": (rect.x0, rect.y0, rect.x1, rect.y1),
+        "columns": cols,
+        "width_thresholds": thresholds,
+        "text": text,
+        "tiles": [len(part["code"]) for part in parts]
+    }
+    # Stitch the features that may span tiles
+    fixture_loops(model)
+    door_assemblies(model)
+    return model
+
+def parse_grid(value):
+    """
+    "3x4" -> (3, 4) rows x columns.
+    """
+    rows, _, columns = value.lower().partition("x")
+    return int(rows), int(columns or rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract an oversized sheet tile by tile and report the stitched totals.")
+    parser.add_argument("pdf", nargs="?", default=PDF_FILE, help="Source PDF")
+    parser.add_argument("--page", type=int, default=1, help="1-based page number")
+    parser.add_argument("--tiles", type=parse_grid, default=DEFAULT_GRID, metavar="RxC", help="Tile grid (default: 2x2)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    instrumentation.enable_from_args(args)
+
+    from extract_pdf_data import write_report, EXCEL_FILE
+    print(f"Extracting {args.pdf} (page {args.page}) in {args.tiles[0]}x{args.tiles[1]} tiles...")
+    model = load_tiled_page_model(args.pdf, args.page - 1, args.tiles, args.workers)
+    print(f"Paths per tile: {model['tiles']}")
+    write_report(model, EXCEL_FILE)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import os
+
+import numpy as np
+
+from geometry import WALL_MIN_WIDTH, WINDOW_MAX_WIDTH
+
+# --- Configuration ---
+CALIBRATE_ENV = "PDF_EXTRACTOR_CALIBRATE"
+HISTOGRAM_BIN = 0.01 # stroke widths are binned to this resolution (PDF units)
+
+# --- Per-Document Width Calibration ---
+# The wall and window cut-offs in geometry.py suit drawings exported like sample.pdf;
+# other CAD setups use other pens. With PDF_EXTRACTOR_CALIBRATE=1 each page picks its
+# own cut-offs from the stroke widths it actually uses:
+#   * the extraction pass adds every chunk's widths to a WidthHistogram (bins of
+#     HISTOGRAM_BIN), so calibration never needs a second parse;
+#   * the occupied bins, weighted by their shape counts, are split into three natural
+#     classes (detail, standard, wall) with a weighted Fisher-Jenks optimal breaks pass.
+#     It runs over the few dozen distinct widths, not over the shapes;
+#   * each cut-off sits halfway between neighbouring classes, and replaces the
+#     "window_max_width" / "wall_min_width" thresholds of the shape rules for that page.
+# Pages with fewer than three distinct widths keep the defaults. The thresholds used are
+# stored with the page model ("width_thresholds") and written to the report.
+
+WIDTH_CLASSES = ("Window/Detail", "Standard Line", "Wall")
+
+def calibration_enabled():
+    return os.environ.get(CALIBRATE_ENV, "") not in ("", "0")
+
+class WidthHistogram:
+    """
+    Stroke-width counts in HISTOGRAM_BIN bins; unset (nan) and zero widths are ignored.
+    """
+
+    def __init__(self):
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    def add(self, raw_width):
+        widths = raw_width[np.isfinite(raw_width) & (raw_width > 0)]
+        if not len(widths):
+            return self
+        counts = np.bincount(np.rint(widths / HISTOGRAM_BIN).astype(np.int64))
+        if len(counts) > len(self.counts):
+            counts[:len(self.counts)] += self.counts
+            self.counts = counts
+        else:
+            self.counts[:len(counts)] += counts
+        return self
+
+    def bins(self):
+        """
+        (widths, counts) of the occupied bins, in increasing width.
+        """
+        occupied = np.flatnonzero(self.counts)
+        return occupied * HISTOGRAM_BIN, self.counts[occupied]
+
+def jenks_breaks(values, weights, classes):
+    """
+    Weighted Fisher-Jenks: splits sorted values into `classes` contiguous groups with the
+    least total weighted squared deviation. Returns the index where each group after the
+    first starts.
+    """
+    n = len(values)
+    w = np.concatenate(([0.0], np.cumsum(weights)))
+    wx = np.concatenate(([0.0], np.cumsum(weights * values)))
+    wxx = np.concatenate(([0.0], np.cumsum(weights * values * values)))
+
+    # cost[i, j]: squared deviation of one group holding values i..j
+    i, j = np.triu_indices(n)
+    cost = np.full((n, n), np.inf)
+    s = wx[j + 1] - wx[i]
+    cost[i, j] = np.maximum(wxx[j + 1] - wxx[i] - s * s / (w[j + 1] - w[i]), 0.0)
+
+    best = cost[0].copy() # best[j]: values 0..j in the groups placed so far
+    starts = []
+    for _ in range(classes - 1):
+        total = best[:-1, None] + cost[1:, :] # last group starts at row + 1
+        arg = np.argmin(total, axis=0)
+        best = np.concatenate(([np.inf], total[arg[1:], np.arange(1, n)]))
+        starts.append(arg + 1)
+
+    breaks = []
+    end = n - 1
+    for start in reversed(starts):
+        end = int(start[end])
+        breaks.append(end)
+        end -= 1
+    return breaks[::-1]
+
+def default_thresholds():
+    return {"source": "default", "window_max_width": WINDOW_MAX_WIDTH, "wall_min_width": WALL_MIN_WIDTH, "classes": []}
+
+def calibrate_widths(histogram):
+    """
+    Width cut-offs for one page from its WidthHistogram (see above). Returns a dict with
+    "source" ("calibrated" or "default"), "window_max_width", "wall_min_width" and
+    "classes": [(class, min width, max width, shapes)].
+    """
+    widths, counts = histogram.bins()
+    if len(widths) < len(WIDTH_CLASSES):
+        return default_thresholds()
+
+    lo, hi = jenks_breaks(widths, counts.astype(np.float64), len(WIDTH_CLASSES))
+    bounds = [(0, lo), (lo, hi), (hi, len(widths))]
+    return {
+        "source": "calibrated",
+        "window_max_width": round(float(widths[lo - 1] + widths[lo]) / 2, 4),
+        "wall_min_width": round(float(widths[hi - 1] + widths[hi]) / 2, 4),
+        "classes": [(name, round(float(widths[a]), 4), round(float(widths[b - 1]), 4), int(counts[a:b].sum()))
+                    for name, (a, b) in zip(WIDTH_CLASSES, bounds)]
+    }
+
+def page_thresholds(histogram=None):
+    """
+    The width thresholds a page is classified with: calibrated from its histogram when
+    PDF_EXTRACTOR_CALIBRATE is set, else the geometry.py defaults.
+    """
+    if histogram is None or not calibration_enabled():
+        return default_thresholds()
+    return calibrate_widths(histogram)
+
+def threshold_rows(thresholds):
+    """
+    Rows in report_writer.WIDTH_COLUMNS order for the two width cut-offs a page used.
+    """
+    source = thresholds["source"].capitalize()
+    yield ["Window Max Width", thresholds["window_max_width"], source]
+    yield ["Wall Min Width", thresholds["wall_min_width"], source]